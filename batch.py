@@ -0,0 +1,112 @@
+import argparse
+import json
+
+import numpy as np
+
+from model.model import Model
+from model.beamline import Beamline
+
+'''Headless batch simulation. Tracks a particle distribution through a FODO lattice, or any beamline, and writes the orbits to a .npz file.'''
+'''Only the model package is imported, so this runs without a display, tkinter or matplotlib.'''
+
+def make_parser():
+	parser = argparse.ArgumentParser(description='Track a particle distribution through a FODO lattice without the GUI.')
+	parser.add_argument('output', help='path of the .npz results file')
+
+	lattice_group = parser.add_argument_group('lattice')
+	lattice_group.add_argument('--drift-length', type=float, default=10)
+	lattice_group.add_argument('--focal-length', type=float, default=8)
+	lattice_group.add_argument('--num-cells', type=int, default=12)
+	lattice_group.add_argument('--quad-divisions', type=int, default=5)
+	lattice_group.add_argument('--drift-divisions', type=int, default=5)
+	lattice_group.add_argument('--quad-length', type=float, default=None,
+							   help='model quads as exact thick elements of this length instead of thin lenses')
+	lattice_group.add_argument('--beamline', default=None,
+							   help='json file with an "elements" list of [type, length, strength, divisions] describing one cell. Replaces the FODO options')
+
+	beam_group = parser.add_argument_group('particle distribution')
+	beam_group.add_argument('--distribution', choices=['point', 'gaussian', 'grid', 'matched-gaussian', 'waterbag', 'kv'], default='point',
+							help="'point' is one particle at (x, xp), 'gaussian' spreads num-particles around it, 'grid' is a num-particles x num-particles grid of width 2*spread. "
+								 "'matched-gaussian', 'waterbag' and 'kv' are num-particles matched to the lattice Twiss with rms emittance emittance, centered on (x, xp)")
+	beam_group.add_argument('--x', type=float, default=0.4)
+	beam_group.add_argument('--xp', type=float, default=-0.1)
+	beam_group.add_argument('--spread', type=float, default=0.1)
+	beam_group.add_argument('--emittance', type=float, default=0.001, help='rms emittance of the matched distributions')
+	beam_group.add_argument('--num-particles', type=int, default=1000)
+	beam_group.add_argument('--seed', type=int, default=None)
+
+	tracking_group = parser.add_argument_group('tracking')
+	tracking_group.add_argument('--cell-stride', type=int, default=None,
+								help='only record coordinates every cell-stride cells, using precomputed cell maps')
+	tracking_group.add_argument('--workers', type=int, default=1,
+								help='number of processes used for full orbit tracking. Not supported with --cell-stride or --statistics')
+	tracking_group.add_argument('--statistics', action='store_true',
+								help='save the centroid, rms size and rms emittance at every element instead of the orbit, without holding the orbit in memory')
+
+	return parser
+
+MATCHED_DISTRIBUTIONS = ('matched-gaussian', 'waterbag', 'kv')
+
+#(x, xp) arrays for the requested distribution. Matched distributions use the periodic Twiss of model.lattice, which must be stable.
+def make_initial_coordinates(args, model):
+	if args.distribution in MATCHED_DISTRIBUTIONS:
+		kind = 'gaussian' if args.distribution == 'matched-gaussian' else args.distribution
+		model.make_matched_beam(kind, args.num_particles, args.emittance, centroid=(args.x, args.xp), seed=args.seed)
+		return model.beam.coordinates[0], model.beam.coordinates[1]
+
+	if args.distribution == 'point':
+		return np.array([args.x]), np.array([args.xp])
+
+	if args.distribution == 'gaussian':
+		rng = np.random.default_rng(args.seed)
+		return rng.normal(args.x, args.spread, args.num_particles), rng.normal(args.xp, args.spread, args.num_particles)
+
+	x_grid, xp_grid = np.meshgrid(np.linspace(args.x - args.spread, args.x + args.spread, args.num_particles),
+								  np.linspace(args.xp - args.spread, args.xp + args.spread, args.num_particles))
+	return x_grid.ravel(), xp_grid.ravel()
+
+def main(argv=None):
+	parser = make_parser()
+	args = parser.parse_args(argv)
+	#cell-boundary and statistics tracking run on this process only
+	if args.workers != 1 and (args.cell_stride is not None or args.statistics):
+		parser.error('--workers only applies to full orbit tracking, it cannot be combined with --cell-stride or --statistics')
+
+	model = Model()
+	model.set_tracking_workers(args.workers)
+	if args.beamline is not None:
+		with open(args.beamline) as beamline_file:
+			model.set_beamline(Beamline.from_dict(json.load(beamline_file)), args.num_cells)
+	else:
+		model.set_lattice(args.drift_length, args.focal_length, args.num_cells, args.quad_divisions, args.drift_divisions, args.quad_length)
+	if args.distribution in MATCHED_DISTRIBUTIONS and not model.analyze_lattice().is_stable:
+		parser.error(f'--distribution {args.distribution} is matched to the lattice Twiss, but the lattice is unstable (|trace| >= 2) and has none')
+	model.make_new_beam(*make_initial_coordinates(args, model))
+
+	#orbit is (samples, 3, N). Axis 1 is x, xp, s, axis 2 is particles.
+	#With --statistics every array is per element instead, (samples,) or (samples, 2) for the (x, xp) centroid.
+	if args.statistics:
+		statistics = model.calculate_beam_statistics(model.beam.get_last_value(), model.lattice)
+		results = {'s': statistics.s,
+				   'centroid': statistics.get_centroid(),
+				   'rms_size': statistics.get_rms_size(),
+				   'rms_emittance': statistics.get_rms_emittance()}
+	elif args.cell_stride is not None:
+		results = {'orbit': model.calculate_cell_boundary_orbit(model.beam.get_last_value(), model.lattice, args.cell_stride)}
+	else:
+		model.propagate_beam()
+		results = {'orbit': model.get_beam_orbit_data()}
+
+	analysis = model.analyze_lattice()
+	np.savez(args.output,
+			 parameters=json.dumps(vars(args)),
+			 is_stable=analysis.is_stable,
+			 phase_advance=analysis.phase_advance,
+			 tune=analysis.get_tune(),
+			 **results)
+
+	if model.parallel_tracker is not None:
+		model.parallel_tracker.close()
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from model.model import Model
+from model.tracking import track_beam
+from view.compound_widgets.transverse_plots_widget import TransversePlotsWidget
+
+'''Benchmarks for the tracking, history and plotting hot paths. Every case is timed several times and the fastest and median runs are kept.'''
+'''Results are written as json keyed by (group, name, params), so two runs can be compared with --compare.'''
+'''Plots are rendered on an Agg canvas, so no display is needed. Animations are driven frame by frame with blitting emulated on the Agg canvas.'''
+
+DEFAULT_SIZES = {'orbit_cells': [10, 100, 1000],
+				 'beam_sizes': [100, 1000, 10000],
+				 'beam_cells': [1, 10, 50],
+				 'history_particles': [10, 100, 1000],
+				 'history_cells': 10,
+				 'static_orbits': [1, 10, 100],
+				 'plot_cells': 30,
+				 'animated_beam_sizes': [100, 1000, 10000]}
+
+#TransversePlotsWidget on an Agg canvas. Skips the tk frame, so it can be built without a display.
+#Animations are captured instead of started, and run by drive_animation.
+class HeadlessTransversePlots(TransversePlotsWidget):
+	def __init__(self):
+		self._callback_registry = {}
+		self.register_callback_name('on_animation_complete')
+		self.set_callback_function('on_animation_complete', lambda: None)
+		self._init_plot_state()
+		self._ensure_plots()
+
+	def _make_canvas(self):
+		return FigureCanvasAgg(self.figure)
+
+	def _make_animation(self, **kwargs):
+		self.animation_kwargs = kwargs
+		return None
+
+	#Render every (start, stop) in frames like a blitted FuncAnimation: restore the background, then draw only the animated artists.
+	#Returns the per-frame render times in seconds.
+	def drive_animation(self, frames):
+		kwargs = self.animation_kwargs
+		artists = kwargs['init_func']()
+		self.canvas.draw()
+		background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+		frame_times = []
+		for frame in frames:
+			start_time = time.perf_counter()
+			artists = kwargs['func'](frame)
+			self.canvas.restore_region(background)
+			for artist in artists:
+				self.figure.draw_artist(artist)
+			self.canvas.buffer_rgba()
+			frame_times.append(time.perf_counter() - start_time)
+		return frame_times
+
+#(fastest, median) seconds of repeats calls to func. setup runs before every call and is not timed.
+def time_call(func, repeats, setup=None):
+	times = []
+	for _ in range(repeats):
+		if setup is not None:
+			setup()
+		start_time = time.perf_counter()
+		func()
+		times.append(time.perf_counter() - start_time)
+	return min(times), statistics.median(times)
+
+def make_result(group, name, params, times, work=None, unit=None):
+	seconds_min, seconds_median = times
+	result = {'group': group, 'name': name, 'params': params, 'seconds_min': seconds_min, 'seconds_median': seconds_median}
+	if work is not None:
+		result['throughput'] = work / seconds_min
+		result['throughput_unit'] = unit
+	return result
+
+def make_history_model(num_particles, num_cells):
+	model = Model()
+	model.set_lattice(10, 40, num_cells)
+	for particle_index in range(num_particles):
+		model.make_new_particle(0.4 * np.cos(particle_index), -0.1)
+		model.propagate_active_particle()
+		model.commit_active_orbit()
+	return model
+
+#particles * elements per second, for a single particle and for whole beams
+def benchmark_tracking(sizes, repeats):
+	results = []
+	model = Model()
+	for num_cells in sizes['orbit_cells']:
+		model.clear_particles()
+		model.set_lattice(10, 40, num_cells)
+		model.make_new_particle(0.4, -0.1)
+		num_elements = num_cells * model.get_num_lattice_elements()
+		#the orbit cache would turn every repeat after the first into a lookup
+		times = time_call(lambda: model.calculate_orbit(model.active_particle, model.lattice), repeats, setup=model.orbit_cache.clear)
+		results.append(make_result('tracking', 'calculate_orbit', {'num_cells': num_cells}, times, num_elements, 'particle_elements/s'))
+
+	for num_cells in sizes['beam_cells']:
+		model.set_lattice(10, 40, num_cells)
+		num_elements = num_cells * model.get_num_lattice_elements()
+		for beam_size in sizes['beam_sizes']:
+			coordinates = np.vstack([np.random.default_rng(0).normal(0, 0.1, (2, beam_size)), np.zeros((1, beam_size))])
+			times = time_call(lambda: track_beam(coordinates, model.lattice), repeats)
+			results.append(make_result('tracking', 'track_beam', {'num_cells': num_cells, 'beam_size': beam_size}, times, num_elements * beam_size, 'particle_elements/s'))
+	return results
+
+#Cost of reading back the orbit history as the session grows
+def benchmark_history(sizes, repeats):
+	results = []
+	num_cells = sizes['history_cells']
+	for num_particles in sizes['history_particles']:
+		model = make_history_model(num_particles, num_cells)
+		params = {'num_particles': num_particles, 'num_cells': num_cells}
+
+		times = time_call(lambda: [orbit.sum() for orbit in model.get_previous_orbits()], repeats)
+		results.append(make_result('history', 'get_previous_orbits', params, times))
+		times = time_call(lambda: model.particles[-1].get_orbit_data(), repeats)
+		results.append(make_result('history', 'particle_get_orbit_data', params, times))
+
+		model.stage_particle(-1)
+		model.propagate_active_particle()
+		times = time_call(lambda: (model.max_orbit_values(), model.min_orbit_values()), repeats)
+		results.append(make_result('history', 'orbit_bounds', params, times))
+	return results
+
+#Agg render time for static orbits, an animated orbit and an animated beam
+def benchmark_rendering(sizes, repeats):
+	results = []
+	num_cells = sizes['plot_cells']
+	for num_orbits in sizes['static_orbits']:
+		model = make_history_model(num_orbits, num_cells)
+		orbits = list(model.get_previous_orbits())
+		x_max, xp_max, s_max = model.max_orbit_values()
+		x_min, xp_min, s_min = model.min_orbit_values()
+		widget = HeadlessTransversePlots()
+		widget.relimit_orbit_plot(s_min, s_max, x_min, x_max)
+		widget.relimit_phase_space_plot(x_min, x_max, xp_min, xp_max)
+
+		times = time_call(lambda: widget.plot_static_data(orbits), repeats, setup=widget.clear_plots)
+		results.append(make_result('rendering', 'plot_static_data', {'num_orbits': num_orbits, 'num_cells': num_cells}, times))
+
+	model = make_history_model(1, num_cells)
+	x_data, xp_data, s_data = model.particles[0].get_orbit_data()
+	num_samples = len(x_data)
+	frame_times = []
+	for _ in range(repeats):
+		widget = HeadlessTransversePlots()
+		widget.relimit_orbit_plot(s_data.min(), s_data.max(), x_data.min(), x_data.max())
+		widget.relimit_phase_space_plot(x_data.min(), x_data.max(), xp_data.min(), xp_data.max())
+		widget.animate_data(x_data, xp_data, s_data)
+		frame_times.extend(widget.drive_animation((stop - 1, stop) for stop in range(1, num_samples + 1)))
+	results.append(make_frame_result('animate_data', {'num_samples': num_samples}, frame_times))
+
+	for beam_size in sizes['animated_beam_sizes']:
+		model.set_lattice(10, 40, num_cells)
+		coordinates = np.vstack([np.random.default_rng(0).normal(0, 0.1, (2, beam_size)), np.zeros((1, beam_size))])
+		beam_orbit = track_beam(coordinates, model.lattice)
+		num_frames = len(beam_orbit)
+		frame_times = []
+		for _ in range(repeats):
+			widget = HeadlessTransversePlots()
+			widget.animate_beam(beam_orbit[:, 0], beam_orbit[:, 1], beam_orbit[:, 2])
+			frame_times.extend(widget.drive_animation((stop - 1, stop) for stop in range(1, num_frames + 1)))
+		results.append(make_frame_result('animate_beam', {'num_frames': num_frames, 'beam_size': beam_size}, frame_times))
+	return results
+
+#Per-frame render times. seconds_min and seconds_median are per frame, p95 shows stalls.
+def make_frame_result(name, params, frame_times):
+	result = make_result('rendering', name, params, (min(frame_times), statistics.median(frame_times)))
+	result['seconds_p95'] = float(np.percentile(frame_times, 95))
+	result['throughput'] = 1 / statistics.median(frame_times)
+	result['throughput_unit'] = 'frames/s'
+	return result
+
+BENCHMARK_GROUPS = {'tracking': benchmark_tracking,
+					'history': benchmark_history,
+					'rendering': benchmark_rendering}
+
+def get_metadata():
+	return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'python': platform.python_version(),
+			'numpy': np.__version__,
+			'matplotlib': matplotlib.__version__,
+			'platform': platform.platform(),
+			'processor': platform.processor()}
+
+def get_result_key(result):
+	return result['group'], result['name'], json.dumps(result['params'], sort_keys=True)
+
+#Print the median time of every result relative to the matching result of a baseline run. Ratios above 1 are slower.
+def compare_results(results, baseline_results):
+	baseline = {get_result_key(result): result for result in baseline_results}
+	for result in results:
+		baseline_result = baseline.get(get_result_key(result))
+		if baseline_result is None:
+			continue
+		ratio = result['seconds_median'] / baseline_result['seconds_median']
+		print(f"{result['group']:10} {result['name']:25} {json.dumps(result['params']):45} {ratio:6.2f}x")
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark tracking, history queries and plot rendering.')
+	parser.add_argument('--groups', nargs='+', choices=list(BENCHMARK_GROUPS), default=list(BENCHMARK_GROUPS), help='benchmark groups to run')
+	parser.add_argument('--repeats', type=int, default=5, help='timed runs per case')
+	parser.add_argument('--json', dest='json_path', default=None, help='write the results to this json file')
+	parser.add_argument('--compare', default=None, help='json file of an earlier run to compare against')
+	args = parser.parse_args(argv)
+
+	results = []
+	for group in args.groups:
+		for result in BENCHMARK_GROUPS[group](DEFAULT_SIZES, args.repeats):
+			throughput = f"  {result['throughput']:.3g} {result['throughput_unit']}" if 'throughput' in result else ''
+			print(f"{result['group']:10} {result['name']:25} {json.dumps(result['params']):45} {result['seconds_median'] * 1000:10.3f} ms{throughput}")
+			results.append(result)
+
+	if args.json_path is not None:
+		with open(args.json_path, 'w') as json_file:
+			json.dump({'metadata': get_metadata(), 'results': results}, json_file, indent=1)
+
+	if args.compare is not None:
+		with open(args.compare) as baseline_file:
+			baseline_results = json.load(baseline_file)['results']
+		print('\nmedian time relative to', args.compare)
+		compare_results(results, baseline_results)
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+'''Import-time harness. Imports each module listed in import_budget.json in a fresh interpreter with -X importtime,'''
+'''keeps the fastest cumulative time over several repeats, and fails if a module is over its budget or imports a forbidden package.'''
+'''The startup entry times the real startup path, importing main and building the window up to its first update, also in a fresh interpreter.'''
+'''It needs a display and is reported as skipped without one.'''
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_budget.json')
+
+#Returns ({imported module name: cumulative microseconds}) for one cold import of module
+def measure_import(module):
+	completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+							   cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+	cumulative_times = {}
+	for line in completed.stderr.splitlines():
+		if not line.startswith('import time:') or 'cumulative' in line:
+			continue
+		_, cumulative, name = line[len('import time:'):].split('|')
+		cumulative_times[name.strip()] = int(cumulative)
+	return cumulative_times
+
+#main.build_window is everything main.py does before mainloop
+STARTUP_SCRIPT = '''
+import sys, time
+start_time = time.perf_counter()
+import tkinter
+try:
+	import main
+	root = main.build_window()
+	root.update()
+except tkinter.TclError:
+	sys.exit(3)
+print((time.perf_counter() - start_time) * 1000)
+print(' '.join(sorted(sys.modules)))
+root.destroy()
+'''
+NO_DISPLAY_EXIT_CODE = 3
+
+#Returns (milliseconds, imported module names) for one cold start of the window, or None when there is no display
+def measure_startup():
+	completed = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=REPO_ROOT, capture_output=True, text=True)
+	if completed.returncode == NO_DISPLAY_EXIT_CODE:
+		return None
+	completed.check_returncode()
+	startup_ms, imported = completed.stdout.splitlines()[:2]
+	return float(startup_ms), set(imported.split())
+
+def check_startup_budget(limits, repeats):
+	measurements = [measure_startup() for _ in range(repeats)]
+	if measurements[0] is None:
+		return {'import_ms': None, 'budget_ms': limits['budget_ms'], 'forbidden_imports': [], 'passed': True, 'skipped': True}
+
+	startup_ms = min(measurement[0] for measurement in measurements)
+	forbidden = sorted(package for package in limits.get('forbidden', []) if package in measurements[0][1])
+	return {'import_ms': startup_ms,
+			'budget_ms': limits['budget_ms'],
+			'forbidden_imports': forbidden,
+			'passed': startup_ms <= limits['budget_ms'] and not forbidden}
+
+def check_budgets(budget_path=DEFAULT_BUDGET_PATH, repeats=None):
+	with open(budget_path) as budget_file:
+		budget = json.load(budget_file)
+	repeats = repeats or budget.get('repeats', 1)
+
+	results = {}
+	for module, limits in budget['modules'].items():
+		measurements = [measure_import(module) for _ in range(repeats)]
+		import_ms = min(measurement[module] for measurement in measurements) / 1000
+		imported = set(measurements[0])
+		forbidden = sorted(package for package in limits.get('forbidden', []) if package in imported)
+
+		results[module] = {'import_ms': import_ms,
+						   'budget_ms': limits['budget_ms'],
+						   'forbidden_imports': forbidden,
+						   'passed': import_ms <= limits['budget_ms'] and not forbidden}
+
+	if 'startup' in budget:
+		results['startup'] = check_startup_budget(budget['startup'], repeats)
+	return results
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Measure cold import times against the tracked budget.')
+	parser.add_argument('--budget', default=DEFAULT_BUDGET_PATH, help='path of the budget json file')
+	parser.add_argument('--repeats', type=int, default=None, help='overrides the repeats in the budget file')
+	parser.add_argument('--json', dest='json_path', default=None, help='also write the results to this json file')
+	args = parser.parse_args(argv)
+
+	results = check_budgets(args.budget, args.repeats)
+	for module, result in results.items():
+		if result.get('skipped'):
+			print(f"skip  {module:45} no display")
+			continue
+		status = 'ok' if result['passed'] else 'OVER'
+		forbidden = f"  forbidden: {', '.join(result['forbidden_imports'])}" if result['forbidden_imports'] else ''
+		print(f"{status:4}  {module:45} {result['import_ms']:8.1f} ms / {result['budget_ms']} ms{forbidden}")
+
+	if args.json_path is not None:
+		with open(args.json_path, 'w') as json_file:
+			json.dump(results, json_file, indent=1)
+
+	return 0 if all(result['passed'] for result in results.values()) else 1
+
+if __name__ == '__main__':
+	sys.exit(main())
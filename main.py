@@ -4,15 +4,22 @@ from presenter.presenter import Presenter
 from view.single_particle_view import SingleParticleView
 from model.model import Model
 from view.compound_widgets.transverse_plots_widget import TransversePlotsWidget
+from view.compound_widgets.stability_map_widget import StabilityMapWidget
 from view.theme_applier import RecursiveKeyWordSetter, RecursiveBindSetter
 
-if __name__ == '__main__':	
+#Build the themed window with its presenter and model. Separate from mainloop so startup can be timed, see benchmarks/import_time.py
+def build_window():
 	root = tk.Tk()
 	root.title('Single Particle Dynamics')
 	view = SingleParticleView(root)
 	model = Model()
 	presenter = Presenter(view, model)
 
+	def close():
+		presenter.close()
+		root.destroy()
+	root.protocol('WM_DELETE_WINDOW', close)
+
 	dark = '#282828'
 	mid = '#303030'
 	text_dark = '#5f8cad'
@@ -30,6 +37,7 @@ if __name__ == '__main__':
 	theme_setter.set_config(tk.Canvas, bg=mid)
 	theme_setter.set_config(tk.Frame, bg=mid)
 	theme_setter.set_config(TransversePlotsWidget, bg=dark, fg=text_light, marker_color=highlight)
+	theme_setter.set_config(StabilityMapWidget, bg=dark, fg=text_light, marker_color=highlight)
 	theme_setter.apply_configs(root)
 
 	bind_setter = RecursiveBindSetter()
@@ -38,4 +46,7 @@ if __name__ == '__main__':
 	bind_setter.set_bind(tk.Button, '<Leave>', lambda event: event.widget.configure(bg=mid))
 	bind_setter.set_bind(tk.Entry, '<Leave>', lambda event: event.widget.configure(bg=mid))
 	bind_setter.apply_binds(root)
-	root.mainloop()
\ No newline at end of file
+	return root
+
+if __name__ == '__main__':
+	build_window().mainloop()
@@ -1,4 +1,22 @@
-from .particle import Particle
-from .lattice import Lattice
+import importlib
 
-__all__ = ['Particle', 'Lattice']
\ No newline at end of file
+#Submodules are imported on first attribute access, so importing the package alone does not pull in numpy
+_lazy_imports = {'Particle': 'particle',
+				 'Beam': 'beam',
+				 'BeamStatistics': 'beam_statistics',
+				 'make_distribution': 'distributions',
+				 'Lattice': 'lattice',
+				 'Beamline': 'beamline',
+				 'LatticeAnalysis': 'lattice_analysis',
+				 'ParameterScan': 'parameter_scan',
+				 'DynamicAperture': 'dynamic_aperture',
+				 'ParallelTracker': 'parallel_tracker',
+				 'OrbitStore': 'orbit_store',
+				 'Session': 'session'}
+
+__all__ = list(_lazy_imports)
+
+def __getattr__(name):
+	if name not in _lazy_imports:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	return getattr(importlib.import_module(f'.{_lazy_imports[name]}', __name__), name)
\ No newline at end of file
@@ -0,0 +1,18 @@
+import numpy as np
+
+'''A Beam holds many particles as a single 3xN numpy array so that each lattice element can be applied to all of them in one matmul.'''
+class Beam():
+	def __init__(self, x, xp, s=0):
+		#self.coordinates is a 3xN numpy array. Rows are x, xp, s respectively, columns are particles
+		self.coordinates = np.array(np.broadcast_arrays(x, xp, s), dtype=float).reshape(3, -1)
+
+	@property
+	def num_particles(self):
+		return self.coordinates.shape[1]
+
+	def commit_to_orbit(self, beam_orbit):
+		#only the final coordinates are kept, so a continued run picks up where the last one stopped
+		self.coordinates = np.array(beam_orbit[-1])
+
+	def get_last_value(self):
+		return self.coordinates
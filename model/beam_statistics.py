@@ -0,0 +1,60 @@
+import numpy as np
+
+'''BeamStatistics accumulates the first and second moments of (x, xp) at every sample point of a lattice, one block of particles at a time.'''
+'''Blocks are merged with the pairwise form of Welford's update, so the result does not depend on how the beam is split
+and no block, or orbit, has to be kept once it has been added. Centered co-moments avoid the cancellation of summing raw squares.'''
+class BeamStatistics:
+	def __init__(self, num_samples):
+		self.num_samples = num_samples
+		self.counts = np.zeros(num_samples)
+		self.means = np.zeros((num_samples, 2)) #x, xp
+		self.comoments = np.zeros((num_samples, 2, 2)) #sums of centered products, covariance * count
+		self.s = np.full(num_samples, np.nan) #s of each sample point, taken from the first block
+
+	#Add a block of 3xn coordinates, all at sample_index
+	def update(self, sample_index, coordinates):
+		num_added = coordinates.shape[1]
+		if num_added == 0:
+			return
+		block_mean = coordinates[:2].mean(axis=1)
+		centered = coordinates[:2] - block_mean[:, None]
+		self._merge(sample_index, num_added, block_mean, centered @ centered.T)
+		if np.isnan(self.s[sample_index]):
+			self.s[sample_index] = coordinates[2, 0]
+
+	#Combine with statistics of another set of particles over the same sample points, e.g. from another worker
+	def merge(self, other):
+		if other.num_samples != self.num_samples:
+			raise ValueError(f"Cannot merge statistics over {other.num_samples} samples into {self.num_samples}")
+		for sample_index in np.flatnonzero(other.counts):
+			self._merge(sample_index, other.counts[sample_index], other.means[sample_index], other.comoments[sample_index])
+		self.s = np.where(np.isnan(self.s), other.s, self.s)
+
+	def _merge(self, sample_index, num_added, added_mean, added_comoment):
+		count = self.counts[sample_index]
+		total = count + num_added
+		delta = added_mean - self.means[sample_index]
+		self.means[sample_index] += delta * (num_added / total)
+		self.comoments[sample_index] += added_comoment + np.outer(delta, delta) * (count * num_added / total)
+		self.counts[sample_index] = total
+
+	#(num_samples, 2, 2) covariance of (x, xp)
+	def get_covariance(self):
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return self.comoments / self.counts[:, None, None]
+
+	#(num_samples, 2) mean (x, xp)
+	def get_centroid(self):
+		return self.means
+
+	def get_rms_size(self):
+		return np.sqrt(self.get_covariance()[:, 0, 0])
+
+	def get_rms_divergence(self):
+		return np.sqrt(self.get_covariance()[:, 1, 1])
+
+	#sqrt(<x**2><xp**2> - <x xp>**2) of the centered beam
+	def get_rms_emittance(self):
+		covariance = self.get_covariance()
+		determinant = covariance[:, 0, 0] * covariance[:, 1, 1] - covariance[:, 0, 1] ** 2
+		return np.sqrt(np.maximum(determinant, 0))
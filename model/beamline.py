@@ -0,0 +1,85 @@
+import numpy as np
+
+'''A Beamline describes one cell of a lattice as parallel arrays of element types, lengths, strengths and subdivisions.'''
+'''It only holds the description. Lattice compiles it into stacked transfer matrices and s-offsets, so machines with any number
+of distinct elements track through the same loop as the FODO cell.'''
+'''QUAD strength is the integrated focusing 1/f, positive focuses. A QUAD of length 0 is a thin lens, otherwise an exact thick quad.'''
+'''SEXTUPOLE is a thin nonlinear kick xp -> xp - strength * x**2 / 2, strength being the integrated k2 * L. Sextupoles must have length 0.'''
+'''divisions only set how densely an element is sampled, every element map is exact.'''
+DRIFT = 0
+QUAD = 1
+SEXTUPOLE = 2
+
+ELEMENT_NAMES = {DRIFT: 'drift', QUAD: 'quad', SEXTUPOLE: 'sextupole'}
+ELEMENT_TYPES = {name: element_type for element_type, name in ELEMENT_NAMES.items()}
+
+class Beamline:
+	def __init__(self, element_types, lengths, strengths, divisions=None):
+		self.element_types = np.asarray(element_types, dtype=np.int8)
+		self.lengths = np.asarray(lengths, dtype=float)
+		self.strengths = np.asarray(strengths, dtype=float)
+		self.divisions = np.ones(len(self.element_types), dtype=np.int64) if divisions is None else np.asarray(divisions, dtype=np.int64)
+
+		if not (self.element_types.shape == self.lengths.shape == self.strengths.shape == self.divisions.shape) or self.element_types.ndim != 1:
+			raise ValueError("element_types, lengths, strengths and divisions must be 1d arrays of the same length")
+		if not np.isin(self.element_types, list(ELEMENT_NAMES)).all():
+			raise ValueError(f"Unknown element types {sorted(set(self.element_types.tolist()) - set(ELEMENT_NAMES))}")
+		if (self.lengths < 0).any():
+			raise ValueError("Element lengths must be non-negative")
+		if (self.divisions < 1).any():
+			raise ValueError("Element divisions must be positive integers")
+		if (self.lengths[self.element_types == SEXTUPOLE] != 0).any():
+			raise ValueError("Sextupoles are thin elements and must have length 0")
+
+		#arrays are shared with compiled lattices and used as cache keys, so they must not change after construction
+		for array in (self.element_types, self.lengths, self.strengths, self.divisions):
+			array.flags.writeable = False
+
+	#elements is an iterable of (type name, length, strength) or (type name, length, strength, divisions)
+	@classmethod
+	def from_elements(cls, elements):
+		elements = [tuple(element) + (1,) * (4 - len(element)) for element in elements]
+		if not elements:
+			raise ValueError("A beamline needs at least one element")
+		names, lengths, strengths, divisions = zip(*elements)
+		return cls([ELEMENT_TYPES[name] for name in names], lengths, strengths, divisions)
+
+	#One FODO cell in tracking order: F-quad, drift, D-quad, drift. quad_length=None makes thin quads.
+	@classmethod
+	def make_fodo(cls, drift_length, focal_length, quad_divisions=5, drift_divisions=5, quad_length=None):
+		quad_length = 0 if quad_length is None else quad_length
+		return cls([QUAD, DRIFT, QUAD, DRIFT],
+				   [quad_length, drift_length, quad_length, drift_length],
+				   [1 / focal_length, 0, -1 / focal_length, 0],
+				   [quad_divisions, drift_divisions, quad_divisions, drift_divisions])
+
+	@classmethod
+	def from_dict(cls, description):
+		return cls.from_elements(description['elements'])
+
+	def to_dict(self):
+		return {'elements': [(ELEMENT_NAMES[int(element_type)], float(length), float(strength), int(divisions))
+							 for element_type, length, strength, divisions in zip(self.element_types, self.lengths, self.strengths, self.divisions)]}
+
+	@property
+	def num_elements(self):
+		return len(self.element_types)
+
+	#number of sampled sub-elements once every element is split into its divisions
+	@property
+	def num_sub_elements(self):
+		return int(self.divisions.sum())
+
+	#True when every element is a linear map
+	@property
+	def is_linear(self):
+		return not (self.element_types == SEXTUPOLE).any()
+
+	@property
+	def length(self):
+		return float(self.lengths.sum())
+
+	#Hashable and equal for beamlines that compile to the same lattice
+	@property
+	def key(self):
+		return (self.element_types.tobytes(), self.lengths.tobytes(), self.strengths.tobytes(), self.divisions.tobytes())
@@ -0,0 +1,43 @@
+import numpy as np
+
+'''Particle distributions matched to Twiss parameters, generated directly as 3xN (x, xp, s) arrays.'''
+'''Each distribution is drawn in normalized phase space (u, v), where the matched ellipse is a circle, then mapped to
+x = sqrt(beta) * u, xp = (v - alpha * u) / sqrt(beta). The rms emittance of every distribution is the requested emittance.'''
+'''The waterbag and KV distributions are defined in 4D (x, xp, y, yp). This model has one plane, so each is generated as its 2D projection:'''
+'''the 4D waterbag, uniform inside a hyperellipsoid, projects to a parabolic density 1 - r**2 / R**2, and the 4D KV, on the hyperellipsoid's surface, projects to a uniform ellipse.'''
+
+#Standard normal in u and v, sigma = sqrt(emittance)
+def _make_gaussian_normalized(rng, num_particles, emittance):
+	return rng.normal(0, np.sqrt(emittance), (2, num_particles))
+
+#Density 1 - r**2 / R**2 over a disc, with <u**2> = R**2 / 6, so R = sqrt(6 * emittance).
+#(r / R)**2 = t has density 2 * (1 - t), which is 1 - sqrt(q) for q uniform on [0, 1).
+def _make_waterbag_normalized(rng, num_particles, emittance):
+	radius = np.sqrt(6 * emittance) * np.sqrt(1 - np.sqrt(rng.random(num_particles)))
+	angle = rng.uniform(0, 2 * np.pi, num_particles)
+	return np.vstack([radius * np.cos(angle), radius * np.sin(angle)])
+
+#Uniform over a disc. A disc of radius R has <u**2> = R**2 / 4, so R = 2 * sqrt(emittance)
+def _make_kv_normalized(rng, num_particles, emittance):
+	radius = 2 * np.sqrt(emittance) * np.sqrt(rng.random(num_particles))
+	angle = rng.uniform(0, 2 * np.pi, num_particles)
+	return np.vstack([radius * np.cos(angle), radius * np.sin(angle)])
+
+DISTRIBUTIONS = {'gaussian': _make_gaussian_normalized,
+				 'waterbag': _make_waterbag_normalized,
+				 'kv': _make_kv_normalized}
+
+#3xN coordinates of kind ('gaussian', 'waterbag' or 'kv') matched to (beta, alpha) with the given rms emittance.
+#centroid is the (x, xp) the distribution is centered on. seed makes the draw reproducible.
+def make_distribution(kind, num_particles, emittance, beta, alpha, centroid=(0, 0), s=0, seed=None):
+	if kind not in DISTRIBUTIONS:
+		raise ValueError(f"Unknown distribution {kind}, expected one of {list(DISTRIBUTIONS)}")
+	if emittance < 0 or beta <= 0:
+		raise ValueError(f"emittance must be non-negative and beta positive, got {emittance} and {beta}")
+
+	u, v = DISTRIBUTIONS[kind](np.random.default_rng(seed), num_particles, emittance)
+	coordinates = np.empty((3, num_particles))
+	coordinates[0] = np.sqrt(beta) * u + centroid[0]
+	coordinates[1] = (v - alpha * u) / np.sqrt(beta) + centroid[1]
+	coordinates[2] = s
+	return coordinates
@@ -0,0 +1,60 @@
+import numpy as np
+from .tracking import advance_cells
+
+'''DynamicAperture tracks a dense (x, xp) grid of initial conditions as one beam and records how many cells each one survives.'''
+'''A particle is lost once |x| exceeds the aperture or its coordinates stop being finite. Lost particles are dropped from the working arrays,
+so later cells only cost as much as the particles still circulating.'''
+class DynamicAperture:
+	def __init__(self, lattice, x_values, xp_values, aperture):
+		if aperture <= 0:
+			raise ValueError(f"aperture must be positive, got {aperture}")
+		self.lattice = lattice
+		self.x_values = np.asarray(x_values, dtype=float)
+		self.xp_values = np.asarray(xp_values, dtype=float)
+		self.aperture = aperture
+
+		#rows of every result map to xp_values, columns to x_values, matching pcolormesh(x_values, xp_values, result)
+		self.shape = (len(self.xp_values), len(self.x_values))
+		self.survival_cells = None #set by track, number of cells each initial condition survived
+
+	#Track every grid point through lattice.num_cells cells. Returns survival_cells, or None when cancelled.
+	#on_progress(fraction) and is_cancelled() are called every cell.
+	def track(self, on_progress=None, is_cancelled=None):
+		x_grid, xp_grid = np.meshgrid(self.x_values, self.xp_values)
+		num_particles = x_grid.size
+		current = np.vstack([x_grid.ravel(), xp_grid.ravel(), np.zeros(num_particles)])
+		scratch = np.empty_like(current)
+		alive_indices = np.arange(num_particles)
+
+		num_cells = self.lattice.num_cells
+		survival_cells = np.full(num_particles, num_cells)
+		segments = self.lattice.get_kick_drift_segments()
+		with np.errstate(over='ignore', invalid='ignore'):
+			for cell in range(num_cells):
+				if is_cancelled is not None and is_cancelled():
+					return None
+				if not len(alive_indices):
+					break
+
+				current, scratch = advance_cells(current, scratch, segments, 1)
+				is_lost = ~(np.abs(current[0]) <= self.aperture) | ~np.isfinite(current[1])
+				if is_lost.any():
+					survival_cells[alive_indices[is_lost]] = cell
+					is_kept = ~is_lost
+					alive_indices = alive_indices[is_kept]
+					current = np.ascontiguousarray(current[:, is_kept])
+					scratch = np.empty_like(current)
+
+				if on_progress is not None:
+					on_progress((cell + 1) / num_cells)
+
+		self.survival_cells = survival_cells.reshape(self.shape)
+		return self.survival_cells
+
+	#True where the initial condition survived every cell
+	def get_survivors(self):
+		return self.survival_cells == self.lattice.num_cells
+
+	#Fraction of the grid that survived every cell
+	def get_survival_fraction(self):
+		return float(np.mean(self.get_survivors()))
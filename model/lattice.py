@@ -1,32 +1,191 @@
 import numpy as np
+from .beamline import Beamline, DRIFT, QUAD, SEXTUPOLE
 '''Defines transfer matrices from give lattice parameters.'''
 '''Supports optionally subdividing lattice elements via quad_divisions and drift_divisions. Default is 5 subdivisions.'''
+'''By default quads are thin lenses. With a quad_length, quads are thick elements with exact cos/sin (cosh/sinh) maps and the same integrated strength 1/focal_length.'''
+'''Every element map is exact, so subdivisions only set how densely the orbit is sampled. quad_divisions = drift_divisions = 1 gives exact cell endpoints at the lowest cost.'''
+'''The constructor builds a FODO cell. Lattice.from_beamline builds a lattice from any Beamline, both compile to the same element tables.'''
+'''Thin sextupoles compile to identity matrices plus a nonzero entry in cell_kicks, applied after the matrix by every tracker.'''
+'''cell_matrix, get_cell_map and LatticeAnalysis only describe the linear part, which is exact on axis, where sextupole kicks vanish.'''
 class Lattice:
-	def __init__(self, drift_length, focal_length, num_cells, quad_divisions = 5, drift_divisions = 5):
+	def __init__(self, drift_length, focal_length, num_cells, quad_divisions = 5, drift_divisions = 5, quad_length = None):
 		self.focal_length = focal_length
 		self.drift_length = drift_length
-		self.num_cells = num_cells
+		self.quad_length = quad_length
 
 		self.quad_divisions = quad_divisions
 		self.drift_divisions = drift_divisions
-		self.num_cell_elements = 2*(drift_divisions + quad_divisions)
 
-		self.fquad_matrix = np.array([[1, 0, 0], 
-									  [(-1/ (focal_length * quad_divisions)), 1, 0], 
-									  [0, 0, 1]])
+		self._set_beamline(Beamline.make_fodo(drift_length, focal_length, quad_divisions, drift_divisions, quad_length), num_cells)
+
+	#Lattice of num_cells repetitions of beamline. The FODO attributes (drift_length, focal_length, ...) are None.
+	@classmethod
+	def from_beamline(cls, beamline, num_cells):
+		lattice = cls.__new__(cls)
+		lattice.focal_length = lattice.drift_length = lattice.quad_length = None
+		lattice.quad_divisions = lattice.drift_divisions = None
+		lattice._set_beamline(beamline, num_cells)
+		return lattice
+
+	def _set_beamline(self, beamline, num_cells):
+		self.beamline = beamline
+		self.num_cells = num_cells
+
+		#Stacked element tables for one cell, in tracking order, one entry per sub-element.
+		#cell_matrices is num_cell_elements x 3 x 3, cell_s_vectors is num_cell_elements x 3 x 1,
+		#cell_kicks is num_cell_elements sextupole strengths, 0 for linear elements.
+		self.cell_matrices, self.cell_s_vectors, self.cell_kicks = self.compile_beamline(beamline)
+		self.num_cell_elements = len(self.cell_matrices)
+		self.is_linear = beamline.is_linear
+		self._kick_drift_segments = None
+
+		#Composite map for one full cell, x_next = cell_matrix @ x + cell_s_vector. Precomputed once per lattice.
+		self.cell_matrix, self.cell_s_vector = self._compose_elements(self.cell_matrices, self.cell_s_vectors)
+		#Maps from the start of a cell to the end of each of its sub-elements, num_cell_elements x 3 x 3 and num_cell_elements x 3.
+		#Every sample of one cell of a linear lattice is then one batched matmul from the cell's starting coordinates.
+		self.cell_prefix_matrices, self.cell_prefix_s_vectors = self._get_prefix_maps(self.cell_matrices, self.cell_s_vectors)
+		self._cell_map_cache = {1: (self.cell_matrix, self.cell_s_vector)}
+
+	#Every input that determines the lattice. Two lattices with equal parameters track identically.
+	@property
+	def parameters(self):
+		return self.beamline.key + (int(self.num_cells),)
+
+	#One cell as a list of (matrix, s_vector, kick), each linear run of sub-elements composed into one map followed by one sextupole kick.
+	#The last segment has kick 0. Used by the kick-drift tracker, which only samples cell boundaries.
+	def get_kick_drift_segments(self):
+		if self._kick_drift_segments is None:
+			segments = []
+			matrix, s_vector = np.identity(3), np.zeros((3, 1))
+			for element_matrix, element_s_vector, kick in zip(self.cell_matrices, self.cell_s_vectors, self.cell_kicks):
+				matrix, s_vector = self._compose_maps(matrix, s_vector, element_matrix, element_s_vector)
+				if kick:
+					segments.append((matrix, s_vector, kick))
+					matrix, s_vector = np.identity(3), np.zeros((3, 1))
+			segments.append((matrix, s_vector, 0.0))
+			self._kick_drift_segments = segments
+		return self._kick_drift_segments
+
+	#(cell_matrices, cell_s_vectors, cell_kicks) of a beamline. The map of one slice is built per element type in bulk,
+	#then each slice is repeated divisions times, so the cost does not grow with the number of sub-elements per element.
+	@classmethod
+	def compile_beamline(cls, beamline):
+		element_types, strengths, divisions = beamline.element_types, beamline.strengths, beamline.divisions
+		slice_lengths = beamline.lengths / divisions
+
+		matrices = np.empty((beamline.num_elements, 3, 3))
+		is_drift = element_types == DRIFT
+		is_thin_quad = (element_types == QUAD) & (beamline.lengths == 0)
+		is_thick_quad = (element_types == QUAD) & (beamline.lengths > 0)
+
+		matrices[is_drift] = cls.make_drift_matrix(slice_lengths[is_drift])
+		#focusing quads have positive strength and a negative kick
+		matrices[is_thin_quad] = cls.make_quad_matrix(-strengths[is_thin_quad] / divisions[is_thin_quad])
+		matrices[is_thick_quad] = cls.make_thick_quad_matrix(strengths[is_thick_quad] / beamline.lengths[is_thick_quad], slice_lengths[is_thick_quad])
+
+		#thin sextupoles are identity maps, their kick is split evenly over the divisions
+		is_sextupole = element_types == SEXTUPOLE
+		matrices[is_sextupole] = np.identity(3)
+		kicks = np.where(is_sextupole, strengths / divisions, 0.0)
+
+		s_vectors = np.zeros((beamline.num_elements, 3, 1))
+		s_vectors[:, 2, 0] = slice_lengths
+		return np.repeat(matrices, divisions, axis=0), np.repeat(s_vectors, divisions, axis=0), np.repeat(kicks, divisions)
+
+	#Approximate memory held by the lattice, its element tables and any cached cell maps
+	def get_num_bytes(self):
+		num_bytes = sum(value.nbytes for value in vars(self).values() if isinstance(value, np.ndarray))
+		return num_bytes + sum(matrix.nbytes + s_vector.nbytes for matrix, s_vector in self._cell_map_cache.values())
+
+	#Thin-lens kick matrix, xp -> xp + kick * x. kick may be an array, giving a (..., 3, 3) stack of matrices.
+	@staticmethod
+	def make_quad_matrix(kick):
+		kick = np.asarray(kick, dtype=float)
+		matrix = np.zeros(kick.shape + (3, 3))
+		matrix[..., 0, 0] = matrix[..., 1, 1] = matrix[..., 2, 2] = 1
+		matrix[..., 1, 0] = kick
+		return matrix
+
+	#Exact map through a quad of strength k and length. k > 0 focuses (cos, sin), k < 0 defocuses (cosh, sinh), k = 0 is a drift.
+	#strength and length may be arrays, giving a (..., 3, 3) stack of matrices.
+	@staticmethod
+	def make_thick_quad_matrix(strength, length):
+		strength, length = np.broadcast_arrays(np.asarray(strength, dtype=float), np.asarray(length, dtype=float))
+		omega = np.sqrt(np.abs(strength))
+		phase = omega * length
+		is_focusing = strength > 0
+
+		cos_like = np.where(is_focusing, np.cos(phase), np.cosh(phase))
+		sin_like = np.where(is_focusing, np.sin(phase), np.sinh(phase))
+		#sin(omega * length) / omega tends to length as omega -> 0
+		sin_over_omega = np.divide(sin_like, omega, out=length.copy(), where=omega > 0)
+
+		matrix = np.zeros(strength.shape + (3, 3))
+		matrix[..., 0, 0] = matrix[..., 1, 1] = cos_like
+		matrix[..., 0, 1] = sin_over_omega
+		matrix[..., 1, 0] = np.where(is_focusing, -omega, omega) * sin_like
+		matrix[..., 2, 2] = 1
+		return matrix
+
+	#(F-quad, D-quad) matrices of one of quad_divisions slices. Thin slices are kicks of 1/(focal_length * quad_divisions),
+	#thick slices are exact maps of length quad_length / quad_divisions with strength 1/(focal_length * quad_length).
+	#focal_length may be an array, giving (..., 3, 3) stacks.
+	@classmethod
+	def make_quad_slice_matrices(cls, focal_length, quad_divisions, quad_length=None):
+		focal_length = np.asarray(focal_length, dtype=float)
+		if quad_length is None:
+			return cls.make_quad_matrix(-1 / (focal_length * quad_divisions)), cls.make_quad_matrix(1 / (focal_length * quad_divisions))
+
+		strength = 1 / (focal_length * quad_length)
+		slice_length = quad_length / quad_divisions
+		return cls.make_thick_quad_matrix(strength, slice_length), cls.make_thick_quad_matrix(-strength, slice_length)
+
+	#Drift matrix, x -> x + length * xp. length may be an array, giving a (..., 3, 3) stack of matrices.
+	@staticmethod
+	def make_drift_matrix(length):
+		length = np.asarray(length, dtype=float)
+		matrix = np.zeros(length.shape + (3, 3))
+		matrix[..., 0, 0] = matrix[..., 1, 1] = matrix[..., 2, 2] = 1
+		matrix[..., 0, 1] = length
+		return matrix
+
+	#Map that jumps num_cells full cells in one step. Uses exponentiation by squaring, so the cost is O(log num_cells).
+	def get_cell_map(self, num_cells):
+		if num_cells < 0:
+			raise ValueError(f"num_cells must be non-negative, got {num_cells}")
+		if num_cells in self._cell_map_cache:
+			return self._cell_map_cache[num_cells]
+
+		matrix, s_vector = np.identity(3), np.zeros((3, 1))
+		base_matrix, base_s_vector = self.cell_matrix, self.cell_s_vector
+		remaining = num_cells
+		while remaining:
+			if remaining & 1:
+				matrix, s_vector = self._compose_maps(matrix, s_vector, base_matrix, base_s_vector)
+			base_matrix, base_s_vector = self._compose_maps(base_matrix, base_s_vector, base_matrix, base_s_vector)
+			remaining >>= 1
 
-		self.dquad_matrix = np.array([[1, 0, 0], 
-									  [(1/(focal_length * quad_divisions)), 1, 0],
-									  [0, 0, 1]])
+		self._cell_map_cache[num_cells] = (matrix, s_vector)
+		return matrix, s_vector
 
-		self.drift_matrix = np.array([[1, (drift_length / drift_divisions), 0],
-									 [0, 1, 0], 
-									 [0, 0, 1]])
+	#Apply (first_matrix, first_s_vector) then (second_matrix, second_s_vector), returning the combined affine map
+	@staticmethod
+	def _compose_maps(first_matrix, first_s_vector, second_matrix, second_s_vector):
+		return second_matrix @ first_matrix, second_matrix @ first_s_vector + second_s_vector
 
-		self.quad_s_vector = np.array([[0],
-									   [0],
-									   [0]])
+	@classmethod
+	def _get_prefix_maps(cls, matrices, s_vectors):
+		prefix_matrices = np.empty(matrices.shape)
+		prefix_s_vectors = np.empty(s_vectors.shape[:2])
+		matrix, s_vector = np.identity(3), np.zeros((3, 1))
+		for index, (element_matrix, element_s_vector) in enumerate(zip(matrices, s_vectors)):
+			matrix, s_vector = cls._compose_maps(matrix, s_vector, element_matrix, element_s_vector)
+			prefix_matrices[index], prefix_s_vectors[index] = matrix, s_vector[:, 0]
+		return prefix_matrices, prefix_s_vectors
 
-		self.drift_s_vector = np.array([[0],
-										[0],
-										[drift_length / drift_divisions]])
+	@classmethod
+	def _compose_elements(cls, matrices, s_vectors):
+		matrix, s_vector = np.identity(3), np.zeros((3, 1))
+		for element_matrix, element_s_vector in zip(matrices, s_vectors):
+			matrix, s_vector = cls._compose_maps(matrix, s_vector, element_matrix, element_s_vector)
+		return matrix, s_vector
@@ -0,0 +1,65 @@
+import numpy as np
+
+'''LatticeAnalysis computes closed-form optics from a Lattice's composite cell matrix, instead of tracking a particle and inspecting the plot.'''
+'''A cell is stable when |trace| < 2 of its 2x2 (x, xp) block. Twiss functions are only defined for stable cells.'''
+class LatticeAnalysis:
+	def __init__(self, lattice):
+		self.lattice = lattice
+
+		self.trace = np.trace(lattice.cell_matrix[:2, :2])
+		is_stable, phase_advance, twiss = self.get_periodic_twiss(lattice.cell_matrix)
+		self.is_stable = bool(is_stable)
+		self.phase_advance = float(phase_advance) #radians per cell
+		self.beta, self.alpha, self.gamma = twiss
+
+	#number of betatron oscillations over all num_cells of the lattice
+	def get_tune(self):
+		return self.lattice.num_cells * self.phase_advance / (2 * np.pi)
+
+	def get_phase_advance_degrees(self):
+		return np.degrees(self.phase_advance)
+
+	#beta, alpha and gamma at the start of the cell and after each sub-element, as three arrays of length num_cell_elements+1.
+	def get_twiss_functions(self):
+		twiss = np.empty((self.lattice.num_cell_elements + 1, 3))
+		twiss[0] = self.beta, self.alpha, self.gamma
+
+		for index, matrix in enumerate(self.lattice.cell_matrices):
+			twiss[index + 1] = self.propagate_twiss(matrix, twiss[index])
+
+		return twiss[:, 0], twiss[:, 1], twiss[:, 2]
+
+	def get_max_beta(self):
+		beta, _, _ = self.get_twiss_functions()
+		return np.max(beta)
+
+	#Transform (beta, alpha, gamma) through a transfer matrix. matrix may be a stack of matrices (..., 3, 3) with matching stacked twiss (..., 3).
+	@staticmethod
+	def propagate_twiss(matrix, twiss):
+		m11, m12 = matrix[..., 0, 0], matrix[..., 0, 1]
+		m21, m22 = matrix[..., 1, 0], matrix[..., 1, 1]
+		beta, alpha, gamma = twiss[..., 0], twiss[..., 1], twiss[..., 2]
+
+		return np.stack([m11**2 * beta - 2 * m11 * m12 * alpha + m12**2 * gamma,
+						 -m11 * m21 * beta + (m11 * m22 + m12 * m21) * alpha - m12 * m22 * gamma,
+						 m21**2 * beta - 2 * m21 * m22 * alpha + m22**2 * gamma], axis=-1)
+
+	#Stability, phase advance and periodic (beta, alpha, gamma) of a cell matrix, or of a (..., 3, 3) stack of them.
+	#Only the 2x2 (x, xp) block matters, the s row is decoupled. Unstable entries get nan phase advance and twiss.
+	@staticmethod
+	def get_periodic_twiss(cell_matrix):
+		m11, m12 = cell_matrix[..., 0, 0], cell_matrix[..., 0, 1]
+		m21, m22 = cell_matrix[..., 1, 0], cell_matrix[..., 1, 1]
+
+		cos_phase_advance = (m11 + m22) / 2
+		is_stable = np.abs(cos_phase_advance) < 1
+
+		with np.errstate(invalid='ignore', divide='ignore'):
+			sin_phase_advance = np.sign(m12) * np.sqrt(1 - cos_phase_advance**2)
+			sin_phase_advance = np.where(is_stable, sin_phase_advance, np.nan)
+			phase_advance = np.arctan2(sin_phase_advance, cos_phase_advance) % (2 * np.pi)
+			twiss = np.stack([m12 / sin_phase_advance,
+							  (m11 - m22) / (2 * sin_phase_advance),
+							  -m21 / sin_phase_advance], axis=-1)
+
+		return is_stable, phase_advance, twiss
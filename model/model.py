@@ -1,22 +1,137 @@
+import os
+import queue
 import numpy as np
 from .particle import Particle
+from .beam import Beam
 from .lattice import Lattice
+from .lattice_analysis import LatticeAnalysis
+from .parameter_scan import ParameterScan
+from .dynamic_aperture import DynamicAperture
+from .parallel_tracker import ParallelTracker
+from .tracking import track_beam, get_sample_elements, track_kick_drift, track_beam_statistics, apply_sextupole_kick
+from .distributions import make_distribution
+from .orbit_store import OrbitStore
+from .session import Session
+from .result_cache import ResultCache
 
 class Model:
 	def __init__(self):
 		self.lattice = None
 
 		self.active_particle = None
-		self.active_orbit = []
+		self.active_orbit = None
 
 		self.particles = []
+		self.orbit_store = None #set by set_orbit_store, None keeps orbit history in the Particle buffers
+		self.session = None #set by start_session or load_session, records the lattice of every run next to its orbit store
+		#Running per-coordinate bounds over every committed orbit. Updated as orbits are committed, so queries never rescan history.
+		self.committed_orbit_max = None
+		self.committed_orbit_min = None
+
+		self.beam = None
+		self.beam_orbit = None
+		self.parallel_tracker = None #set by set_tracking_workers, None tracks beams on this process
+
+		#Lattices are cached by their parameters, single particle orbits by lattice parameters and starting coordinates.
+		#Rerunning the same inputs, e.g. after switching back to an exercise tab, skips both construction and tracking.
+		self.lattice_cache = ResultCache(max_bytes=16 * 2**20)
+		self.orbit_cache = ResultCache(max_bytes=256 * 2**20)
 
 	def clear_particles(self):
 		self.particles = []
 		self.active_particle = None
+		self.committed_orbit_max = None
+		self.committed_orbit_min = None
+		if self.session is not None:
+			self.session.clear()
+		elif self.orbit_store is not None:
+			self.orbit_store.clear()
+
+	#Keep committed orbits in an append-only memory-mapped file at path instead of in memory. Clears current particles.
+	def set_orbit_store(self, path):
+		self.session = None
+		self.orbit_store = OrbitStore(path) if path is not None else None
+		self.clear_particles()
+
+	#Record the current particles and every later committed orbit to a session directory at path.
+	#Existing orbits are written once here; after that each commit is appended as it happens, so there is no separate save step.
+	#Recording to the session that is already being recorded would replace the orbits it is about to copy, so it is refused.
+	def start_session(self, path):
+		if self.is_session_path(path):
+			raise ValueError(f"Already recording to {path}")
+		#Orbit store views are made before the new session replaces any files at path, so they keep reading the old data
+		previous_orbits = list(self.get_previous_orbits())
+		session = Session(path, 'w')
+		for particle_index, orbit_data in enumerate(previous_orbits):
+			session.orbit_store.append(particle_index, orbit_data)
+
+		for particle in self.particles:
+			particle.truncate_to_last_value()
+		self.session = session
+		self.orbit_store = session.orbit_store
+
+	#True when path is the directory of the current session
+	def is_session_path(self, path):
+		return self.session is not None and os.path.exists(path) and os.path.samefile(path, self.session.path)
+
+	#Replace the current particles with those of the session at path and keep recording to it.
+	#Orbits stay on disk and are memory-mapped on demand, only the last coordinates of each particle are read.
+	def load_session(self, path):
+		session = Session(path, 'a')
+		self.session = session
+		self.orbit_store = session.orbit_store
+
+		self.particles = [Particle(*self.orbit_store.get_last_value(particle_index)[:, 0]) for particle_index in range(self.orbit_store.num_particles)]
+		self.active_particle = self.particles[-1] if self.particles else None
+		self.active_orbit = None
+		if self.particles:
+			self.committed_orbit_max, self.committed_orbit_min = self.orbit_store.get_orbit_bounds()
+		else:
+			self.committed_orbit_max, self.committed_orbit_min = None, None
+		return session
+
+	#quad_length=None models quads as thin lenses, otherwise as exact thick elements. See Lattice.
+	def set_lattice(self, drift_length, focal_length, num_cells, quad_divisions=5, drift_divisions=5, quad_length=None):
+		key = (float(drift_length), float(focal_length), int(num_cells), int(quad_divisions), int(drift_divisions),
+			   None if quad_length is None else float(quad_length))
+		lattice = self.lattice_cache.get(key)
+		if lattice is None:
+			lattice = Lattice(drift_length, focal_length, num_cells, quad_divisions, drift_divisions, quad_length)
+			self.lattice_cache.put(key, lattice, lattice.get_num_bytes())
+		self.lattice = lattice
+
+	#Lattice of num_cells repetitions of any Beamline, cached like set_lattice
+	def set_beamline(self, beamline, num_cells):
+		key = beamline.key + (int(num_cells),)
+		lattice = self.lattice_cache.get(key)
+		if lattice is None:
+			lattice = Lattice.from_beamline(beamline, num_cells)
+			self.lattice_cache.put(key, lattice, lattice.get_num_bytes())
+		self.lattice = lattice
+
+	def analyze_lattice(self):
+		if self.lattice is None:
+			raise AttributeError(f"Lattice is not set")
+		return LatticeAnalysis(self.lattice)
 
-	def set_lattice(self, drift_length, focal_length, num_cells, quad_divisions=5, drift_divisions=5):
-		self.lattice = Lattice(drift_length, focal_length, num_cells, quad_divisions, drift_divisions)
+	#Optics over a full drift_lengths x focal_lengths grid, computed in one batch without building a Lattice per point.
+	#The grid is one batch, so on_progress and is_cancelled are only checked before and after it. Does not touch model state
+	#and can run off the Tk thread like calculate_orbit. Returns a ParameterScan, or None when cancelled.
+	def scan_lattice_parameters(self, drift_lengths, focal_lengths, quad_divisions=5, drift_divisions=5, quad_length=None, on_progress=None, is_cancelled=None):
+		if is_cancelled is not None and is_cancelled():
+			return None
+		scan = ParameterScan(drift_lengths, focal_lengths, quad_divisions, drift_divisions, quad_length)
+		if on_progress is not None:
+			on_progress(1)
+		return scan
+
+	#Survival map of an (x, xp) grid of initial conditions through lattice, tracked as one beam. Returns a DynamicAperture,
+	#or None when cancelled. Takes the lattice as an argument and only reads it, so it can run off the Tk thread.
+	def calculate_dynamic_aperture(self, lattice, x_values, xp_values, aperture, on_progress=None, is_cancelled=None):
+		dynamic_aperture = DynamicAperture(lattice, x_values, xp_values, aperture)
+		if dynamic_aperture.track(on_progress, is_cancelled) is None:
+			return None
+		return dynamic_aperture
 
 	def get_num_lattice_elements(self):
 		return self.lattice.num_cell_elements
@@ -26,11 +141,14 @@ class Model:
 		new_particle = Particle(x, xp, s)
 		self.particles.append(new_particle)
 		self.set_active_particle(-1)
+		if self.orbit_store is not None:
+			self.orbit_store.append(len(self.particles) - 1, new_particle.get_orbit_data())
+		self._update_orbit_bounds(new_particle.get_last_value())
 
 	#Take particle at index, set it as the active particle. 
 	def stage_particle(self, index):
 		self.set_active_particle(index)
-		self.active_orbit = self.particles[index]
+		self.active_orbit = None
 
 	def set_active_particle(self, index):
 		self.active_particle = self.particles[index]
@@ -44,47 +162,289 @@ class Model:
 		self.active_orbit = self.calculate_orbit(self.active_particle, self.lattice)
 
 
+	#s coordinate the active particle reaches at the end of the lattice, known from the cell map without tracking
+	def get_final_s(self):
+		_, s_vector = self.lattice.get_cell_map(self.lattice.num_cells)
+		return self.active_particle.get_last_value()[2, 0] + s_vector[2, 0]
+
+	#Used when the orbit was calculated elsewhere, e.g. by calculate_orbit on a worker thread
+	def set_active_orbit(self, orbit):
+		self.active_orbit = orbit
+
 	def get_active_orbit_data(self):
-		# massage the orbit into a 3xn numpy array where n is the number on elements in self.orbit. Rows map to coordinate_index
-		return np.hstack(self.active_orbit)
+		#3xn numpy array where n is the number of elements in the orbit. Rows map to coordinate_index
+		return self.active_orbit
 
+	#With an orbit store, orbits are read lazily one particle at a time as the result is iterated.
+	#Each orbit is a memmap view, only a particle committed in interleaved pieces is copied, see OrbitStore.
 	def get_previous_orbits(self):
+		if self.orbit_store is not None:
+			return self.orbit_store.iter_orbits()
 		return [particle.get_orbit_data() for particle in self.particles]
 
 	def commit_active_orbit(self):
-		self.active_orbit.pop(0) #calculate_orbit causes a double-count between the first element of active_orbit and the last element of particle.orbit
-		self.active_particle.commit_to_orbit(self.active_orbit)
-
+		#calculate_orbit causes a double-count between the first column of active_orbit and the last value of particle.orbit
+		self._commit_orbit_chunk(self.active_orbit[:, 1:])
+		self._record_run(self.active_orbit.shape[1] - 1)
 		self.active_orbit = None
 
-	def calculate_orbit(self, particle, lattice):
-		current_orbit = [particle.orbit[-1]] #Grab the most recent coordinates for the particle.
+	#Streaming version of propagate_active_particle. Returns a generator of the orbit as 3xn chunks of cells_per_chunk cells,
+	#committing each chunk to the active particle as it goes. Preconditions are checked here, before the generator is made.
+	#Without chunk_queue each chunk is tracked when the generator is advanced. With one, chunks are taken from track_orbit_chunks
+	#running on another thread, and the generator yields None whenever no chunk is ready yet, so advancing it never blocks.
+	#Tracking only holds one chunk at a time. Committed chunks go to the orbit store when one is set, so memory stays bounded
+	#by the chunk size. Without a store they are copied into the Particle buffer, which grows with the orbit as usual.
+	def stream_active_particle(self, cells_per_chunk=1, chunk_queue=None):
+		if self.active_particle is None:
+			raise AttributeError(f"Active particle is not set")
+		if self.lattice is None:
+			raise AttributeError(f"Lattice is not set")
+		if cells_per_chunk < 1:
+			raise ValueError(f"cells_per_chunk must be a positive integer, got {cells_per_chunk}")
+
+		if chunk_queue is None:
+			orbit_chunks = self.iter_orbit_chunks(self.active_particle, self.lattice, cells_per_chunk)
+		else:
+			orbit_chunks = self._iter_queued_chunks(chunk_queue)
+		return self._stream_active_particle(orbit_chunks, self.lattice.num_cells * self.lattice.num_cell_elements)
+
+	def _stream_active_particle(self, orbit_chunks, num_samples):
+		num_committed = 0
+		for orbit_chunk in orbit_chunks:
+			if orbit_chunk is not None:
+				self._commit_orbit_chunk(orbit_chunk)
+				num_committed += orbit_chunk.shape[1]
+				#consumers such as the plots widget stop once they have every sample and never resume the generator,
+				#so the run is recorded when its last chunk is committed rather than after the loop
+				if num_committed == num_samples:
+					self._record_run(num_samples)
+			yield orbit_chunk
+
+	#Chunks put in chunk_queue by track_orbit_chunks, or None each time the queue is empty. Never ends, consumers stop after the last sample.
+	@staticmethod
+	def _iter_queued_chunks(chunk_queue):
+		while True:
+			try:
+				yield chunk_queue.get_nowait()
+			except queue.Empty:
+				yield None
+
+	#Track the orbit of particle through lattice like iter_orbit_chunks, putting every chunk in chunk_queue for stream_active_particle.
+	#A full queue means the consumer is behind, so tracking waits for room rather than holding the orbit in memory.
+	#Only reads particle and lattice, so it can run off the Tk thread. on_progress(fraction) is called after every chunk.
+	#Tracking stops and returns None as soon as is_cancelled() returns True, otherwise returns the number of samples tracked.
+	def track_orbit_chunks(self, particle, lattice, cells_per_chunk, chunk_queue, on_progress=None, is_cancelled=None):
+		num_samples = lattice.num_cells * lattice.num_cell_elements
+		num_tracked = 0
+		for orbit_chunk in self.iter_orbit_chunks(particle, lattice, cells_per_chunk):
+			while True:
+				if is_cancelled is not None and is_cancelled():
+					return None
+				try:
+					chunk_queue.put(orbit_chunk, timeout=0.05)
+					break
+				except queue.Full:
+					pass
+
+			num_tracked += orbit_chunk.shape[1]
+			if on_progress is not None:
+				on_progress(num_tracked / num_samples)
+		return num_tracked
 
-		for _ in range(lattice.num_cells):
-			for _ in range(lattice.quad_divisions):
-				next_coordinates = lattice.quad_s_vector + lattice.fquad_matrix @ current_orbit[-1]
-				current_orbit.append(next_coordinates)
+	#on_progress(fraction) is called after every cell. Tracking stops and returns None as soon as is_cancelled() returns True.
+	#Only reads particle and lattice, so it can run off the Tk thread.
+	#Orbits are cached by lattice parameters and starting coordinates. The returned array is read-only.
+	def calculate_orbit(self, particle, lattice, on_progress=None, is_cancelled=None):
+		key = self._get_orbit_key(particle, lattice)
+		cached_orbit = self.orbit_cache.get(key)
+		if cached_orbit is not None:
+			if on_progress is not None:
+				on_progress(1)
+			return cached_orbit
 
-			for _ in range(lattice.drift_divisions):
-				next_coordinates = lattice.drift_s_vector + lattice.drift_matrix @ current_orbit[-1]
-				current_orbit.append(next_coordinates)
+		#The orbit is written into a preallocated 3x(elements+1) array. The first column is the most recent coordinates for the particle.
+		num_cell_elements = lattice.num_cell_elements
+		current_orbit = np.empty((3, lattice.num_cells * num_cell_elements + 1))
+		current_orbit[:, 0] = particle.get_last_value()[:, 0]
 
-			for _ in range(lattice.quad_divisions):
-				next_coordinates = lattice.quad_s_vector + lattice.dquad_matrix @ current_orbit[-1]
-				current_orbit.append(next_coordinates)
+		for cell in range(lattice.num_cells):
+			if is_cancelled is not None and is_cancelled():
+				return None
 
-			for _ in range(lattice.drift_divisions):
-				next_coordinates = lattice.drift_s_vector + lattice.drift_matrix @ current_orbit[-1]
-				current_orbit.append(next_coordinates)
+			self._track_cells(current_orbit[:, cell * num_cell_elements:(cell + 1) * num_cell_elements + 1], lattice, 1)
+			if on_progress is not None:
+				on_progress((cell + 1) / lattice.num_cells)
 
+		current_orbit.flags.writeable = False
+		self.orbit_cache.put(key, current_orbit, current_orbit.nbytes)
 		return current_orbit
 
+	#Yield the orbit of particle through lattice as 3xn chunks of cells_per_chunk cells, not including the starting coordinates.
+	#A cached orbit is sliced into chunks instead of tracked. Streamed orbits are not added to the cache, since they may not fit in memory.
+	def iter_orbit_chunks(self, particle, lattice, cells_per_chunk=1):
+		if cells_per_chunk < 1:
+			raise ValueError(f"cells_per_chunk must be a positive integer, got {cells_per_chunk}")
+
+		cached_orbit = self.orbit_cache.get(self._get_orbit_key(particle, lattice))
+		if cached_orbit is not None:
+			chunk_length = cells_per_chunk * lattice.num_cell_elements
+			for start in range(1, cached_orbit.shape[1], chunk_length):
+				yield cached_orbit[:, start:start + chunk_length]
+			return
+
+		coordinates = particle.get_last_value()[:, 0].copy()
+		for first_cell in range(0, lattice.num_cells, cells_per_chunk):
+			num_cells = min(cells_per_chunk, lattice.num_cells - first_cell)
+			orbit_chunk = np.empty((3, num_cells * lattice.num_cell_elements + 1))
+			orbit_chunk[:, 0] = coordinates
+			self._track_cells(orbit_chunk, lattice, num_cells)
+
+			coordinates = orbit_chunk[:, -1]
+			yield orbit_chunk[:, 1:]
+
+	@staticmethod
+	def _get_orbit_key(particle, lattice):
+		return lattice.parameters + tuple(particle.get_last_value()[:, 0].tolist())
+
+	#Fill columns 1: of a preallocated 3xn orbit from its first column, num_cells cells of lattice elements.
+	#Linear cells are one batched matmul of the cell's prefix maps with its starting coordinates, see Lattice.
+	#Cells with sextupole kicks are tracked element by element.
+	def _track_cells(self, orbit, lattice, num_cells):
+		num_cell_elements = lattice.num_cell_elements
+		if lattice.is_linear:
+			for cell in range(num_cells):
+				start = cell * num_cell_elements
+				cell_orbit = orbit[:, start + 1:start + num_cell_elements + 1].T
+				np.matmul(lattice.cell_prefix_matrices, orbit[:, start], out=cell_orbit)
+				cell_orbit += lattice.cell_prefix_s_vectors
+			return
+
+		index = 0
+		for _ in range(num_cells):
+			for matrix, s_vector, kick in zip(lattice.cell_matrices, lattice.cell_s_vectors, lattice.cell_kicks):
+				np.matmul(matrix, orbit[:, index], out=orbit[:, index + 1])
+				orbit[:, index + 1] += s_vector[:, 0]
+				if kick:
+					apply_sextupole_kick(orbit[:, index + 1], kick)
+				index += 1
+
+	def _commit_orbit_chunk(self, orbit_chunk):
+		if self.orbit_store is not None:
+			self.orbit_store.append(self.particles.index(self.active_particle), orbit_chunk)
+			self.active_particle.commit_to_orbit(orbit_chunk[:, -1:])
+			self.active_particle.truncate_to_last_value()
+		else:
+			self.active_particle.commit_to_orbit(orbit_chunk)
+		self._update_orbit_bounds(orbit_chunk)
+
+	def _record_run(self, num_samples):
+		if self.session is not None:
+			self.session.record_run(self.particles.index(self.active_particle), self.lattice, num_samples)
+
+	#Make a new beam from arrays of initial coordinates, replacing any existing beam
+	def make_new_beam(self, x, xp, s=0):
+		self.beam = Beam(x, xp, s)
+
+	#Make a new beam of kind ('gaussian', 'waterbag' or 'kv') with rms emittance emittance, shaped by (beta, alpha) and centered on centroid (x, xp)
+	def make_distributed_beam(self, kind, num_particles, emittance, beta, alpha, centroid=(0, 0), seed=None):
+		coordinates = make_distribution(kind, num_particles, emittance, beta, alpha, centroid, seed=seed)
+		self.make_new_beam(coordinates[0], coordinates[1], coordinates[2])
+
+	#make_distributed_beam matched to the periodic Twiss of the current lattice
+	def make_matched_beam(self, kind, num_particles, emittance, centroid=(0, 0), seed=None):
+		analysis = self.analyze_lattice()
+		if not analysis.is_stable:
+			raise ValueError("Lattice is unstable, there is no matched distribution")
+		self.make_distributed_beam(kind, num_particles, emittance, analysis.beta, analysis.alpha, centroid, seed)
+
+	def propagate_beam(self):
+		if self.beam is None:
+			raise AttributeError(f"Beam is not set")
+		if self.lattice is None:
+			raise AttributeError(f"Lattice is not set")
+
+		self.beam_orbit = self.calculate_beam_orbit(self.beam.get_last_value(), self.lattice)
+
+	def set_beam_orbit(self, beam_orbit):
+		self.beam_orbit = beam_orbit
+
+	def get_beam_orbit_data(self):
+		#samplesx3xN numpy array. Axis 0 maps to sampled lattice elements, every element unless tracked with a sample_stride,
+		#axis 1 to coordinate_index, axis 2 to particles
+		return self.beam_orbit
+
+	def commit_beam_orbit(self):
+		self.beam.commit_to_orbit(self.beam_orbit)
+		self.beam_orbit = None
+
+	#Track a whole 3xN beam at once. Each lattice element is a single matmul over every particle.
+	#sample_stride > 1 keeps only the samples at get_beam_sample_elements(lattice, sample_stride), see track_beam.
+	#Progress and cancellation work as in calculate_orbit, except with the parallel tracker, which ignores them.
+	def calculate_beam_orbit(self, coordinates, lattice, sample_stride=1, on_progress=None, is_cancelled=None):
+		if self.parallel_tracker is not None:
+			return self.parallel_tracker.calculate_beam_orbit(coordinates, lattice, sample_stride)
+		return track_beam(coordinates, lattice, on_progress=on_progress, is_cancelled=is_cancelled, sample_stride=sample_stride)
+
+	#Element index of every sample kept by calculate_beam_orbit with sample_stride. The first and last elements are always kept.
+	def get_beam_sample_elements(self, lattice, sample_stride=1):
+		return get_sample_elements(lattice.num_cells * lattice.num_cell_elements, sample_stride)
+
+	#Centroid, rms size and rms emittance of 3xN coordinates at every lattice element, without storing the beam orbit.
+	#Progress and cancellation work as in calculate_orbit. Returns a BeamStatistics, or None when cancelled.
+	def calculate_beam_statistics(self, coordinates, lattice, chunk_size=100000, on_progress=None, is_cancelled=None):
+		return track_beam_statistics(coordinates, lattice, chunk_size, on_progress, is_cancelled)
+
+	#num_workers > 1 shards beam tracking across a process pool. Results are bit-identical to serial tracking.
+	def set_tracking_workers(self, num_workers):
+		if self.parallel_tracker is not None:
+			self.parallel_tracker.close()
+		self.parallel_tracker = ParallelTracker(num_workers) if num_workers > 1 else None
+
+	#Track 3xN coordinates sampling only at cell boundaries, every cell_stride cells plus the final cell.
+	#Each sample is one jump with a precomputed cell map, so asking only for the endpoint of a long lattice costs O(log num_cells).
+	#Lattices with sextupoles have no cell map and are tracked cell by cell with the kick-drift tracker instead.
+	def calculate_cell_boundary_orbit(self, coordinates, lattice, cell_stride=1):
+		if cell_stride < 1:
+			raise ValueError(f"cell_stride must be a positive integer, got {cell_stride}")
+		if not lattice.is_linear:
+			return track_kick_drift(coordinates, lattice, cell_stride)
+
+		sample_cells = list(range(0, lattice.num_cells, cell_stride)) + [lattice.num_cells]
+		boundary_orbit = np.empty((len(sample_cells),) + coordinates.shape)
+		boundary_orbit[0] = coordinates
+
+		for index in range(1, len(sample_cells)):
+			matrix, s_vector = lattice.get_cell_map(sample_cells[index] - sample_cells[index - 1])
+			np.matmul(matrix, boundary_orbit[index - 1], out=boundary_orbit[index])
+			boundary_orbit[index] += s_vector
+
+		return boundary_orbit
+
+	#Bounds cover every committed orbit plus the active orbit. Only the active orbit is scanned.
 	def max_orbit_values(self):
-	    all_orbits = [self.get_active_orbit_data()] + [particle.get_orbit_data() for particle in self.particles]
-	    current_orbit = np.hstack(all_orbits)
-	    return np.max(current_orbit, axis=1)
+		if self.active_orbit is None:
+			return self.committed_orbit_max
+		active_max = np.max(self.get_active_orbit_data(), axis=1)
+		if self.committed_orbit_max is None:
+			return active_max
+		return np.maximum(self.committed_orbit_max, active_max)
 
 	def min_orbit_values(self):
-	    all_orbits = [self.get_active_orbit_data()] + [particle.get_orbit_data() for particle in self.particles]
-	    current_orbit = np.hstack(all_orbits)
-	    return np.min(current_orbit, axis=1)
\ No newline at end of file
+		if self.active_orbit is None:
+			return self.committed_orbit_min
+		active_min = np.min(self.get_active_orbit_data(), axis=1)
+		if self.committed_orbit_min is None:
+			return active_min
+		return np.minimum(self.committed_orbit_min, active_min)
+
+	def _update_orbit_bounds(self, orbit_data):
+		#a lattice of 0 cells commits an empty orbit, which has no bounds to add
+		if orbit_data.shape[1] == 0:
+			return
+		orbit_max = np.max(orbit_data, axis=1)
+		orbit_min = np.min(orbit_data, axis=1)
+		if self.committed_orbit_max is None:
+			self.committed_orbit_max, self.committed_orbit_min = orbit_max, orbit_min
+		else:
+			np.maximum(self.committed_orbit_max, orbit_max, out=self.committed_orbit_max)
+			np.minimum(self.committed_orbit_min, orbit_min, out=self.committed_orbit_min)
\ No newline at end of file
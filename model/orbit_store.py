@@ -0,0 +1,140 @@
+import os
+import numpy as np
+
+'''OrbitStore keeps committed orbits on disk instead of in Particle buffers, for histories larger than RAM.'''
+'''The data file is append-only raw float64, one sample after another, each sample being (x, xp, s).'''
+'''The index file is append-only raw int64, one (particle_index, offset, length) row per append, offset and length counted in samples.'''
+'''Appends only ever write to the end of both files, so the cost of a commit does not grow with the size of the store.'''
+'''Consecutive appends to the same particle, e.g. the chunks of a streamed or continued run, are contiguous in the data file.'''
+'''They are coalesced into one chunk in memory, so nearly every particle is a single zero-copy 3xn memmap view.'''
+'''Only a particle whose appends were interleaved with another particle's is copied together from its chunks on read.'''
+'''mode 'w' starts an empty store, 'a' appends to an existing store and 'r' opens an existing store read-only.'''
+class OrbitStore:
+	def __init__(self, path, mode='w'):
+		if mode not in ('w', 'a', 'r'):
+			raise ValueError(f"mode must be 'w', 'a' or 'r', got {mode}")
+		self.path = path
+		self.index_path = path + '.index'
+		self.mode = mode
+		self._memmap = None
+
+		if mode == 'w':
+			self.clear()
+		else:
+			self._load_index()
+
+	@property
+	def num_particles(self):
+		return max(self.particle_chunks) + 1 if self.particle_chunks else 0
+
+	def append(self, particle_index, orbit_data):
+		if self.mode == 'r':
+			raise ValueError(f"OrbitStore at {self.path} is read-only")
+		#empty orbits, e.g. from a lattice of 0 cells, are not indexed
+		if orbit_data.shape[1] == 0:
+			return
+
+		offset = self.num_samples
+		length = orbit_data.shape[1]
+		with open(self.path, 'ab') as data_file:
+			data_file.write(np.ascontiguousarray(orbit_data.T, dtype=np.float64).tobytes())
+		with open(self.index_path, 'ab') as index_file:
+			index_file.write(np.array([particle_index, offset, length], dtype=np.int64).tobytes())
+
+		self._add_chunk(particle_index, offset, length)
+		self._memmap = None #file grew, remap on next read
+
+	#Yield 3xn memmap views, in commit order, for one particle or for every particle when particle_index is None.
+	def iter_chunks(self, particle_index=None):
+		chunks = self.chunks if particle_index is None else self.particle_chunks.get(particle_index, [])
+		for _, offset, length in chunks:
+			yield self._get_chunk(offset, length)
+
+	#3xn orbit of one particle. A particle stored as one chunk is returned as a memmap view without copying.
+	def get_orbit_data(self, particle_index):
+		chunks = list(self.iter_chunks(particle_index))
+		if not chunks:
+			raise IndexError(f"No orbit stored for particle {particle_index}")
+		if len(chunks) == 1:
+			return chunks[0]
+		return np.hstack(chunks)
+
+	#3x1 coordinates at the end of the last chunk of a particle
+	def get_last_value(self, particle_index):
+		if particle_index not in self.particle_chunks:
+			raise IndexError(f"No orbit stored for particle {particle_index}")
+		_, offset, length = self.particle_chunks[particle_index][-1]
+		return np.array(self._get_chunk(offset, length)[:, -1:])
+
+	def iter_orbits(self):
+		for particle_index in range(self.num_particles):
+			yield self.get_orbit_data(particle_index)
+
+	#Per-coordinate (max, min) over every stored chunk, read one chunk at a time
+	def get_orbit_bounds(self):
+		orbit_max, orbit_min = None, None
+		for chunk in self.iter_chunks():
+			if orbit_max is None:
+				orbit_max, orbit_min = np.max(chunk, axis=1), np.min(chunk, axis=1)
+			else:
+				np.maximum(orbit_max, np.max(chunk, axis=1), out=orbit_max)
+				np.minimum(orbit_min, np.min(chunk, axis=1), out=orbit_min)
+		return orbit_max, orbit_min
+
+	#The files are replaced rather than truncated. Memmap views of the old data, e.g. orbits still drawn on the plots or being
+	#copied into a new store at the same path, keep the old file alive. Truncating a file under a live view faults on the next read.
+	def clear(self):
+		if self.mode == 'r':
+			raise ValueError(f"OrbitStore at {self.path} is read-only")
+		self._memmap = None
+		for path in (self.path, self.index_path):
+			if os.path.exists(path):
+				os.remove(path)
+		open(self.path, 'wb').close()
+		open(self.index_path, 'wb').close()
+		self._reset_chunks()
+
+	def _reset_chunks(self):
+		#[particle_index, offset, length] rows in commit order, with contiguous appends to the same particle merged.
+		#particle_chunks holds the same rows grouped by particle, so merging a row updates both.
+		self.chunks = []
+		self.particle_chunks = {}
+		self.num_samples = 0
+
+	#Index rows whose data was never fully written, e.g. after a crash between the two writes of append, are dropped.
+	#In mode 'a' both files are cut back to the last complete row, so later appends line up with the index again.
+	def _load_index(self):
+		self._reset_chunks()
+		num_written_samples = os.path.getsize(self.path) // (3 * 8)
+		rows = np.fromfile(self.index_path, dtype=np.int64)
+		rows = rows[:len(rows) // 3 * 3].reshape(-1, 3)
+
+		num_rows = 0
+		for particle_index, offset, length in rows.tolist():
+			if offset + length > num_written_samples:
+				break
+			self._add_chunk(particle_index, offset, length)
+			num_rows += 1
+
+		if self.mode == 'a':
+			os.truncate(self.path, self.num_samples * 3 * 8)
+			os.truncate(self.index_path, num_rows * 3 * 8)
+
+	def _add_chunk(self, particle_index, offset, length):
+		last_chunk = self.chunks[-1] if self.chunks else None
+		if last_chunk is not None and last_chunk[0] == particle_index and last_chunk[1] + last_chunk[2] == offset:
+			last_chunk[2] += length
+		else:
+			chunk = [particle_index, offset, length]
+			self.chunks.append(chunk)
+			self.particle_chunks.setdefault(particle_index, []).append(chunk)
+		self.num_samples = offset + length
+
+	#3xn view of samples offset:offset+length. Samples are stored (x, xp, s) one after another, so the view is a transpose.
+	def _get_chunk(self, offset, length):
+		return self._get_memmap()[3 * offset:3 * (offset + length)].reshape(length, 3).T
+
+	def _get_memmap(self):
+		if self._memmap is None:
+			self._memmap = np.memmap(self.path, dtype=np.float64, mode='r') if self.num_samples else np.empty(0)
+		return self._memmap
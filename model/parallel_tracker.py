@@ -0,0 +1,69 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from .tracking import track_beam, get_sample_elements
+
+'''ParallelTracker shards a 3xN beam by columns across a process pool.'''
+'''The beam and the orbit tensor live in shared memory, so workers only receive the shared block names and their column range, never particle data.'''
+'''Every worker runs the same track_beam kernel as serial tracking on its columns, so results are bit-identical to Model tracking.'''
+class ParallelTracker:
+	def __init__(self, num_workers, min_shard_size=10000):
+		if num_workers < 1:
+			raise ValueError(f"num_workers must be a positive integer, got {num_workers}")
+		self.num_workers = num_workers
+		self.min_shard_size = min_shard_size #beams smaller than this per worker use fewer workers
+		self.executor = None
+
+	def calculate_beam_orbit(self, coordinates, lattice, sample_stride=1):
+		num_particles = coordinates.shape[1]
+		num_samples = len(get_sample_elements(lattice.num_cells * lattice.num_cell_elements, sample_stride))
+		orbit_shape = (num_samples, 3, num_particles)
+
+		num_shards = max(1, min(self.num_workers, num_particles // self.min_shard_size))
+		if num_shards == 1:
+			return track_beam(coordinates, lattice, sample_stride=sample_stride)
+
+		coordinates_memory = shared_memory.SharedMemory(create=True, size=max(1, coordinates.nbytes))
+		orbit_memory = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(orbit_shape)) * 8))
+		try:
+			np.ndarray((3, num_particles), buffer=coordinates_memory.buf)[:] = coordinates
+
+			shard_bounds = np.linspace(0, num_particles, num_shards + 1).astype(int)
+			futures = [self._get_executor().submit(_track_shard, coordinates_memory.name, orbit_memory.name, orbit_shape, lattice, start, stop, sample_stride)
+					   for start, stop in zip(shard_bounds[:-1], shard_bounds[1:])]
+			for future in futures:
+				future.result()
+
+			#copy out so the shared blocks can be released immediately
+			return np.ndarray(orbit_shape, buffer=orbit_memory.buf).copy()
+		finally:
+			coordinates_memory.close()
+			coordinates_memory.unlink()
+			orbit_memory.close()
+			orbit_memory.unlink()
+
+	def close(self):
+		if self.executor is not None:
+			self.executor.shutdown()
+			self.executor = None
+
+	#The pool is started on first use and reused between runs. Spawned workers avoid forking a process that owns a Tk interpreter.
+	def _get_executor(self):
+		if self.executor is None:
+			self.executor = ProcessPoolExecutor(max_workers=self.num_workers, mp_context=multiprocessing.get_context('spawn'))
+		return self.executor
+
+#Worker entry point. Attaches to the shared beam and orbit blocks and tracks columns start:stop in place.
+def _track_shard(coordinates_name, orbit_name, orbit_shape, lattice, start, stop, sample_stride=1):
+	coordinates_memory = shared_memory.SharedMemory(name=coordinates_name)
+	orbit_memory = shared_memory.SharedMemory(name=orbit_name)
+	try:
+		coordinates = np.ndarray((3, orbit_shape[2]), buffer=coordinates_memory.buf)
+		beam_orbit = np.ndarray(orbit_shape, buffer=orbit_memory.buf)
+		track_beam(coordinates[:, start:stop], lattice, beam_orbit[:, :, start:stop], sample_stride=sample_stride)
+		del coordinates, beam_orbit
+	finally:
+		coordinates_memory.close()
+		orbit_memory.close()
@@ -0,0 +1,49 @@
+import numpy as np
+from .lattice import Lattice
+from .lattice_analysis import LatticeAnalysis
+
+'''ParameterScan evaluates FODO cell optics over a full (drift_length, focal_length) grid at once.'''
+'''The element matrices of every grid point are stacked into (G, 3, 3) arrays and composed with batched matmul, so no Lattice is built per point.'''
+class ParameterScan:
+	def __init__(self, drift_lengths, focal_lengths, quad_divisions=5, drift_divisions=5, quad_length=None):
+		self.drift_lengths = np.asarray(drift_lengths, dtype=float)
+		self.focal_lengths = np.asarray(focal_lengths, dtype=float)
+		self.quad_divisions = quad_divisions
+		self.drift_divisions = drift_divisions
+		self.quad_length = quad_length
+
+		#rows of every result map to drift_lengths, columns to focal_lengths
+		self.shape = (len(self.drift_lengths), len(self.focal_lengths))
+		drift_grid, focal_grid = np.meshgrid(self.drift_lengths, self.focal_lengths, indexing='ij')
+
+		fquad_matrices, dquad_matrices = Lattice.make_quad_slice_matrices(focal_grid.ravel(), quad_divisions, quad_length)
+		drift_matrices = Lattice.make_drift_matrix(drift_grid.ravel() / drift_divisions)
+
+		#same element order as Lattice.cell_matrices: F-quad, drift, D-quad, drift
+		self.cell_layout = [(fquad_matrices, quad_divisions),
+							(drift_matrices, drift_divisions),
+							(dquad_matrices, quad_divisions),
+							(drift_matrices, drift_divisions)]
+
+		cell_matrices = np.broadcast_to(np.identity(3), fquad_matrices.shape).copy()
+		for element_matrices, divisions in self.cell_layout:
+			for _ in range(divisions):
+				np.matmul(element_matrices, cell_matrices, out=cell_matrices)
+
+		is_stable, phase_advance, twiss = LatticeAnalysis.get_periodic_twiss(cell_matrices)
+		self.is_stable = is_stable.reshape(self.shape)
+		self.phase_advance = phase_advance.reshape(self.shape) #radians per cell, nan where unstable
+		self.max_beta = self._get_max_beta(twiss).reshape(self.shape) #nan where unstable
+
+	def get_phase_advance_degrees(self):
+		return np.degrees(self.phase_advance)
+
+	#propagate the periodic twiss of every grid point through each sub-element, keeping the running maximum of beta
+	def _get_max_beta(self, twiss):
+		max_beta = twiss[:, 0].copy()
+		for element_matrices, divisions in self.cell_layout:
+			for _ in range(divisions):
+				twiss = LatticeAnalysis.propagate_twiss(element_matrices, twiss)
+				np.fmax(max_beta, twiss[:, 0], out=max_beta)
+
+		return np.where(np.isnan(twiss[:, 0]), np.nan, max_beta)
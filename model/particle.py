@@ -1,16 +1,40 @@
 import numpy as np
 
 class Particle():
-	def __init__(self, x, xp, s=0):
-		#self.orbit is a list of 3x1 numpy arrays
-		self.orbit = [np.array([[x], [xp], [s]], dtype=float)]
+	def __init__(self, x, xp, s=0, capacity=64):
+		#self.orbit is a preallocated 3 x capacity float64 buffer. Only the first self.orbit_length columns hold data
+		#Rows are x, xp, s respectively
+		self.orbit = np.empty((3, capacity), dtype=float)
+		self.orbit[:, 0] = x, xp, s
+		self.orbit_length = 1
 
 	def commit_to_orbit(self, new_orbit):
-		self.orbit += new_orbit
+		#new_orbit is a 3xn numpy array, copied into the buffer after the current last value
+		new_length = self.orbit_length + new_orbit.shape[1]
+		if new_length > self.orbit.shape[1]:
+			self._grow_orbit(new_length)
+
+		self.orbit[:, self.orbit_length:new_length] = new_orbit
+		self.orbit_length = new_length
 
 	def get_last_value(self):
-		return self.orbit[-1]
+		return self.orbit[:, self.orbit_length - 1:self.orbit_length]
 
 	def get_orbit_data(self):
-		# massage the orbit into a 3xn numpy array where n is the number on elements in self.orbit. Rows are x, xp, s respectively
-		return np.hstack(self.orbit)
\ No newline at end of file
+		#zero-copy 3xn view of the buffer where n is the number of committed coordinates
+		return self.orbit[:, :self.orbit_length]
+
+	#Keep only the last value. Used when the orbit history lives in an OrbitStore rather than in memory.
+	def truncate_to_last_value(self):
+		self.orbit[:, 0] = self.orbit[:, self.orbit_length - 1]
+		self.orbit_length = 1
+
+	#double capacity until new_length fits, so repeated commits cost amortized O(1) per coordinate
+	def _grow_orbit(self, new_length):
+		capacity = self.orbit.shape[1]
+		while capacity < new_length:
+			capacity *= 2
+
+		new_orbit = np.empty((3, capacity), dtype=float)
+		new_orbit[:, :self.orbit_length] = self.get_orbit_data()
+		self.orbit = new_orbit
\ No newline at end of file
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+'''Least-recently-used cache bounded by the total size in bytes of its values rather than by entry count.'''
+'''Values are stored as given. Callers must not mutate them after put or after get, so cached arrays should be made read-only.'''
+'''A lock guards every access, since orbits are calculated on a worker thread while lattices are built on the Tk thread.'''
+class ResultCache:
+	def __init__(self, max_bytes):
+		if max_bytes < 0:
+			raise ValueError(f"max_bytes must be non-negative, got {max_bytes}")
+		self.max_bytes = max_bytes
+		self.num_bytes = 0
+		self.hits = 0
+		self.misses = 0
+
+		self._entries = OrderedDict() #key -> (value, num_bytes), least recently used first
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		with self._lock:
+			return key in self._entries
+
+	#Cached value for key, or default. A hit marks the entry as most recently used.
+	def get(self, key, default=None):
+		with self._lock:
+			if key not in self._entries:
+				self.misses += 1
+				return default
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return self._entries[key][0]
+
+	#Values larger than max_bytes are not cached. Otherwise least recently used entries are evicted until the new value fits.
+	def put(self, key, value, num_bytes):
+		with self._lock:
+			if key in self._entries:
+				self.num_bytes -= self._entries.pop(key)[1]
+			if num_bytes > self.max_bytes:
+				return
+
+			while self.num_bytes + num_bytes > self.max_bytes:
+				_, (_, evicted_bytes) = self._entries.popitem(last=False)
+				self.num_bytes -= evicted_bytes
+
+			self._entries[key] = (value, num_bytes)
+			self.num_bytes += num_bytes
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.num_bytes = 0
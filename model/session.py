@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+from .orbit_store import OrbitStore
+
+'''A Session is a directory holding every committed orbit and the runs that produced them.'''
+'''orbits.f64 and its index are an OrbitStore, written chunk by chunk as orbits are committed, so nothing is re-tracked or re-written on save.'''
+'''session.json holds the format version. runs.jsonl holds one line per run with its particle index, lattice parameters and number of samples.'''
+'''Runs are appended one line at a time like the orbit store, so recording a run does not grow with the number of runs already recorded.'''
+class Session:
+	#2 stores samples one after another with an append-only raw index, see OrbitStore
+	#3 moves the runs out of session.json into the append-only runs.jsonl
+	format_version = 3
+
+	def __init__(self, path, mode='w'):
+		if mode not in ('w', 'a', 'r'):
+			raise ValueError(f"mode must be 'w', 'a' or 'r', got {mode}")
+		self.path = path
+		self.mode = mode
+		self.metadata_path = os.path.join(path, 'session.json')
+		self.runs_path = os.path.join(path, 'runs.jsonl')
+
+		if mode == 'w':
+			os.makedirs(path, exist_ok=True)
+			with open(self.metadata_path, 'w') as metadata_file:
+				json.dump({'format_version': self.format_version}, metadata_file, indent=1)
+			open(self.runs_path, 'w').close()
+			self.runs = []
+		else:
+			with open(self.metadata_path) as metadata_file:
+				format_version = json.load(metadata_file).get('format_version')
+			if format_version != self.format_version:
+				raise ValueError(f"Unsupported session format version {format_version} in {path}")
+			self._load_runs()
+
+		self.orbit_store = OrbitStore(os.path.join(path, 'orbits.f64'), mode)
+
+	def record_run(self, particle_index, lattice, num_samples):
+		if self.mode == 'r':
+			raise ValueError(f"Session at {self.path} is read-only")
+
+		run = {'particle_index': int(particle_index), 'num_cells': int(lattice.num_cells), 'num_samples': int(num_samples), 'time': time.time()}
+		#FODO lattices are recorded by their inputs, lattices built from a beamline by its element list
+		if lattice.drift_length is not None:
+			run.update({'drift_length': float(lattice.drift_length),
+						'focal_length': float(lattice.focal_length),
+						'quad_divisions': int(lattice.quad_divisions),
+						'drift_divisions': int(lattice.drift_divisions),
+						'quad_length': None if lattice.quad_length is None else float(lattice.quad_length)})
+		else:
+			run['beamline'] = lattice.beamline.to_dict()
+		with open(self.runs_path, 'a') as runs_file:
+			runs_file.write(json.dumps(run) + '\n')
+		self.runs.append(run)
+
+	def clear(self):
+		self.orbit_store.clear()
+		open(self.runs_path, 'w').close()
+		self.runs = []
+
+	#(drift_length, focal_length, num_cells) of the most recent run, or None for a session without FODO runs
+	def get_last_lattice_inputs(self):
+		if not self.runs or 'drift_length' not in self.runs[-1]:
+			return None
+		run = self.runs[-1]
+		return run['drift_length'], run['focal_length'], run['num_cells']
+
+	#A last line without a newline, e.g. after a crash while recording a run, is dropped.
+	#In mode 'a' the file is cut back to the last complete line, so later runs start on a line of their own.
+	def _load_runs(self):
+		with open(self.runs_path, 'rb') as runs_file:
+			lines = runs_file.read().split(b'\n')
+		#the last element is empty when every line is complete, or the incomplete line otherwise
+		lines.pop()
+		self.runs = [json.loads(line) for line in lines]
+
+		if self.mode == 'a':
+			os.truncate(self.runs_path, sum(len(line) + 1 for line in lines))
@@ -0,0 +1,129 @@
+import numpy as np
+from .beam_statistics import BeamStatistics
+
+'''Beam tracking kernel shared by Model and the parallel tracking workers, so serial and parallel runs execute identical arithmetic.'''
+
+#Track 3xN coordinates through every element of the lattice. Each element is a single matmul over all particles,
+#followed by the sextupole kick of that element when it has one.
+#sample_stride > 1 keeps only the samples at get_sample_elements(elements, sample_stride). The elements between them are tracked
+#through two scratch buffers, so the output holds one row per kept sample instead of one per element.
+#beam_orbit is an optional preallocated samplesx3xN output, which may be a column slice of a larger array.
+#on_progress(fraction) is called after every cell. Tracking stops and returns None as soon as is_cancelled() returns True.
+def track_beam(coordinates, lattice, beam_orbit=None, on_progress=None, is_cancelled=None, sample_stride=1):
+	if sample_stride < 1:
+		raise ValueError(f"sample_stride must be a positive integer, got {sample_stride}")
+	num_elements = lattice.num_cells * lattice.num_cell_elements
+	if beam_orbit is None:
+		beam_orbit = np.empty((len(get_sample_elements(num_elements, sample_stride)),) + coordinates.shape)
+	beam_orbit[0] = coordinates
+	#consecutive unsampled elements alternate between the buffers, so an element never reads the buffer it writes
+	buffers = (np.empty(coordinates.shape), np.empty(coordinates.shape)) if sample_stride > 1 else ()
+
+	index = 0
+	num_samples = 1
+	current = beam_orbit[0]
+	for cell in range(lattice.num_cells):
+		if is_cancelled is not None and is_cancelled():
+			return None
+
+		for matrix, s_vector, kick in zip(lattice.cell_matrices, lattice.cell_s_vectors, lattice.cell_kicks):
+			index += 1
+			if index % sample_stride == 0 or index == num_elements:
+				next_coordinates = beam_orbit[num_samples]
+				num_samples += 1
+			else:
+				next_coordinates = buffers[index % 2]
+
+			np.matmul(matrix, current, out=next_coordinates)
+			next_coordinates += s_vector
+			if kick:
+				apply_sextupole_kick(next_coordinates, kick)
+			current = next_coordinates
+
+		if on_progress is not None:
+			on_progress((cell + 1) / lattice.num_cells)
+
+	return beam_orbit
+
+#Element indices kept by track_beam with sample_stride: every sample_stride-th element from the start, plus the last element
+def get_sample_elements(num_elements, sample_stride=1):
+	sample_elements = np.arange(0, num_elements + 1, sample_stride)
+	if sample_elements[-1] != num_elements:
+		sample_elements = np.append(sample_elements, num_elements)
+	return sample_elements
+
+#Kick-drift tracking of 3xN coordinates, sampled only at cell boundaries: every cell_stride cells plus the final cell.
+#Each cell is a few composed linear maps with one sextupole kick between them (see Lattice.get_kick_drift_segments),
+#so the per-cell cost depends on the number of sextupoles rather than the number of sub-elements, and only two 3xN buffers are live.
+#Returns a (samples, 3, N) array, or None when cancelled. on_progress and is_cancelled are checked every cell_stride cells.
+def track_kick_drift(coordinates, lattice, cell_stride=1, on_progress=None, is_cancelled=None):
+	if cell_stride < 1:
+		raise ValueError(f"cell_stride must be a positive integer, got {cell_stride}")
+
+	sample_cells = list(range(0, lattice.num_cells, cell_stride)) + [lattice.num_cells]
+	boundary_orbit = np.empty((len(sample_cells),) + coordinates.shape)
+	boundary_orbit[0] = coordinates
+
+	segments = lattice.get_kick_drift_segments()
+	current, scratch = np.array(coordinates, dtype=float), np.empty(coordinates.shape)
+	kick_buffer = np.empty(coordinates.shape[1:])
+	for index in range(1, len(sample_cells)):
+		if is_cancelled is not None and is_cancelled():
+			return None
+
+		current, scratch = advance_cells(current, scratch, segments, sample_cells[index] - sample_cells[index - 1], kick_buffer)
+		boundary_orbit[index] = current
+		if on_progress is not None:
+			on_progress(sample_cells[index] / lattice.num_cells)
+
+	return boundary_orbit
+
+#Track 3xN coordinates through every element like track_beam, keeping only beam moments at each of the elements+1 sample points.
+#Particles are tracked in blocks of chunk_size with two block-sized buffers, so memory does not grow with the beam size or the lattice length.
+#Returns a BeamStatistics, or None when cancelled. on_progress and is_cancelled are checked after every block.
+def track_beam_statistics(coordinates, lattice, chunk_size=100000, on_progress=None, is_cancelled=None):
+	num_particles = coordinates.shape[1]
+	statistics = BeamStatistics(lattice.num_cells * lattice.num_cell_elements + 1)
+
+	for start in range(0, num_particles, chunk_size):
+		if is_cancelled is not None and is_cancelled():
+			return None
+
+		current = np.array(coordinates[:, start:start + chunk_size], dtype=float)
+		scratch = np.empty_like(current)
+		kick_buffer = np.empty(current.shape[1])
+		statistics.update(0, current)
+
+		index = 0
+		for _ in range(lattice.num_cells):
+			for matrix, s_vector, kick in zip(lattice.cell_matrices, lattice.cell_s_vectors, lattice.cell_kicks):
+				np.matmul(matrix, current, out=scratch)
+				scratch += s_vector
+				if kick:
+					apply_sextupole_kick(scratch, kick, kick_buffer)
+				current, scratch = scratch, current
+				index += 1
+				statistics.update(index, current)
+
+		if on_progress is not None:
+			on_progress(min(start + chunk_size, num_particles) / num_particles)
+
+	return statistics
+
+#Advance 3xN coordinates num_cells cells through kick-drift segments, ping-ponging between the current and scratch buffers.
+#Returns the (current, scratch) pair, current holding the new coordinates. kick_buffer is an optional scratch row for the kicks.
+def advance_cells(current, scratch, segments, num_cells, kick_buffer=None):
+	for _ in range(num_cells):
+		for matrix, s_vector, kick in segments:
+			np.matmul(matrix, current, out=scratch)
+			scratch += s_vector
+			if kick:
+				apply_sextupole_kick(scratch, kick, kick_buffer)
+			current, scratch = scratch, current
+	return current, scratch
+
+#Thin sextupole kick xp -> xp - kick * x**2 / 2, in place on 3xN coordinates. buffer is an optional scratch array shaped like one row.
+def apply_sextupole_kick(coordinates, kick, buffer=None):
+	buffer = np.square(coordinates[0], out=buffer)
+	buffer *= 0.5 * kick
+	coordinates[1] -= buffer
@@ -0,0 +1,112 @@
+import contextlib
+import json
+import time
+from collections import deque
+
+'''Instrumentation collects wall time per presenter phase and frame timing of the running animation.'''
+'''Phases are timed with phase(name) around synchronous work, or start_phase and end_phase around work that finishes in a later callback.'''
+'''While disabled every call returns immediately and phase returns a shared no-op context, so the presenter can stay instrumented at all times.'''
+class Instrumentation:
+	def __init__(self, enabled=False, frame_window=120):
+		self.enabled = enabled
+		self.frame_window = frame_window #number of recent frames the overlay averages over
+		self.reset()
+
+	def reset(self):
+		#name -> {'count', 'total_s', 'last_s', 'max_s'}
+		self.phases = {}
+		self._phase_starts = {}
+
+		self.requested_frame_interval = None #seconds
+		self.num_frames = 0
+		self.num_dropped_frames = 0
+		self.total_frame_interval = 0.0
+		self.total_render_time = 0.0
+		self.recent_frame_intervals = deque(maxlen=self.frame_window)
+		self._last_frame_time = None
+
+	def set_enabled(self, enabled):
+		self.enabled = enabled
+
+	def phase(self, name):
+		if not self.enabled:
+			return _null_phase
+		return self._time_phase(name)
+
+	def start_phase(self, name):
+		if self.enabled:
+			self._phase_starts[name] = time.perf_counter()
+
+	#Phases ended without a matching start_phase, e.g. because instrumentation was enabled in between, are ignored
+	def end_phase(self, name):
+		start_time = self._phase_starts.pop(name, None)
+		if self.enabled and start_time is not None:
+			self.record_phase(name, time.perf_counter() - start_time)
+
+	def record_phase(self, name, seconds):
+		stats = self.phases.setdefault(name, {'count': 0, 'total_s': 0.0, 'last_s': 0.0, 'max_s': 0.0})
+		stats['count'] += 1
+		stats['total_s'] += seconds
+		stats['last_s'] = seconds
+		stats['max_s'] = max(stats['max_s'], seconds)
+
+	#Called when an animation starts, with the frame interval it asks for in milliseconds
+	def start_animation(self, requested_frame_interval):
+		if not self.enabled:
+			return
+		self.requested_frame_interval = requested_frame_interval / 1000
+		self.recent_frame_intervals.clear()
+		self._last_frame_time = None
+
+	#Called once per rendered frame. frame_start is the perf_counter time the frame began, render_time the seconds spent updating it.
+	#A frame that arrives n requested intervals after the previous one counts n - 1 frames as dropped.
+	def record_frame(self, frame_start, render_time):
+		if not self.enabled:
+			return
+		self.num_frames += 1
+		self.total_render_time += render_time
+
+		if self._last_frame_time is not None:
+			frame_interval = frame_start - self._last_frame_time
+			self.total_frame_interval += frame_interval
+			self.recent_frame_intervals.append(frame_interval)
+			if self.requested_frame_interval:
+				self.num_dropped_frames += max(0, round(frame_interval / self.requested_frame_interval) - 1)
+		self._last_frame_time = frame_start
+
+	def get_summary(self):
+		num_intervals = max(self.num_frames - 1, 0)
+		return {'phases_ms': {name: {'count': stats['count'],
+									 'total': stats['total_s'] * 1000,
+									 'mean': stats['total_s'] * 1000 / stats['count'],
+									 'last': stats['last_s'] * 1000,
+									 'max': stats['max_s'] * 1000} for name, stats in self.phases.items()},
+				'frames': {'count': self.num_frames,
+						   'dropped': self.num_dropped_frames,
+						   'requested_interval_ms': None if self.requested_frame_interval is None else self.requested_frame_interval * 1000,
+						   'achieved_interval_ms': self.total_frame_interval * 1000 / num_intervals if num_intervals else None,
+						   'mean_render_ms': self.total_render_time * 1000 / self.num_frames if self.num_frames else None}}
+
+	#A few lines for the on-canvas overlay. Frame intervals are averaged over the last frame_window frames.
+	def get_overlay_text(self):
+		lines = [f'{name}: {stats["last_s"] * 1000:.1f} ms' for name, stats in self.phases.items()]
+		if self.recent_frame_intervals and self.requested_frame_interval:
+			achieved = sum(self.recent_frame_intervals) / len(self.recent_frame_intervals)
+			lines.append(f'frame: {achieved * 1000:.1f} / {self.requested_frame_interval * 1000:.0f} ms')
+		lines.append(f'dropped frames: {self.num_dropped_frames}')
+		return '\n'.join(lines)
+
+	def dump(self, path):
+		with open(path, 'w') as dump_file:
+			json.dump(self.get_summary(), dump_file, indent=1)
+
+	@contextlib.contextmanager
+	def _time_phase(self, name):
+		start_time = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.record_phase(name, time.perf_counter() - start_time)
+
+#nullcontext holds no state, so one instance serves every disabled phase
+_null_phase = contextlib.nullcontext()
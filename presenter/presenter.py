@@ -1,15 +1,56 @@
+import queue
 import numpy as np
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+from model.distributions import make_distribution
+from model.lattice import Lattice
+from model.lattice_analysis import LatticeAnalysis
+from .tracking_job import TrackingJob
+from .instrumentation import Instrumentation
 
 class Presenter:
 	def __init__(self, view, model):
 		self.view = view
 		self.model = model
 		#Passed to the view to dynamically create tab buttons
-		self.tab_names = ['exercise 1', 'exercise 2', 'exercise 3', 'exercise 4', ' ']
+		self.tab_names = ['exercise 1', 'exercise 2', 'exercise 3', 'exercise 4', 'stability map', ' ']
+		self.current_tab = None
 
 		#Sets the number of subdivisions of lattice elements. More divisions means smoother animations but more frames.
 		self.cell_divisions = {'drift_divisions': 5, 'quad_divisions': 5}
+		#None draws quads as thin lenses. A length draws them as exact thick quads, the divisions then only set how densely they are sampled.
+		self.quad_length = None
+
+		#(start, stop, num_points) ranges of the drift_length x focal_length grid shown on the stability map tab
+		self.scan_ranges = {'drift_lengths': (1, 20, 400), 'focal_lengths': (1, 50, 400)}
+
+		#Lattices with at least stream_min_cells cells are tracked on the worker thread, stream_cells_per_chunk cells at a time,
+		#while the animation plays. At most stream_queue_size tracked chunks wait for the animation to take them.
+		self.stream_min_cells = 100
+		self.stream_cells_per_chunk = 10
+		self.stream_queue_size = 1000
+
+		#Beam animations track beam_size particles of beam_distribution ('gaussian', 'waterbag' or 'kv') around the particle inputs,
+		#matched to the lattice Twiss with rms emittance beam_emittance. Unstable lattices have no matched Twiss and get a round beam.
+		#Randomized particles are single draws from a matched gaussian of rms emittance particle_emittance.
+		self.beam_size = 1000
+		self.beam_distribution = 'gaussian'
+		self.beam_emittance = 0.001
+		self.particle_emittance = 0.005
+
+		#The dynamic aperture tracks a num_points x num_points (x, x') grid. Particles are lost beyond |x| = aperture.
+		#The grid spans margin times the largest ellipse of the lattice that fits inside the aperture.
+		self.aperture_scan = {'num_points': 201, 'aperture': 2, 'margin': 1.5}
+
+		#Tracking runs on a worker thread. The Tk thread polls the running job every tracking_poll_interval milliseconds.
+		self.executor = ThreadPoolExecutor(max_workers=1)
+		self.tracking_job = None
+		self.tracking_poll_interval = 50
+
+		#Per-phase wall time and animation frame timing. Off until toggled, then shown as an overlay on the plots and dumped to instrumentation_path.
+		self.instrumentation = Instrumentation()
+		self.instrumentation_path = 'instrumentation.json'
 
 		self.view.set_tab_names(self.tab_names)
 		self.tab_names.pop(1)
@@ -17,18 +58,28 @@ class Presenter:
 
 		self.view.set_callback_function('run_animation', lambda: self.start_animation(continue_run=False))
 		self.view.set_callback_function('continue_animation', lambda: self.start_animation(continue_run=True))
+		self.view.set_callback_function('run_beam_animation', self.start_beam_animation)
+		self.view.set_callback_function('cancel_tracking', self.cancel_tracking)
+		self.view.set_callback_function('run_dynamic_aperture', self.start_dynamic_aperture)
 		self.view.set_callback_function('on_animation_complete', self.on_animation_complete)
 		self.view.set_callback_function('clear', self.clear_plots)
 		self.view.set_callback_function('randomize_particle', self.randomize_particle)
 		self.view.set_callback_function('on_cell_scale_change', self.update_plot_markers)
 		self.view.set_callback_function('on_tab_clicked', self.change_tab)
+		self.view.set_callback_function('on_lattice_inputs_change', self.update_stability_map_point)
+		self.view.set_callback_function('record_session', self.record_session)
+		self.view.set_callback_function('open_session', self.open_session)
+		self.view.set_callback_function('toggle_instrumentation', self.toggle_instrumentation)
+		self.view.set_callback_function('dump_instrumentation', self.dump_instrumentation)
 
 
 #Restores default, then set exercises based on the name of the tab that was clicked.
 	def change_tab(self, tab_name):
+		self.stop_tracking()
 		self.view.restore_default_ui()
 		self.view.clear_all_data()
-		self.model.clear_particles()
+		self.close_session()
+		self.current_tab = tab_name
 
 		if tab_name == 'exercise 1':
 			self.view.set_exercise_1()
@@ -38,6 +89,9 @@ class Presenter:
 			self.view.set_exercise_3()
 		elif tab_name == 'exercise 4':
 			self.view.set_exercise_4()
+		elif tab_name == 'stability map':
+			self.view.set_stability_map_exercise()
+			self.update_stability_map()
 		else:
 			self.view.set_undefined_exercise()
 
@@ -45,15 +99,26 @@ class Presenter:
 		self.view.disable_animation_controls()
 		self.view.clear_plots()
 
-		if not continue_run:
+		if not continue_run or not self.model.particles:
 			self.update_particle()
 		else:
 			self.model.stage_particle(-1)
 
-		self.update_lattice()
-		self.model.propagate_active_particle()
+		with self.instrumentation.phase('update_lattice'):
+			self.update_lattice()
+		with self.instrumentation.phase('lattice_analysis'):
+			self.update_lattice_analysis()
+		if self.model.lattice.num_cells >= self.stream_min_cells:
+			self.start_streamed_animation()
+			return
+
+		self.start_tracking_job(self.display_active_orbit, self.model.calculate_orbit, self.model.active_particle, self.model.lattice)
+
+	def display_active_orbit(self, active_orbit):
+		self.model.set_active_orbit(active_orbit)
 		self.update_plot_markers()
-		self.relimit_plots()
+		with self.instrumentation.phase('relimit_plots'):
+			self.relimit_plots()
 		self.update_animation_interval()
 
 		previous_orbits = self.model.get_previous_orbits()
@@ -62,10 +127,186 @@ class Presenter:
 
 		x_data, xp_data, s_data = self.model.get_active_orbit_data()
 		self.view.set_animated_data(x_data, xp_data, s_data)
-		self.view.display_all_data()
+		#previous orbits are drawn here, the active orbit is only set up to animate
+		with self.instrumentation.phase('draw_orbits'):
+			self.view.display_all_data()
+
+		with self.instrumentation.phase('commit_orbit'):
+			self.model.commit_active_orbit()
+		self.view.clear_all_data()
+
+	#Nothing is tracked up front. The worker tracks chunks into a queue as a normal tracking job, with progress and cancel,
+	#while each animation frame commits and draws only the chunks that are already tracked.
+	def start_streamed_animation(self):
+		self.update_plot_markers()
+		self.update_animation_interval()
+
+		#s limits are known in advance. x and x' limits grow as chunks arrive.
+		x_max, xp_max, _ = self.model.max_orbit_values()
+		x_min, xp_min, s_min = self.model.min_orbit_values()
+		self.view.relimit_plots(x_max, xp_max, self.model.get_final_s(), x_min, xp_min, s_min)
+
+		previous_orbits = self.model.get_previous_orbits()
+		for orbit in previous_orbits:
+			self.view.set_static_data(orbit[0], orbit[1], orbit[2])
+
+		chunk_queue = queue.Queue(maxsize=self.stream_queue_size)
+		self.start_tracking_job(self.on_stream_tracked, self.model.track_orbit_chunks, self.model.active_particle, self.model.lattice,
+								self.stream_cells_per_chunk, chunk_queue)
+		num_samples = self.model.lattice.num_cells * self.model.get_num_lattice_elements()
+		self.view.set_streamed_data(self.model.stream_active_particle(self.stream_cells_per_chunk, chunk_queue), num_samples)
+		with self.instrumentation.phase('draw_orbits'):
+			self.view.display_all_data()
+		self.view.clear_all_data()
+
+	#Every chunk of the stream is tracked. The animation takes the rest from the queue and finishes on its own.
+	def on_stream_tracked(self, num_samples):
+		pass
+
+	def start_beam_animation(self):
+		self.view.disable_animation_controls()
+		self.view.clear_plots()
+
+		self.update_lattice()
+		self.update_lattice_analysis()
+		x, xp = self.view.get_particle_inputs()
+		beta, alpha = self.get_matched_twiss()
+		self.model.make_distributed_beam(self.beam_distribution, self.beam_size, self.beam_emittance, beta, alpha, centroid=(x, xp))
+
+		#the beam is only kept at the samples the animation can show at the current speed, at most one per rendered frame
+		self.update_animation_interval()
+		num_samples = self.model.lattice.num_cells * self.model.get_num_lattice_elements() + 1
+		sample_stride = self.view.get_sample_stride(num_samples)
+		sample_elements = self.model.get_beam_sample_elements(self.model.lattice, sample_stride)
+		self.start_tracking_job(lambda beam_orbit: self.display_beam_orbit(beam_orbit, sample_elements), self.model.calculate_beam_orbit,
+								self.model.beam.get_last_value(), self.model.lattice, sample_stride)
+
+	#beam_orbit holds the samples at sample_elements, None meaning every element
+	def display_beam_orbit(self, beam_orbit, sample_elements=None):
+		self.model.set_beam_orbit(beam_orbit)
+		self.update_plot_markers()
+
+		beam_orbit = self.model.get_beam_orbit_data()
+		x_max, xp_max, s_max = np.max(beam_orbit, axis=(0, 2))
+		x_min, xp_min, s_min = np.min(beam_orbit, axis=(0, 2))
+		self.view.relimit_plots(x_max, xp_max, s_max, x_min, xp_min, s_min)
 
-		self.model.commit_active_orbit()
+		self.view.animate_beam(beam_orbit[:, 0], beam_orbit[:, 1], beam_orbit[:, 2], sample_elements)
+		self.model.commit_beam_orbit()
+
+	def start_dynamic_aperture(self):
+		self.view.disable_animation_controls()
+		self.view.clear_plots()
+
+		self.update_lattice()
+		self.update_lattice_analysis()
+		x_values, xp_values = self.get_aperture_grid()
+		self.start_tracking_job(self.display_dynamic_aperture, self.model.calculate_dynamic_aperture,
+								self.model.lattice, x_values, xp_values, self.aperture_scan['aperture'])
+
+	#An ellipse reaching |x| = aperture reaches |x'| = aperture * sqrt(gamma / beta). Unstable lattices lose everything, any square grid will do.
+	def get_aperture_grid(self):
+		aperture, margin, num_points = self.aperture_scan['aperture'], self.aperture_scan['margin'], self.aperture_scan['num_points']
+		analysis = self.model.analyze_lattice()
+		xp_extent = aperture * np.sqrt(analysis.gamma / analysis.beta) if analysis.is_stable else aperture
+
+		x_values = np.linspace(-margin * aperture, margin * aperture, num_points)
+		xp_values = np.linspace(-margin * xp_extent, margin * xp_extent, num_points)
+		return x_values, xp_values
+
+	def display_dynamic_aperture(self, dynamic_aperture):
+		self.view.plot_survival_map(dynamic_aperture.x_values, dynamic_aperture.xp_values, dynamic_aperture.survival_cells, dynamic_aperture.lattice.num_cells)
+		self.view.restore_animation_controls()
+
+	#Submit a tracking call to the worker thread and hand its result to on_result on the Tk thread
+	def start_tracking_job(self, on_result, tracking_function, *args):
+		job = TrackingJob(self.executor, tracking_function, *args)
+		self.tracking_job = job
+		self.instrumentation.start_phase('tracking')
+		self.view.set_tracking_progress(0)
+		self.poll_tracking_job(job, on_result)
+
+	#Each job is polled with the on_result it was started with. A job that was replaced or stopped is left to finish
+	#on the worker, and its result is dropped, so it can never reach the on_result of a later job.
+	def poll_tracking_job(self, job, on_result):
+		if job is not self.tracking_job:
+			return
+		if not job.done():
+			self.view.set_tracking_progress(job.progress)
+			self.view.schedule(self.tracking_poll_interval, lambda: self.poll_tracking_job(job, on_result))
+			return
+
+		self.tracking_job = None
+		self.instrumentation.end_phase('tracking')
+		self.view.set_tracking_progress(None)
+		result = job.result()
+		if result is None:
+			#a streamed animation would otherwise keep waiting for chunks that are never tracked
+			self.view.pause_animation()
+			self.view.restore_animation_controls()
+			return
+		on_result(result)
+
+	#The cancelled job is still polled, and restores the animation controls once the worker notices
+	def cancel_tracking(self):
+		if self.tracking_job is not None:
+			self.tracking_job.cancel()
+
+	#Cancel the running job and drop it, used when the UI it was started from goes away
+	def stop_tracking(self):
+		self.cancel_tracking()
+		self.tracking_job = None
+		self.view.set_tracking_progress(None)
+
+	#Called when the window closes. Tracking functions check for cancellation every cell, so the worker thread,
+	#which the interpreter waits for on exit, stops within one cell. Queued jobs never start.
+	def close(self):
+		self.stop_tracking()
+		self.executor.shutdown(wait=False, cancel_futures=True)
+
+	#Orbits already on screen are written to the new session, later orbits are appended as they are committed.
+	#Choosing the session that is already being recorded changes nothing, its orbits are being written there.
+	def record_session(self, path):
+		if self.model.is_session_path(path):
+			return
+		self.cancel_tracking()
+		self.model.start_session(path)
+		self.view.set_session_path(path)
+
+	#Replace the current orbits with a recorded session and draw them. Orbits are read from disk, nothing is re-tracked.
+	def open_session(self, path):
+		self.cancel_tracking()
+		self.view.clear_plots()
+		self.view.clear_all_data()
+		session = self.model.load_session(path)
+		self.view.set_session_path(path)
+
+		lattice_inputs = session.get_last_lattice_inputs()
+		if lattice_inputs is not None:
+			self.view.set_lattice_inputs(*lattice_inputs)
+		if not self.model.particles:
+			return
+
+		self.update_lattice()
+		self.update_plot_markers()
+		self.relimit_plots()
+		for orbit in self.model.get_previous_orbits():
+			self.view.set_static_data(orbit[0], orbit[1], orbit[2])
+		self.view.display_all_data()
 		self.view.clear_all_data()
+		self.view.restore_animation_controls()
+
+	#Stop recording and drop the current particles. The session stays on disk.
+	def close_session(self):
+		self.model.set_orbit_store(None)
+		self.view.set_session_path(None)
+
+	def toggle_instrumentation(self):
+		self.instrumentation.set_enabled(not self.instrumentation.enabled)
+		self.view.set_instrumentation(self.instrumentation if self.instrumentation.enabled else None)
+
+	def dump_instrumentation(self):
+		self.instrumentation.dump(self.instrumentation_path)
 
 	def on_animation_complete(self):
 		self.view.restore_animation_controls()
@@ -75,11 +316,62 @@ class Presenter:
 		self.model.make_new_particle(x, xp)
 
 	def randomize_particle(self):
-		self.view.set_particle_inputs(round(np.random.normal(),2), round(np.random.normal(),2))
+		x, xp, _ = make_distribution('gaussian', 1, self.particle_emittance, *self.get_input_twiss())[:, 0]
+		self.view.set_particle_inputs(round(float(x), 2), round(float(xp), 2))
+
+	#(beta, alpha) of one cell built from the lattice inputs, leaving the model lattice as it is.
+	#Inputs that do not make a lattice, e.g. empty or half typed, or a focal length of 0, get a round (1, 0) like an unstable lattice.
+	def get_input_twiss(self):
+		try:
+			drift_length, focal_length, _ = self.view.get_lattice_inputs()
+			with np.errstate(divide='raise', invalid='raise'):
+				analysis = LatticeAnalysis(Lattice(drift_length, focal_length, 1, quad_length=self.quad_length, **self.cell_divisions))
+		except (ValueError, ZeroDivisionError, FloatingPointError):
+			return 1, 0
+		return self.get_matched_twiss(analysis)
+
+	#(beta, alpha) at the start of the current lattice, or of analysis when given, or a round (1, 0) when it is unstable
+	def get_matched_twiss(self, analysis=None):
+		if analysis is None:
+			analysis = self.model.analyze_lattice()
+		if not analysis.is_stable:
+			return 1, 0
+		return analysis.beta, analysis.alpha
 		
 	def update_lattice(self):
 		drift_length, focal_length, num_cells = self.view.get_lattice_inputs()
-		self.model.set_lattice(drift_length, focal_length, num_cells, **self.cell_divisions)
+		self.model.set_lattice(drift_length, focal_length, num_cells, quad_length=self.quad_length, **self.cell_divisions)
+
+	#Closed-form stability and optics for the current lattice, shown next to the lattice inputs
+	def update_lattice_analysis(self):
+		analysis = self.model.analyze_lattice()
+		if analysis.is_stable:
+			self.view.set_lattice_analysis(True, analysis.get_phase_advance_degrees(), analysis.get_tune(), analysis.get_max_beta())
+		else:
+			self.view.set_lattice_analysis(False)
+
+	#Scan the whole drift/focal grid in one batch on the worker thread, then mark the current lattice inputs on the map
+	def update_stability_map(self):
+		drift_lengths = np.linspace(*self.scan_ranges['drift_lengths'])
+		focal_lengths = np.linspace(*self.scan_ranges['focal_lengths'])
+		self.start_tracking_job(self.display_stability_map, self.model.scan_lattice_parameters, drift_lengths, focal_lengths,
+								self.cell_divisions['quad_divisions'], self.cell_divisions['drift_divisions'], self.quad_length)
+
+	def display_stability_map(self, scan):
+		self.view.plot_stability_map(scan.drift_lengths, scan.focal_lengths, scan.get_phase_advance_degrees(), current_point=self.get_stability_map_point())
+
+	#Used as a callback when the lattice inputs are edited. The scan does not depend on the inputs, only the marker moves.
+	def update_stability_map_point(self):
+		if self.current_tab == 'stability map':
+			self.view.set_stability_map_point(self.get_stability_map_point())
+
+	#(focal_length, drift_length) of the lattice inputs, or None while an input is not a valid number
+	def get_stability_map_point(self):
+		try:
+			drift_length, focal_length, _ = self.view.get_lattice_inputs()
+		except ValueError:
+			return None
+		return focal_length, drift_length
 
 	def update_animation_interval(self):
 		interval = self.view.get_animation_speed()
@@ -99,5 +391,6 @@ class Presenter:
 		self.view.relimit_plots(x_max, xp_max, s_max, x_min, xp_min, s_min)
 
 	def clear_plots(self):
-		self.model.clear_particles()
+		self.cancel_tracking()
+		self.close_session()
 		self.view.clear_plots()
\ No newline at end of file
@@ -0,0 +1,26 @@
+import threading
+
+'''TrackingJob runs one tracking call on a worker executor, keeping the Tk thread free while it runs.'''
+'''The tracking function must accept on_progress and is_cancelled keyword arguments. progress is written by the worker and read by the Tk thread.'''
+class TrackingJob:
+	def __init__(self, executor, tracking_function, *args):
+		self.progress = 0.0
+		self._cancel_event = threading.Event()
+		self.future = executor.submit(tracking_function, *args, on_progress=self._set_progress, is_cancelled=self._cancel_event.is_set)
+
+	def cancel(self):
+		self._cancel_event.set()
+
+	def is_cancelled(self):
+		return self._cancel_event.is_set()
+
+	def done(self):
+		return self.future.done()
+
+	#Re-raises any exception from the worker on the calling thread. Returns None for a cancelled job.
+	def result(self):
+		orbit = self.future.result()
+		return None if self.is_cancelled() else orbit
+
+	def _set_progress(self, fraction):
+		self.progress = fraction
@@ -0,0 +1,27 @@
+from view.animation_scheduler import AnimationScheduler
+
+#'slow' and 'med' are speeds the user picked and play at that speed on any lattice
+def test_requested_speed_is_kept_on_long_lattices():
+	scheduler = AnimationScheduler(2000, 30, max_duration=10000)
+	assert scheduler.sample_interval == 30
+
+def test_fast_animations_are_capped_at_max_duration():
+	scheduler = AnimationScheduler(100000, 0, fast_sample_interval=2, max_duration=10000)
+	assert scheduler.num_samples * scheduler.sample_interval == 10000
+	assert AnimationScheduler(100, 0, fast_sample_interval=2, max_duration=10000).sample_interval == 2
+
+def test_frames_cover_every_sample_once():
+	scheduler = AnimationScheduler(500, 0, fast_sample_interval=0.001)
+	frames = list(scheduler.iter_frames())
+	assert frames[0][0] == 0 and frames[-1][1] == 500
+	assert all(stop == next_start for (_, stop), (next_start, _) in zip(frames, frames[1:]))
+
+#samples still being produced: frames stop where the samples reach, and may advance nothing.
+#The sample interval is so short that every sample is due from the first frame.
+def test_frames_never_run_ahead_of_fill():
+	scheduler = AnimationScheduler(500, 0, fast_sample_interval=1e-9)
+	available = iter([0, 0, 40, 40] + [500] * 1000)
+	frames = list(scheduler.iter_frames(lambda stop: next(available)))
+	assert frames[:4] == [(0, 0), (0, 0), (0, 40), (40, 40)]
+	assert frames[-1][1] == 500
+	assert all(stop == next_start for (_, stop), (next_start, _) in zip(frames, frames[1:]))
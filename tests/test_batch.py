@@ -0,0 +1,14 @@
+import pytest
+
+import batch
+
+#misuse is reported as a usage error, not a traceback
+@pytest.mark.parametrize('argv', [['--distribution', 'kv', '--focal-length', '2'],
+								  ['--workers', '2', '--statistics'],
+								  ['--workers', '2', '--cell-stride', '3']])
+def test_invalid_options_are_usage_errors(tmp_path, argv, capsys):
+	with pytest.raises(SystemExit) as exit_info:
+		batch.main([str(tmp_path / 'results.npz')] + argv)
+	assert exit_info.value.code == 2
+	assert 'error:' in capsys.readouterr().err
+	assert not (tmp_path / 'results.npz').exists()
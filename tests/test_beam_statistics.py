@@ -0,0 +1,58 @@
+import numpy as np
+
+from model.beam_statistics import BeamStatistics
+from model.distributions import make_distribution
+from model.lattice import Lattice
+from model.tracking import track_beam, track_beam_statistics
+
+def make_coordinates(num_particles, seed=0):
+	rng = np.random.default_rng(seed)
+	#offset centroid and correlated x, xp, so cancellation errors would show
+	x = rng.normal(5, 0.1, num_particles)
+	xp = 0.3 * x + rng.normal(-2, 0.01, num_particles)
+	return np.vstack([x, xp, np.zeros(num_particles)])
+
+def test_update_matches_numpy_for_any_chunk_size():
+	coordinates = make_coordinates(10007)
+	expected = np.cov(coordinates[:2], bias=True)
+	for chunk_size in (1, 7, 1000, 10007):
+		statistics = BeamStatistics(1)
+		for start in range(0, coordinates.shape[1], chunk_size):
+			statistics.update(0, coordinates[:, start:start + chunk_size])
+		assert np.allclose(statistics.get_covariance()[0], expected, rtol=1e-9, atol=1e-15)
+		assert np.allclose(statistics.get_centroid()[0], coordinates[:2].mean(axis=1), rtol=1e-12)
+
+def test_merge_matches_single_pass():
+	coordinates = make_coordinates(3001)
+	first, second, whole = BeamStatistics(1), BeamStatistics(1), BeamStatistics(1)
+	first.update(0, coordinates[:, :1000])
+	second.update(0, coordinates[:, 1000:])
+	whole.update(0, coordinates)
+	first.merge(second)
+	assert np.allclose(first.get_covariance(), whole.get_covariance(), rtol=1e-10, atol=1e-15)
+	assert np.allclose(first.get_rms_emittance(), whole.get_rms_emittance(), rtol=1e-8)
+
+def test_tracked_statistics_match_the_full_orbit():
+	lattice = Lattice(10, 40, 3)
+	coordinates = make_coordinates(2000)
+	beam_orbit = track_beam(coordinates, lattice)
+	statistics = track_beam_statistics(coordinates, lattice, chunk_size=300)
+
+	expected = np.array([np.cov(sample[:2], bias=True) for sample in beam_orbit])
+	assert np.allclose(statistics.get_covariance(), expected, rtol=1e-8, atol=1e-14)
+	assert np.array_equal(statistics.s, beam_orbit[:, 2, 0])
+
+#the KV projection fills its ellipse uniformly, (r/R)**2 uniform on [0, 1], and the waterbag projection is parabolic, (r/R)**2 with density 2 * (1 - t)
+def test_distributions_are_the_projected_4d_profiles():
+	beta, alpha, emittance = 5, 0.5, 0.001
+	for kind, radius_squared, mean_t in (('kv', 4 * emittance, 1 / 2), ('waterbag', 6 * emittance, 1 / 3)):
+		coordinates = make_distribution(kind, 200000, emittance, beta, alpha, seed=0)
+		u = coordinates[0] / np.sqrt(beta)
+		v = coordinates[1] * np.sqrt(beta) + alpha * u
+		t = (u**2 + v**2) / radius_squared
+		assert t.max() <= 1
+		assert abs(t.mean() - mean_t) < 0.005
+
+		statistics = BeamStatistics(1)
+		statistics.update(0, coordinates)
+		assert np.isclose(statistics.get_rms_emittance()[0], emittance, rtol=0.02)
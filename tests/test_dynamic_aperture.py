@@ -0,0 +1,38 @@
+import numpy as np
+
+from model.beamline import Beamline
+from model.dynamic_aperture import DynamicAperture
+from model.lattice import Lattice
+from model.tracking import track_kick_drift
+
+#Survival of every grid point from an uncompacted kick-drift orbit: the first cell after which it is outside the aperture
+def get_expected_survival_cells(lattice, x_values, xp_values, aperture):
+	x_grid, xp_grid = np.meshgrid(x_values, xp_values)
+	coordinates = np.vstack([x_grid.ravel(), xp_grid.ravel(), np.zeros(x_grid.size)])
+	with np.errstate(over='ignore', invalid='ignore'):
+		boundary_orbit = track_kick_drift(coordinates, lattice)
+		is_lost = ~(np.abs(boundary_orbit[1:, 0]) <= aperture) | ~np.isfinite(boundary_orbit[1:, 1])
+	survival_cells = np.where(is_lost.any(axis=0), np.argmax(is_lost, axis=0), lattice.num_cells)
+	return survival_cells.reshape(x_grid.shape)
+
+#sextupoles make the survival map nonlinear, so particles are lost on many different cells and compaction runs repeatedly
+def test_survival_matches_uncompacted_tracking():
+	beamline = Beamline.from_elements([('quad', 0, 1 / 12, 2), ('drift', 5, 0, 2), ('sextupole', 0, 0.2),
+									   ('quad', 0, -1 / 12, 2), ('drift', 5, 0, 2)])
+	lattice = Lattice.from_beamline(beamline, 60)
+	x_values, xp_values = np.linspace(-3, 3, 41), np.linspace(-1, 1, 37)
+	dynamic_aperture = DynamicAperture(lattice, x_values, xp_values, 2)
+	survival_cells = dynamic_aperture.track()
+
+	expected = get_expected_survival_cells(lattice, x_values, xp_values, 2)
+	assert survival_cells.shape == (len(xp_values), len(x_values))
+	assert len(np.unique(expected[expected < lattice.num_cells])) > 5
+	assert np.array_equal(survival_cells, expected)
+	assert np.array_equal(dynamic_aperture.get_survivors(), expected == lattice.num_cells)
+
+#only a particle exactly on axis would stay, the grid leaves it out
+def test_unstable_lattice_loses_every_particle():
+	lattice = Lattice(20, 4, 200)
+	dynamic_aperture = DynamicAperture(lattice, np.linspace(-1, 1, 4), np.linspace(-1, 1, 4), 2)
+	dynamic_aperture.track()
+	assert dynamic_aperture.get_survival_fraction() == 0
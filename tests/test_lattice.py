@@ -0,0 +1,51 @@
+import numpy as np
+
+from model.beamline import Beamline
+from model.lattice import Lattice
+from model.tracking import track_beam
+
+def make_coordinates(num_particles, spread=0.1, seed=0):
+	rng = np.random.default_rng(seed)
+	return np.vstack([rng.normal(0, spread, (2, num_particles)), np.zeros((1, num_particles))])
+
+def test_cell_map_matches_repeated_cells():
+	lattice = Lattice(10, 40, 1)
+	matrix, s_vector = np.identity(3), np.zeros((3, 1))
+	for num_cells in range(1, 40):
+		matrix, s_vector = lattice.cell_matrix @ matrix, lattice.cell_matrix @ s_vector + lattice.cell_s_vector
+		cell_map_matrix, cell_map_s_vector = lattice.get_cell_map(num_cells)
+		assert np.allclose(cell_map_matrix, matrix, rtol=1e-12, atol=1e-12)
+		assert np.allclose(cell_map_s_vector, s_vector, rtol=1e-12, atol=1e-12)
+
+def test_cell_map_matches_tracking():
+	lattice = Lattice(10, 40, 25)
+	coordinates = make_coordinates(50)
+	matrix, s_vector = lattice.get_cell_map(lattice.num_cells)
+	assert np.allclose(track_beam(coordinates, lattice)[-1], matrix @ coordinates + s_vector, rtol=1e-10, atol=1e-12)
+
+def test_thick_quad_cell_map_matches_repeated_cells():
+	lattice = Lattice(10, 40, 1, quad_length=0.5)
+	matrix = np.identity(3)
+	for num_cells in range(1, 40):
+		matrix = lattice.cell_matrix @ matrix
+		assert np.allclose(lattice.get_cell_map(num_cells)[0], matrix, rtol=1e-12, atol=1e-12)
+
+#thick quad maps are exact, so slicing a quad only changes the sampling
+def test_thick_quad_slices_compose_to_the_whole_quad():
+	for strength in (0.3, -0.3, 0):
+		whole = Lattice.make_thick_quad_matrix(strength, 0.8)
+		composed = np.linalg.matrix_power(Lattice.make_thick_quad_matrix(strength, 0.1), 8)
+		assert np.allclose(composed, whole, rtol=1e-12, atol=1e-14)
+		assert np.isclose(np.linalg.det(whole), 1)
+
+def test_short_thick_quad_tends_to_thin_lens():
+	length = 1e-4
+	thick = Lattice.make_thick_quad_matrix(1 / (8 * length), length)
+	thin = Lattice.make_quad_matrix(-1 / 8)
+	assert np.allclose(thick, thin, atol=1e-4)
+
+def test_fodo_beamline_compiles_to_the_fodo_lattice():
+	lattice = Lattice(10, 8, 12, quad_divisions=3, drift_divisions=4)
+	beamline_lattice = Lattice.from_beamline(Beamline.make_fodo(10, 8, 3, 4), 12)
+	assert np.array_equal(lattice.cell_matrices, beamline_lattice.cell_matrices)
+	assert np.array_equal(lattice.cell_s_vectors, beamline_lattice.cell_s_vectors)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from model.beamline import Beamline
+from model.lattice import Lattice
+from model.model import Model
+from model.tracking import track_beam
+
+#a lattice of 0 cells commits an empty orbit
+def test_zero_cell_lattice(tmp_path):
+	for orbit_store_path in (None, str(tmp_path / 'orbits.f64')):
+		model = Model()
+		model.set_orbit_store(orbit_store_path)
+		model.set_lattice(10, 40, 0)
+		model.make_new_particle(0.4, -0.1)
+		model.propagate_active_particle()
+		model.commit_active_orbit()
+		assert np.array_equal(model.max_orbit_values(), [0.4, -0.1, 0])
+		assert np.array_equal(model.min_orbit_values(), [0.4, -0.1, 0])
+
+def test_bounds_cover_committed_and_active_orbits():
+	model = Model()
+	model.set_lattice(10, 40, 3)
+	model.make_new_particle(0.4, -0.1)
+	model.propagate_active_particle()
+	first_orbit = np.array(model.get_active_orbit_data())
+	model.commit_active_orbit()
+	model.make_new_particle(-0.7, 0.2)
+	model.propagate_active_particle()
+
+	all_orbits = np.hstack([first_orbit, model.get_active_orbit_data()])
+	assert np.array_equal(model.max_orbit_values(), all_orbits.max(axis=1))
+	assert np.array_equal(model.min_orbit_values(), all_orbits.min(axis=1))
+
+#linear cells are tracked with prefix maps, cells with sextupoles element by element, both must follow track_beam
+def test_single_particle_orbit_matches_beam_tracking():
+	sextupole_beamline = Beamline.from_elements([('quad', 0, 1 / 40, 5), ('drift', 10, 0, 5), ('sextupole', 0, 0.002),
+												 ('quad', 0, -1 / 40, 5), ('drift', 10, 0, 5)])
+	for lattice in (Lattice(10, 40, 50), Lattice(10, 40, 50, quad_length=0.5), Lattice.from_beamline(sextupole_beamline, 50)):
+		model = Model()
+		model.make_new_particle(0.02, -0.005)
+		orbit = model.calculate_orbit(model.active_particle, lattice)
+		expected = track_beam(np.array([[0.02], [-0.005], [0]]), lattice)[:, :, 0].T
+		assert np.allclose(orbit, expected, rtol=1e-10, atol=1e-12)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from model.orbit_store import OrbitStore
+
+def test_orbit_store_round_trip_with_multiple_chunks(tmp_path):
+	path = str(tmp_path / 'orbits.f64')
+	store = OrbitStore(path)
+	rng = np.random.default_rng(0)
+	chunks = {0: [rng.normal(size=(3, 1)), rng.normal(size=(3, 5))], 1: [rng.normal(size=(3, 2))]}
+	store.append(0, chunks[0][0])
+	store.append(1, chunks[1][0])
+	store.append(0, chunks[0][1])
+
+	reopened = OrbitStore(path, 'r')
+	assert reopened.num_particles == 2
+	for particle_index, particle_chunks in chunks.items():
+		assert np.array_equal(reopened.get_orbit_data(particle_index), np.hstack(particle_chunks))
+		assert np.array_equal(reopened.get_last_value(particle_index), particle_chunks[-1][:, -1:])
+
+	orbit_max, orbit_min = reopened.get_orbit_bounds()
+	all_chunks = np.hstack(chunks[0] + chunks[1])
+	assert np.array_equal(orbit_max, all_chunks.max(axis=1))
+	assert np.array_equal(orbit_min, all_chunks.min(axis=1))
+
+#streamed runs append one chunk per cell to the same particle
+def test_consecutive_appends_read_back_as_one_view(tmp_path):
+	store = OrbitStore(str(tmp_path / 'orbits.f64'))
+	chunks = [np.full((3, 4), value) for value in range(50)]
+	for chunk in chunks:
+		store.append(0, chunk)
+
+	assert len(store.chunks) == 1
+	orbit = store.get_orbit_data(0)
+	assert isinstance(orbit.base, np.memmap)
+	assert np.array_equal(orbit, np.hstack(chunks))
+
+#the index row of an append that never finished writing its data is dropped, later appends line up again
+def test_reopen_drops_incomplete_appends(tmp_path):
+	path = str(tmp_path / 'orbits.f64')
+	store = OrbitStore(path)
+	store.append(0, np.ones((3, 2)))
+	with open(store.index_path, 'ab') as index_file:
+		index_file.write(np.array([0, 2, 5], dtype=np.int64).tobytes())
+
+	reopened = OrbitStore(path, 'a')
+	reopened.append(1, np.zeros((3, 3)))
+	assert np.array_equal(OrbitStore(path, 'r').get_orbit_data(0), np.ones((3, 2)))
+	assert np.array_equal(OrbitStore(path, 'r').get_orbit_data(1), np.zeros((3, 3)))
@@ -0,0 +1,23 @@
+import numpy as np
+
+from model.lattice import Lattice
+from model.lattice_analysis import LatticeAnalysis
+from model.parameter_scan import ParameterScan
+
+#the grid spans both stable and unstable cells
+def test_scan_matches_per_point_analysis():
+	drift_lengths = np.linspace(1, 20, 7)
+	focal_lengths = np.linspace(1, 50, 9)
+	for quad_length in (None, 0.5):
+		scan = ParameterScan(drift_lengths, focal_lengths, quad_divisions=3, drift_divisions=4, quad_length=quad_length)
+		assert scan.is_stable.any() and not scan.is_stable.all()
+		for row, drift_length in enumerate(drift_lengths):
+			for column, focal_length in enumerate(focal_lengths):
+				analysis = LatticeAnalysis(Lattice(drift_length, focal_length, 1, quad_divisions=3, drift_divisions=4, quad_length=quad_length))
+				assert scan.is_stable[row, column] == analysis.is_stable
+				if analysis.is_stable:
+					assert np.isclose(scan.phase_advance[row, column], analysis.phase_advance, rtol=1e-10)
+					assert np.isclose(scan.max_beta[row, column], analysis.get_max_beta(), rtol=1e-10)
+				else:
+					assert np.isnan(scan.phase_advance[row, column])
+					assert np.isnan(scan.max_beta[row, column])
@@ -0,0 +1,56 @@
+import numpy as np
+
+from view.plot_decimation import decimate_min_max, decimate_visible_segments, get_visible_indices, get_visible_slice
+
+def test_short_lines_are_returned_unchanged():
+	x_data, y_data = np.arange(40.0), np.arange(40.0)
+	decimated_x, decimated_y = decimate_min_max(x_data, y_data, 10)
+	assert decimated_x is x_data and decimated_y is y_data
+
+#every bucket keeps its extremes, so the decimated line has the same envelope as the full line
+def test_decimation_keeps_bucket_extremes_and_endpoints():
+	rng = np.random.default_rng(0)
+	num_points, num_buckets = 100003, 300
+	x_data = np.cumsum(rng.normal(size=num_points))
+	y_data = np.sin(np.arange(num_points) / 50) + rng.normal(0, 0.1, num_points)
+	decimated_x, decimated_y = decimate_min_max(x_data, y_data, num_buckets)
+
+	bucket_size = -(-num_points // num_buckets)
+	#the samples after the last full bucket are kept as they are
+	assert len(decimated_x) <= 4 * num_buckets + bucket_size
+	assert decimated_x[0] == x_data[0] and decimated_x[-1] == x_data[-1]
+	#the kept points are a subsequence of the samples, in order
+	kept_indices = np.nonzero(np.isin(x_data, decimated_x))[0]
+	assert np.array_equal(x_data[kept_indices], decimated_x)
+	assert np.array_equal(y_data[kept_indices], decimated_y)
+
+	for start in range(0, num_points, bucket_size):
+		bucket = slice(start, start + bucket_size)
+		is_kept = (kept_indices >= start) & (kept_indices < start + bucket_size)
+		assert decimated_x[is_kept].max() == x_data[bucket].max()
+		assert decimated_x[is_kept].min() == x_data[bucket].min()
+		assert decimated_y[is_kept].max() == y_data[bucket].max()
+		assert decimated_y[is_kept].min() == y_data[bucket].min()
+
+def test_visible_slice_is_padded_by_one_sample():
+	x_data = np.arange(10.0)
+	assert get_visible_slice(x_data, 2.5, 6.5) == slice(2, 8)
+	assert get_visible_slice(x_data, -5, 50) == slice(0, 10)
+
+def test_visible_indices_are_padded_by_one_sample():
+	x_data = np.array([5.0, 0.5, 0.6, 5.0, 5.0, 5.0, 0.7, 5.0])
+	y_data = np.zeros(8)
+	assert np.array_equal(get_visible_indices(x_data, y_data, 0, 1, -1, 1), [0, 1, 2, 3, 5, 6, 7])
+
+#a curve that leaves the box and comes back is split into one segment per visit, with no line across the outside
+def test_visible_segments_are_split_between_visits():
+	angles = np.linspace(0, 6 * np.pi, 3001)
+	x_data, y_data = np.cos(angles), np.sin(angles)
+	visible_indices = get_visible_indices(x_data, y_data, 0.5, 1.5, -0.5, 0.5)
+	segments = decimate_visible_segments(x_data, y_data, visible_indices, 10)
+	assert len(segments) == 4 #the start and end of the curve are in the box, and it passes through twice in between
+	for segment in segments:
+		inside = (segment[1:-1, 0] >= 0.5) & (np.abs(segment[1:-1, 1]) <= 0.5)
+		assert inside.all()
+	assert sum(len(segment) for segment in segments) <= 4 * 10 + len(visible_indices) // 10 + 2
+	assert decimate_visible_segments(x_data, y_data, np.array([], dtype=int), 10) == []
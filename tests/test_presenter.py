@@ -0,0 +1,137 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from model.model import Model
+from presenter.presenter import Presenter
+
+#View stand-in. Scheduled callbacks are queued and run by run_scheduled instead of a Tk event loop.
+def make_presenter():
+	view = MagicMock()
+	view.get_lattice_inputs.return_value = (10, 40, 30)
+	view.get_particle_inputs.return_value = (0.4, -0.1)
+	view.get_animation_speed.return_value = 0
+	view.get_cell_scale_value.return_value = 0
+	scheduled = []
+	view.schedule.side_effect = lambda delay, func: scheduled.append(func)
+	return Presenter(view, Model()), view, scheduled
+
+def run_scheduled(scheduled):
+	while scheduled:
+		time.sleep(0.01)
+		scheduled.pop(0)()
+
+#A replaced job keeps its poll chain alive until it finishes, but its result must not reach the on_result of the new job
+def test_replaced_job_result_is_dropped():
+	presenter, _, scheduled = make_presenter()
+	release = threading.Event()
+	old_results, new_results = [], []
+
+	def blocked_tracking(on_progress=None, is_cancelled=None):
+		release.wait(5)
+		return 'old result'
+
+	presenter.start_tracking_job(old_results.append, blocked_tracking)
+	presenter.stop_tracking()
+	presenter.start_tracking_job(new_results.append, lambda on_progress=None, is_cancelled=None: 'new result')
+	release.set()
+	run_scheduled(scheduled)
+
+	assert old_results == []
+	assert new_results == ['new result']
+	presenter.close()
+
+def test_cancelled_job_restores_controls():
+	presenter, view, scheduled = make_presenter()
+	on_result = MagicMock()
+
+	def cancellable_tracking(on_progress=None, is_cancelled=None):
+		while not is_cancelled():
+			time.sleep(0.001)
+		return None
+
+	presenter.start_tracking_job(on_result, cancellable_tracking)
+	presenter.cancel_tracking()
+	run_scheduled(scheduled)
+	assert presenter.tracking_job is None
+	on_result.assert_not_called()
+	view.restore_animation_controls.assert_called()
+	presenter.close()
+
+def test_close_cancels_and_shuts_down_the_worker():
+	presenter, _, _ = make_presenter()
+	cancelled = threading.Event()
+
+	def cancellable_tracking(on_progress=None, is_cancelled=None):
+		while not is_cancelled():
+			time.sleep(0.001)
+		cancelled.set()
+
+	presenter.start_tracking_job(MagicMock(), cancellable_tracking)
+	presenter.close()
+	assert cancelled.wait(1)
+	assert presenter.tracking_job is None
+	with pytest.raises(RuntimeError):
+		presenter.executor.submit(print)
+
+#"open session" A followed by "record session" A keeps recording to A instead of replacing it
+def test_recording_the_open_session_keeps_it(tmp_path):
+	presenter, view, scheduled = make_presenter()
+	presenter.record_session(str(tmp_path))
+	presenter.model.set_lattice(10, 40, 3)
+	presenter.model.make_new_particle(0.4, -0.1)
+	presenter.model.propagate_active_particle()
+	presenter.model.commit_active_orbit()
+
+	presenter.open_session(str(tmp_path))
+	presenter.record_session(str(tmp_path))
+	assert presenter.model.orbit_store.num_particles == 1
+	assert len(presenter.model.session.runs) == 1
+	presenter.close()
+
+#long lattices are tracked by a worker job while the animation takes the chunks, so cancel also stops the animation
+def test_streamed_animation_tracks_on_the_worker():
+	presenter, view, scheduled = make_presenter()
+	view.get_lattice_inputs.return_value = (10, 40, 2000)
+	presenter.start_animation()
+	assert presenter.tracking_job is not None
+	orbit_chunks, num_samples = view.set_streamed_data.call_args.args
+	assert num_samples == 2000 * presenter.model.get_num_lattice_elements()
+
+	presenter.cancel_tracking()
+	run_scheduled(scheduled)
+	view.pause_animation.assert_called()
+	view.restore_animation_controls.assert_called()
+	presenter.close()
+
+#at the 'fast' speed a long beam animation advances many elements per frame, and only those samples are tracked and kept
+def test_beam_animation_keeps_one_sample_per_frame():
+	presenter, view, scheduled = make_presenter()
+	view.get_lattice_inputs.return_value = (10, 40, 1000)
+	view.get_sample_stride.return_value = 33
+	presenter.start_beam_animation()
+	run_scheduled(scheduled)
+
+	num_elements = 1000 * presenter.model.get_num_lattice_elements()
+	view.get_sample_stride.assert_called_with(num_elements + 1)
+	x_data, _, _, sample_indices = view.animate_beam.call_args.args
+	assert list(sample_indices) == list(range(0, num_elements, 33)) + [num_elements]
+	assert x_data.shape == (len(sample_indices), presenter.beam_size)
+	presenter.close()
+
+#inputs that are still being typed or make no lattice give a particle from a round beam, and the model lattice is left alone
+def test_randomize_particle_survives_invalid_inputs():
+	presenter, view, _ = make_presenter()
+	for lattice_inputs in (ValueError("could not convert string to float: ''"), [(10, 0, 30)]):
+		view.get_lattice_inputs.side_effect = lattice_inputs
+		presenter.randomize_particle()
+		view.set_particle_inputs.assert_called()
+		view.set_particle_inputs.reset_mock()
+	assert presenter.model.lattice is None
+
+	view.get_lattice_inputs.side_effect = None
+	presenter.randomize_particle()
+	assert presenter.model.lattice is None
+	presenter.close()
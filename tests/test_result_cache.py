@@ -0,0 +1,44 @@
+import pytest
+
+from model.result_cache import ResultCache
+
+def test_least_recently_used_entries_are_evicted_until_the_new_value_fits():
+	cache = ResultCache(max_bytes=100)
+	cache.put('a', 'A', 40)
+	cache.put('b', 'B', 40)
+	assert cache.get('a') == 'A' #b is now least recently used
+	cache.put('c', 'C', 40)
+	assert 'b' not in cache and 'a' in cache and 'c' in cache
+	assert cache.num_bytes == 80
+
+	cache.put('d', 'D', 90)
+	assert list(cache._entries) == ['d']
+	assert cache.num_bytes == 90
+
+def test_oversized_values_are_not_cached():
+	cache = ResultCache(max_bytes=100)
+	cache.put('a', 'A', 60)
+	cache.put('b', 'B', 101)
+	assert 'b' not in cache and cache.get('a') == 'A'
+	assert cache.num_bytes == 60
+
+def test_replacing_a_key_replaces_its_size():
+	cache = ResultCache(max_bytes=100)
+	cache.put('a', 'A', 60)
+	cache.put('a', 'A2', 30)
+	assert cache.get('a') == 'A2'
+	assert cache.num_bytes == 30
+	#an oversized replacement drops the old value too
+	cache.put('a', 'A3', 200)
+	assert 'a' not in cache and cache.num_bytes == 0
+
+def test_hits_misses_and_clear():
+	cache = ResultCache(max_bytes=10)
+	assert cache.get('a', 'default') == 'default'
+	cache.put('a', 'A', 1)
+	cache.get('a')
+	assert (cache.hits, cache.misses) == (1, 1)
+	cache.clear()
+	assert len(cache) == 0 and cache.num_bytes == 0
+	with pytest.raises(ValueError):
+		ResultCache(max_bytes=-1)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from model.model import Model
+
+def run_particles(model):
+	for x in (0.4, -0.2):
+		model.make_new_particle(x, -0.1)
+		model.propagate_active_particle()
+		model.commit_active_orbit()
+	#continuing a run appends a second chunk to the last particle
+	model.set_lattice(12, 30, 4)
+	model.stage_particle(-1)
+	model.propagate_active_particle()
+	model.commit_active_orbit()
+
+def test_session_round_trip(tmp_path):
+	in_memory = Model()
+	in_memory.set_lattice(10, 40, 3)
+	run_particles(in_memory)
+	expected_orbits = [orbit.copy() for orbit in in_memory.get_previous_orbits()]
+
+	recorded = Model()
+	recorded.set_lattice(10, 40, 3)
+	recorded.start_session(str(tmp_path))
+	run_particles(recorded)
+
+	loaded = Model()
+	session = loaded.load_session(str(tmp_path))
+	assert len(session.runs) == 3
+	assert session.get_last_lattice_inputs() == (12, 30, 4)
+	loaded_orbits = list(loaded.get_previous_orbits())
+	assert len(loaded_orbits) == len(expected_orbits)
+	for loaded_orbit, expected_orbit in zip(loaded_orbits, expected_orbits):
+		assert np.array_equal(loaded_orbit, expected_orbit)
+	assert np.array_equal(loaded.max_orbit_values(), in_memory.max_orbit_values())
+	assert np.array_equal(loaded.particles[-1].get_last_value(), in_memory.particles[-1].get_last_value())
+
+def record_run(model, x):
+	model.make_new_particle(x, -0.1)
+	model.propagate_active_particle()
+	model.commit_active_orbit()
+
+#Replacing the files of the current session under its memmap views used to crash the process with a bus error
+def test_recording_to_the_current_session_is_refused(tmp_path):
+	model = Model()
+	model.set_lattice(10, 40, 3)
+	model.start_session(str(tmp_path))
+	record_run(model, 0.4)
+	expected_orbit = np.array(model.orbit_store.get_orbit_data(0))
+
+	with pytest.raises(ValueError):
+		model.start_session(str(tmp_path))
+	loaded = Model()
+	loaded.load_session(str(tmp_path))
+	with pytest.raises(ValueError):
+		loaded.start_session(str(tmp_path))
+	assert np.array_equal(loaded.orbit_store.get_orbit_data(0), expected_orbit)
+	assert len(loaded.session.runs) == 1
+
+#an opened session recorded into another directory is copied there, the original is left as it was
+def test_recording_an_opened_session_elsewhere(tmp_path):
+	model = Model()
+	model.set_lattice(10, 40, 3)
+	model.start_session(str(tmp_path / 'first'))
+	record_run(model, 0.4)
+	expected_orbit = np.array(model.orbit_store.get_orbit_data(0))
+
+	model.load_session(str(tmp_path / 'first'))
+	model.start_session(str(tmp_path / 'second'))
+	record_run(model, -0.2)
+	assert np.array_equal(Model().load_session(str(tmp_path / 'second')).orbit_store.get_orbit_data(0), expected_orbit)
+	assert Model().load_session(str(tmp_path / 'first')).orbit_store.num_particles == 1
+
+#orbits handed to the plots stay readable after the store they came from is cleared or recorded over
+def test_views_survive_clearing_the_store(tmp_path):
+	model = Model()
+	model.set_lattice(10, 40, 3)
+	model.set_orbit_store(str(tmp_path / 'orbits.f64'))
+	record_run(model, 0.4)
+	drawn_orbit = next(iter(model.get_previous_orbits()))
+	expected_orbit = np.array(drawn_orbit)
+
+	model.clear_particles()
+	record_run(model, -0.2)
+	model.set_orbit_store(str(tmp_path / 'orbits.f64'))
+	assert np.array_equal(drawn_orbit, expected_orbit)
+
+#each run is one appended line, and a line cut short by a crash is dropped on load
+def test_runs_are_appended(tmp_path):
+	model = Model()
+	model.set_lattice(10, 40, 3)
+	model.start_session(str(tmp_path))
+	session = model.session
+	metadata = open(session.metadata_path).read()
+	for x in (0.4, -0.2, 0.1):
+		record_run(model, x)
+	assert open(session.metadata_path).read() == metadata
+	assert len(open(session.runs_path).read().splitlines()) == 3
+
+	with open(session.runs_path, 'a') as runs_file:
+		runs_file.write('{"particle_index": 3, "num_ce')
+	loaded = Model()
+	loaded.load_session(str(tmp_path))
+	assert len(loaded.session.runs) == 3
+	loaded.set_lattice(10, 40, 3)
+	record_run(loaded, 0.3)
+	assert [run['particle_index'] for run in Model().load_session(str(tmp_path)).runs] == [0, 1, 2, 3]
@@ -0,0 +1,91 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from model.model import Model
+
+def test_stream_checks_preconditions_when_called():
+	model = Model()
+	with pytest.raises(AttributeError):
+		model.stream_active_particle()
+	model.make_new_particle(0.4, -0.1)
+	with pytest.raises(AttributeError):
+		model.stream_active_particle()
+	model.set_lattice(10, 40, 3)
+	with pytest.raises(ValueError):
+		model.stream_active_particle(cells_per_chunk=0)
+
+def test_streamed_orbit_matches_propagated_orbit():
+	model = Model()
+	model.set_lattice(10, 40, 7)
+	model.make_new_particle(0.4, -0.1)
+	model.propagate_active_particle()
+	expected = np.array(model.get_active_orbit_data()[:, 1:])
+	model.orbit_cache.clear()
+
+	model.make_new_particle(0.4, -0.1)
+	chunks = list(model.stream_active_particle(cells_per_chunk=3))
+	assert [chunk.shape[1] for chunk in chunks] == [60, 60, 20]
+	assert np.array_equal(np.hstack(chunks), expected)
+	assert np.array_equal(model.particles[-1].get_orbit_data()[:, 1:], expected)
+
+#Consume exactly num_samples columns and stop, like TransversePlotsWidget.animate_stream, without running the generator to StopIteration
+def test_streamed_run_is_recorded_without_draining(tmp_path):
+	model = Model()
+	model.start_session(str(tmp_path))
+	model.set_lattice(12, 30, 120)
+	model.make_new_particle(0.4, -0.1)
+
+	num_samples = model.lattice.num_cells * model.get_num_lattice_elements()
+	chunk_iterator = model.stream_active_particle()
+	num_filled = 0
+	while num_filled < num_samples:
+		num_filled += next(chunk_iterator).shape[1]
+
+	assert len(model.session.runs) == 1
+	assert model.session.runs[0]['num_samples'] == num_samples
+	assert model.session.get_last_lattice_inputs() == (12, 30, 120)
+	assert model.orbit_store.get_orbit_data(0).shape == (3, num_samples + 1)
+
+#the worker fills a small queue, so it has to wait for the consumer, which takes chunks whenever they are ready
+def test_stream_from_a_worker_thread_matches_the_synchronous_stream(tmp_path):
+	model = Model()
+	model.set_lattice(12, 30, 150)
+	model.make_new_particle(0.4, -0.1)
+	expected = np.hstack(list(model.stream_active_particle(cells_per_chunk=10)))
+	model.orbit_cache.clear()
+
+	model.start_session(str(tmp_path))
+	model.make_new_particle(0.4, -0.1)
+	chunk_queue = queue.Queue(maxsize=2)
+	with ThreadPoolExecutor(max_workers=1) as executor:
+		future = executor.submit(model.track_orbit_chunks, model.active_particle, model.lattice, 10, chunk_queue)
+		chunks = []
+		num_samples = expected.shape[1]
+		for orbit_chunk in model.stream_active_particle(10, chunk_queue):
+			if orbit_chunk is not None:
+				chunks.append(orbit_chunk)
+			if sum(chunk.shape[1] for chunk in chunks) == num_samples:
+				break
+		assert future.result() == num_samples
+
+	assert np.array_equal(np.hstack(chunks), expected)
+	assert model.session.runs[0]['num_samples'] == num_samples
+	assert np.array_equal(model.orbit_store.get_orbit_data(0)[:, 1:], expected)
+
+#nobody takes chunks from a full queue, cancelling must still end the worker
+def test_cancelled_worker_stops_waiting_on_a_full_queue():
+	model = Model()
+	model.set_lattice(12, 30, 150)
+	model.make_new_particle(0.4, -0.1)
+	chunk_queue = queue.Queue(maxsize=1)
+	num_calls = 0
+
+	def is_cancelled():
+		nonlocal num_calls
+		num_calls += 1
+		return num_calls > 5
+
+	assert model.track_orbit_chunks(model.active_particle, model.lattice, 10, chunk_queue, is_cancelled=is_cancelled) is None
@@ -0,0 +1,48 @@
+import numpy as np
+
+from model.beamline import Beamline
+from model.lattice import Lattice
+from model.parallel_tracker import ParallelTracker
+from model.tracking import track_beam, track_kick_drift, get_sample_elements
+
+def make_coordinates(num_particles, spread=0.1, seed=0):
+	rng = np.random.default_rng(seed)
+	return np.vstack([rng.normal(0, spread, (2, num_particles)), np.zeros((1, num_particles))])
+
+#an odd beam size leaves uneven shards
+def test_parallel_tracking_is_bit_identical_to_serial():
+	lattice = Lattice(10, 40, 3)
+	coordinates = make_coordinates(5003)
+	tracker = ParallelTracker(3, min_shard_size=1000)
+	try:
+		parallel_orbit = tracker.calculate_beam_orbit(coordinates, lattice)
+	finally:
+		tracker.close()
+	assert np.array_equal(parallel_orbit, track_beam(coordinates, lattice))
+
+def test_kick_drift_matches_element_tracking_with_sextupoles():
+	beamline = Beamline.from_elements([('quad', 0, 1 / 40, 5), ('drift', 10, 0, 5), ('sextupole', 0, 0.02),
+									   ('quad', 0, -1 / 40, 5), ('drift', 10, 0, 5), ('sextupole', 0, -0.01)])
+	lattice = Lattice.from_beamline(beamline, 20)
+	coordinates = make_coordinates(100, spread=0.02)
+
+	cell_boundaries = track_beam(coordinates, lattice)[::lattice.num_cell_elements]
+	assert np.allclose(track_kick_drift(coordinates, lattice), cell_boundaries, rtol=1e-12, atol=1e-14)
+
+#strided tracking keeps exactly the rows of full tracking at the sampled elements, including the last element off the stride
+def test_strided_tracking_keeps_the_sampled_elements():
+	beamline = Beamline.from_elements([('quad', 0, 1 / 40, 5), ('drift', 10, 0, 5), ('sextupole', 0, 0.02),
+									   ('quad', 0, -1 / 40, 5), ('drift', 10, 0, 4)])
+	lattice = Lattice.from_beamline(beamline, 7)
+	coordinates = make_coordinates(100, spread=0.02)
+	sample_elements = get_sample_elements(lattice.num_cells * lattice.num_cell_elements, 8)
+	assert sample_elements[-1] % 8 != 0
+
+	beam_orbit = track_beam(coordinates, lattice, sample_stride=8)
+	assert np.array_equal(beam_orbit, track_beam(coordinates, lattice)[sample_elements])
+
+	tracker = ParallelTracker(2, min_shard_size=10)
+	try:
+		assert np.array_equal(tracker.calculate_beam_orbit(coordinates, lattice, 8), beam_orbit)
+	finally:
+		tracker.close()
@@ -0,0 +1,86 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from presenter.instrumentation import Instrumentation
+from view.compound_widgets.transverse_plots_widget import TransversePlotsWidget
+
+#TransversePlotsWidget on an Agg canvas without a Tk frame. Animations are real blitted FuncAnimations,
+#stepped by hand with Animation._step instead of a timer.
+class HeadlessTransversePlots(TransversePlotsWidget):
+	def __init__(self):
+		self._callback_registry = {}
+		self.register_callback_name('on_animation_complete')
+		self.completed_animations = []
+		self.set_callback_function('on_animation_complete', lambda: self.completed_animations.append(self.animation))
+		self._init_plot_state()
+		self._ensure_plots()
+
+	def _make_canvas(self):
+		return FigureCanvasAgg(self.figure)
+
+	#the first draw starts the animation, then every step renders one frame
+	def start_animation(self):
+		self.canvas.draw()
+
+	def step_animation(self):
+		return self.animation._step()
+
+#F3 during an animation removes the overlay, which the running animation used to keep blitting
+def test_removing_the_overlay_mid_animation():
+	widget = HeadlessTransversePlots()
+	widget.set_instrumentation(Instrumentation(enabled=True))
+	widget.animate_data(np.linspace(0, 1, 100), np.zeros(100), np.arange(100.0))
+	widget.start_animation()
+	widget.step_animation()
+
+	widget.set_instrumentation(None)
+	while widget.step_animation():
+		pass
+	assert widget.completed_animations == [widget.animation]
+
+#Longest line step that ends inside box = (xmin, xmax, ymin, ymax), over every segment of a LineCollection
+def get_longest_visible_step(collection, box):
+	longest_step = 0
+	for segment in collection.get_segments():
+		steps = np.hypot(*np.diff(segment, axis=0).T)
+		is_inside = (segment[1:, 0] >= box[0]) & (segment[1:, 0] <= box[1]) & (segment[1:, 1] >= box[2]) & (segment[1:, 1] <= box[3])
+		if is_inside.any():
+			longest_step = max(longest_step, steps[is_inside].max())
+	return longest_step
+
+#zooming into phase space re-decimates the visible part of the curve from full resolution, and only visible markers are kept
+def test_phase_space_zoom_redecimates_the_visible_box():
+	widget = HeadlessTransversePlots()
+	num_samples = 200000
+	angles = np.linspace(0, 400 * np.pi, num_samples)
+	radii = np.linspace(0.5, 1, num_samples)
+	x_data, xp_data, s_data = radii * np.cos(angles), radii * np.sin(angles), np.linspace(0, 1000, num_samples)
+	widget.relimit_orbit_plot(0, 1000, -1, 1)
+	widget.relimit_phase_space_plot(-1, 1, -1, 1)
+	widget.plot_static_data([(x_data, xp_data, s_data)])
+
+	box = (0.7, 0.8, -0.05, 0.05)
+	assert get_longest_visible_step(widget.static_artists['phase_space_collection'], box) > 0.1
+	widget.phase_space_plot.set(xlim=box[:2], ylim=box[2:])
+	assert get_longest_visible_step(widget.static_artists['phase_space_collection'], box) < 0.01
+
+	markevery = widget.line_kwargs['markevery']
+	x_markers, _ = widget.static_artists['phase_space_markers'].get_data()
+	x_marked, xp_marked = x_data[::markevery], xp_data[::markevery]
+	is_marker_visible = (x_marked >= box[0]) & (x_marked <= box[1]) & (xp_marked >= box[2]) & (xp_marked <= box[3])
+	assert len(x_markers) == is_marker_visible.sum()
+
+#a strided beam is paced over every sample, each frame showing the latest tracked sample that is due
+def test_strided_beam_animation_shows_the_latest_due_sample():
+	widget = HeadlessTransversePlots()
+	sample_indices = np.array([0, 4, 8, 10])
+	x_data = np.repeat(sample_indices[:, None], 5, axis=1).astype(float)
+	widget.animate_beam(x_data, np.zeros(x_data.shape), np.zeros(x_data.shape), sample_indices)
+	orbit_scatter, _ = widget.animation._init_func()
+
+	shown_samples = []
+	for stop in (1, 4, 5, 9, 10, 11):
+		widget.animation._func((stop - 1, stop))
+		shown_samples.append(orbit_scatter.get_offsets()[0, 1])
+	assert shown_samples == [0, 0, 4, 8, 8, 10]
+	assert widget.completed_animations == [widget.animation]
@@ -1 +1,11 @@
-from .single_particle_view import SingleParticleView
\ No newline at end of file
+import importlib
+
+#SingleParticleView pulls in matplotlib, so it is only imported on first attribute access
+_lazy_imports = {'SingleParticleView': 'single_particle_view'}
+
+__all__ = list(_lazy_imports)
+
+def __getattr__(name):
+	if name not in _lazy_imports:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	return getattr(importlib.import_module(f'.{_lazy_imports[name]}', __name__), name)
\ No newline at end of file
@@ -0,0 +1,32 @@
+import time
+
+'''AnimationScheduler paces an animation on wall-clock time instead of one sample per rendered frame.'''
+'''Every frame it reports the range of samples that are due by now. When rendering falls behind, several samples are advanced in one frame,'''
+'''so the total duration is num_samples * sample_interval regardless of how long each frame takes to draw.'''
+class AnimationScheduler:
+	def __init__(self, num_samples, sample_interval, frame_interval=16, fast_sample_interval=2, max_duration=10000):
+		#all times are in milliseconds. A sample_interval of 0 (the 'fast' speed) means fast_sample_interval,
+		#shortened when needed so a long 'fast' animation never takes longer than max_duration.
+		#Any other sample_interval is a speed the user asked for and is kept, however long the animation takes.
+		if sample_interval <= 0:
+			sample_interval = min(fast_sample_interval, max_duration / max(num_samples, 1))
+
+		self.num_samples = num_samples
+		self.sample_interval = sample_interval
+
+		#frames are never rendered faster than one per sample
+		self.frame_interval = max(frame_interval, sample_interval)
+		#samples a frame advances when rendering keeps up. Samples between two frames are never shown on their own.
+		self.samples_per_frame = max(1, int(self.frame_interval / self.sample_interval))
+
+	#Generator of (start, stop) sample ranges, one per rendered frame. Each frame advances at least one sample. The clock starts on the first frame.
+	#fill is for samples that are still being produced. fill(stop) is called with the stop that is due and returns how far the samples
+	#actually reach. Frames never run ahead of it, so a frame can advance less than one sample, with start == stop.
+	def iter_frames(self, fill=None):
+		start_time = time.perf_counter()
+		stop = 0
+		while stop < self.num_samples:
+			elapsed = (time.perf_counter() - start_time) * 1000
+			due = min(self.num_samples, max(stop + 1, int(elapsed / self.sample_interval) + 1))
+			start, stop = stop, due if fill is None else min(due, fill(due))
+			yield start, stop
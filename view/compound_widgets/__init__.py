@@ -1,8 +1,18 @@
-from .tabs import Tabs
-from .animation_controls import AnimationControls
-from .particle_controls import ParticleControls
-from .lattice_controls import LatticeControls
-from .transverse_plots_widget import TransversePlotsWidget
-from .cell_element_selector import CellElementSelector
+import importlib
 
-__all__ = ['Tabs', 'AnimationControls', 'ParticleControls', 'LatticeControls', 'TransversePlotsWidget', 'CellElementSelector']
\ No newline at end of file
+#Widgets are imported on first attribute access, so the tkinter-only widgets can be used without importing matplotlib
+_lazy_imports = {'Tabs': 'tabs',
+				 'AnimationControls': 'animation_controls',
+				 'ParticleControls': 'particle_controls',
+				 'LatticeControls': 'lattice_controls',
+				 'TransversePlotsWidget': 'transverse_plots_widget',
+				 'CellElementSelector': 'cell_element_selector',
+				 'StabilityMapWidget': 'stability_map_widget',
+				 'SessionControls': 'session_controls'}
+
+__all__ = list(_lazy_imports)
+
+def __getattr__(name):
+	if name not in _lazy_imports:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	return getattr(importlib.import_module(f'.{_lazy_imports[name]}', __name__), name)
\ No newline at end of file
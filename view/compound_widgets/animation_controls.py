@@ -8,10 +8,17 @@ class AnimationControls(BaseFrame):
 		self.register_callback_name('run_animation')
 		self.register_callback_name('continue_animation')
 		self.register_callback_name('clear')
+		self.register_callback_name('run_beam_animation')
+		self.register_callback_name('cancel_tracking')
+		self.register_callback_name('run_dynamic_aperture')
 		
 		self.run_button = tk.Button(self, text="run", command=lambda: self._execute_callback('run_animation'))
 		self.continue_button = tk.Button(self, text="continue", state='disabled', command=lambda: self._execute_callback('continue_animation'))
 		self.clear_button = tk.Button(self, text="clear", command=lambda: self._execute_callback('clear'))
+		self.beam_button = tk.Button(self, text="run beam", command=lambda: self._execute_callback('run_beam_animation'))
+		self.cancel_button = tk.Button(self, text="cancel", state='disabled', command=lambda: self._execute_callback('cancel_tracking'))
+		self.aperture_button = tk.Button(self, text="aperture", command=lambda: self._execute_callback('run_dynamic_aperture'))
+		self.progress_label = tk.Label(self, text='')
 		self.speed_menu = SpeedMenu(self)
 		self.speed_menu.configure(highlightthickness=0)
 
@@ -19,9 +26,20 @@ class AnimationControls(BaseFrame):
 		self.run_button.grid(row = 0, column = 1)
 		self.continue_button.grid(row = 0, column = 2)
 		self.clear_button.grid(row = 0, column = 3)
+		self.aperture_button.grid(row = 1, column = 0, sticky='WE')
+		self.beam_button.grid(row = 1, column = 1, columnspan = 2, sticky='WE')
+		self.cancel_button.grid(row = 1, column = 3)
+		self.progress_label.grid(row = 2, column = 0, columnspan = 4)
 
 	def get_speed(self):
 		return self.speed_menu.get_speed()
 
 	def set_speed(self, speed):
-		self.speed_menu.set_speed(speed)
\ No newline at end of file
+		self.speed_menu.set_speed(speed)
+
+	#fraction of tracking done, None clears the progress display
+	def set_progress(self, fraction):
+		if fraction is None:
+			self.progress_label.configure(text='')
+		else:
+			self.progress_label.configure(text=f'tracking {fraction:.0%}')
\ No newline at end of file
@@ -2,15 +2,18 @@ import tkinter as tk
 from ..custom_widgets.base_frame import BaseFrame
 from view.custom_widgets import DigitEntry, FloatEntry
 
+#on_lattice_inputs_change is executed after every key press in any of the lattice entries
 class LatticeControls(BaseFrame):
 
 	def __init__(self, parent, **kwargs):
 		super().__init__(parent, **kwargs)
+		self.register_callback_name('on_lattice_inputs_change')
 		default_lattice_parameters = {'drift_length': 10, 'focal_length': 8, 'num_cells': 12}
 
 		self.drift_entry = FloatEntry(self)
 		self.focus_entry = FloatEntry(self)
 		self.cell_entry = DigitEntry(self)
+		self.analysis_label = tk.Label(self, text='')
 
 		tk.Label(self, text='drift length').grid(row = 0, column = 0)
 		tk.Label(self, text='focal length').grid(row = 0, column = 1)
@@ -18,6 +21,10 @@ class LatticeControls(BaseFrame):
 		self.drift_entry.grid(row = 1, column = 0)
 		self.focus_entry.grid(row = 1, column = 1)
 		self.cell_entry.grid(row = 1, column = 2)
+		self.analysis_label.grid(row = 2, column = 0, columnspan = 3)
+
+		for entry in (self.drift_entry, self.focus_entry, self.cell_entry):
+			entry.bind('<KeyRelease>', lambda _: self._execute_callback('on_lattice_inputs_change'))
 
 		#set default values
 		self.set_lattice_inputs(*list(default_lattice_parameters.values()))
@@ -32,3 +39,10 @@ class LatticeControls(BaseFrame):
 
 	def get_lattice_inputs(self):
 		return self.drift_entry.get(), self.focus_entry.get(), self.cell_entry.get()
+
+	#phase_advance is in degrees per cell. Only stable lattices have a phase advance, tune and beta function.
+	def set_lattice_analysis(self, is_stable, phase_advance=None, tune=None, max_beta=None):
+		if is_stable:
+			self.analysis_label.configure(text=f'stable  \u03bc={phase_advance:.1f}\u00b0/cell  Q={tune:.3f}  \u03b2max={max_beta:.1f}')
+		else:
+			self.analysis_label.configure(text='unstable (|trace| \u2265 2)')
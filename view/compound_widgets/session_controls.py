@@ -0,0 +1,28 @@
+import tkinter as tk
+from tkinter import filedialog
+from ..custom_widgets.base_frame import BaseFrame
+
+#Record writes every committed orbit to a session directory as it is tracked. Open reloads a recorded session and keeps recording to it.
+#Both ask for a directory and pass its path to the callback. Cancelling the dialog does nothing.
+class SessionControls(BaseFrame):
+	def __init__(self, parent, **kwargs):
+		super().__init__(parent, **kwargs)
+		self.register_callback_name('record_session')
+		self.register_callback_name('open_session')
+
+		self.record_button = tk.Button(self, text='record session', command=lambda: self._ask_directory('record_session', mustexist=False))
+		self.open_button = tk.Button(self, text='open session', command=lambda: self._ask_directory('open_session', mustexist=True))
+		self.session_label = tk.Label(self, text='')
+
+		self.record_button.grid(row=0, column=0, sticky='WE')
+		self.open_button.grid(row=0, column=1, sticky='WE')
+		self.session_label.grid(row=1, column=0, columnspan=2)
+
+	#path of the current session, None clears the session display
+	def set_session_path(self, path):
+		self.session_label.configure(text='' if path is None else f'recording to {path}')
+
+	def _ask_directory(self, callback_name, mustexist):
+		path = filedialog.askdirectory(parent=self, mustexist=mustexist)
+		if path:
+			self._execute_callback(callback_name, path)
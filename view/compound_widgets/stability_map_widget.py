@@ -0,0 +1,105 @@
+import numpy as np
+
+from ..custom_widgets.base_frame import BaseFrame
+
+#StabilityMapWidget renders a (drift_length, focal_length) parameter scan as a heatmap of phase advance per cell.
+#Unstable grid points are nan and are left blank, so the stable region reads directly off the plot.
+#The figure is only built, and matplotlib only imported, the first time a map is plotted. Theme colors set before then are stored and applied at build time.
+class StabilityMapWidget(BaseFrame):
+	def __init__(self, parent, *args, **kwargs):
+		super().__init__(parent, *args, **kwargs)
+		self._configure_registry = {
+			"marker_color": self.set_marker_color,
+			"background": self.set_background_color,
+			"foreground": self.set_foreground_color,
+			"bg": self.set_background_color,
+			"fg": self.set_foreground_color,
+			}
+
+		self.marker_kwargs = {'marker': 'x', 's': 60}
+		self.background_color = None
+		self.foreground_color = None
+		self.figure = None
+		self.colorbar = None
+		self.current_point = None #(focal_length, drift_length) marked on the map, None hides the marker
+		self.current_point_marker = None
+
+	def set_background_color(self, color):
+		self.background_color = color
+		if self.figure is None:
+			return
+		self.figure.set_facecolor(color)
+		self.map_plot.set_facecolor(color)
+
+	def set_foreground_color(self, color):
+		self.foreground_color = color
+		if self.figure is None:
+			return
+		#includes the colorbar axes once it exists
+		for plot in self.figure.get_axes():
+			plot.title.set_color(color)
+			plot.xaxis.label.set_color(color)
+			plot.yaxis.label.set_color(color)
+			plot.tick_params(colors=color)
+
+			for spine in plot.spines.values():
+				spine.set_color(color)
+
+	def set_marker_color(self, color):
+		self.marker_kwargs['color'] = color
+
+	#phase_advance is a len(drift_lengths) x len(focal_lengths) array in degrees, nan where unstable.
+	#current_point is an optional (focal_length, drift_length) pair marked on the map.
+	def plot_stability_map(self, drift_lengths, focal_lengths, phase_advance, current_point=None):
+		if self.figure is None:
+			self._build_figure()
+		self.map_plot.clear()
+		self._set_labels()
+		self.current_point = current_point
+
+		image = self.map_plot.pcolormesh(focal_lengths, drift_lengths, np.ma.masked_invalid(phase_advance), shading='auto', vmin=0, vmax=180)
+		if self.colorbar is None:
+			self.colorbar = self.figure.colorbar(image, ax=self.map_plot)
+			self.colorbar.set_label('phase advance per cell (deg)')
+		else:
+			self.colorbar.update_normal(image)
+
+		self.current_point_marker = self.map_plot.scatter([], [], **self.marker_kwargs)
+		self._set_current_point_marker()
+
+		#clearing the axes resets its colors, reapply the theme
+		if self.background_color is not None:
+			self.set_background_color(self.background_color)
+		if self.foreground_color is not None:
+			self.set_foreground_color(self.foreground_color)
+		self.canvas.draw()
+
+	#Move the marker without replotting the map. Before the first map is plotted the point is only stored.
+	def set_current_point(self, current_point):
+		self.current_point = current_point
+		if self.current_point_marker is None:
+			return
+		self._set_current_point_marker()
+		self.canvas.draw_idle()
+
+	def _set_current_point_marker(self):
+		self.current_point_marker.set_offsets(np.empty((0, 2)) if self.current_point is None else [self.current_point])
+
+	def _build_figure(self):
+		from matplotlib.figure import Figure
+		from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+		self.figure = Figure(figsize=(8.4, 4))
+		self.map_plot = self.figure.add_subplot(1, 1, 1)
+
+		self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+		self.canvas_widget = self.canvas.get_tk_widget()
+		self.canvas_widget.pack(fill='both', expand=True)
+
+		self._set_labels()
+		self.figure.tight_layout(pad=1.6)
+
+	def _set_labels(self):
+		self.map_plot.set_title('stability map')
+		self.map_plot.set_xlabel('focal length')
+		self.map_plot.set_ylabel('drift length')
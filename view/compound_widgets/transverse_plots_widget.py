@@ -1,14 +1,16 @@
+import time
 import tkinter as tk
-import matplotlib
-matplotlib.use('TkAgg')
-from matplotlib.lines import Line2D
-from matplotlib.figure import Figure
-import matplotlib.animation as animation
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import numpy as np
 
 from ..custom_widgets.base_frame import BaseFrame
+from ..plot_decimation import decimate_min_max, decimate_visible_segments, get_visible_indices, get_visible_slice
+from ..animation_scheduler import AnimationScheduler
 
+#The figure is only built, and matplotlib only imported, the first time anything is drawn into the widget.
+#Until then the frame is an empty panel of the figure's size. Theme colors set before then are stored and applied at build time.
 class TransversePlotsWidget(BaseFrame):
+	figure_size = (8.4, 4) #inches
+
 	def __init__(self, parent, *args, **kwargs):
 		super().__init__(parent, *args, **kwargs)
 		#custom keyword support
@@ -21,18 +23,54 @@ class TransversePlotsWidget(BaseFrame):
 			}
 
 		self.register_callback_name('on_animation_complete')
-
+		self.register_callback_name('toggle_instrumentation')
+		self.register_callback_name('dump_instrumentation')
+		self._init_plot_state()
+		#reserve the space of the figure at matplotlib's default 100 dpi, so the window does not resize when it is built
+		tk.Frame.configure(self, width=int(self.figure_size[0] * 100), height=int(self.figure_size[1] * 100))
+
+		#F3 toggles the timing overlay, F4 writes the collected timings to file
+		self.bind_all('<F3>', lambda _: self._execute_callback('toggle_instrumentation'))
+		self.bind_all('<F4>', lambda _: self._execute_callback('dump_instrumentation'))
+
+	#Everything except the tk frame and the figure
+	def _init_plot_state(self):
 		self.line_kwargs = {'linewidth': 0.5, 'marker':'o', 'markeredgecolor': 'None', 'markevery': 20}
 		self.scatter_kwargs = {'color':'None', 's': 50}
-		self.animation_interval = 0 #units are milliseconds per frame
-
-		self.figure = Figure(figsize=(8.4, 4))
+		self.beam_scatter_kwargs = {'s': 2, 'linewidths': 0}
+		self.animation_interval = 0 #units are milliseconds per sample
+		self.frame_interval = 16 #milliseconds between rendered frames when samples are due faster than that
+		self.max_animation_duration = 10000 #milliseconds, longer 'fast' animations advance several samples per frame
+		self.stream_samples_per_frame = 20000 #most samples a streamed animation takes from its stream in one frame
+		self.marker_start = 0
+		self.background_color = None
+		self.foreground_color = None
+		self.figure = None
+
+		#full resolution (x_data, xp_data, s_data) of every static orbit. All static orbits share one LineCollection
+		#and one marker line per axis, built on first use, and the collections only hold a decimated copy sized to the canvas.
+		#Orbits read from an OrbitStore are memmap views, so only the decimated copies and the markers are held in memory.
+		#Every redecimation, e.g. on zoom, reads the full orbits back from disk.
+		self.static_orbits = []
+		self.static_artists = None
+
+		#set by set_instrumentation. None skips all frame timing, animations then run their update functions unwrapped.
+		self.instrumentation = None
+		self.overlay_text = None
+
+	def _ensure_plots(self):
+		if self.figure is None:
+			self._build_figure()
+
+	#The canvas comes from _make_canvas, so the plots can be built on a non-tk canvas.
+	def _build_figure(self):
+		from matplotlib.figure import Figure
+
+		self.figure = Figure(figsize=self.figure_size)
 		self.orbit_plot = self.figure.add_subplot(1, 2, 1)
 		self.phase_space_plot = self.figure.add_subplot(1, 2, 2)
 
-		self.canvas = FigureCanvasTkAgg(self.figure, master=self)
-		self.canvas_widget = self.canvas.get_tk_widget()
-		self.canvas_widget.pack(fill='both', expand=True)
+		self.canvas = self._make_canvas()
 
 		self.orbit_plot.set_title('orbit plot')
 		self.orbit_plot.set_xlabel('s')
@@ -42,17 +80,44 @@ class TransversePlotsWidget(BaseFrame):
 		self.phase_space_plot.set_xlabel('x')
 		self.phase_space_plot.set_ylabel('x\'', rotation = 0)
 
+		if self.background_color is not None:
+			self.set_background_color(self.background_color)
+		if self.foreground_color is not None:
+			self.set_foreground_color(self.foreground_color)
+
 		self._set_default_plot_limits()
 		self.figure.tight_layout(pad=1.6)
 
+		#zooming, relimiting or resizing changes what is visible and what a pixel covers, so static orbits are re-decimated
+		#and their markers re-thinned from full resolution. Phase space curves are limited to the visible x and x' box.
+		self.orbit_plot.callbacks.connect('xlim_changed', lambda _: self._update_static_artists())
+		self.phase_space_plot.callbacks.connect('xlim_changed', lambda _: self._update_static_artists())
+		self.phase_space_plot.callbacks.connect('ylim_changed', lambda _: self._update_static_artists())
+		self.canvas.mpl_connect('resize_event', lambda _: self._update_static_artists())
+
+	def _make_canvas(self):
+		from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+		canvas = FigureCanvasTkAgg(self.figure, master=self)
+		self.canvas_widget = canvas.get_tk_widget()
+		self.canvas_widget.pack(fill='both', expand=True)
+		return canvas
+
 	def set_background_color(self, color):
+		self.background_color = color
+		tk.Frame.configure(self, bg=color) #shown until the figure is built
+		if self.figure is None:
+			return
 		self.figure.set_facecolor(color)
 		for plot in self.figure.get_axes():
 			plot.set_facecolor(color)
 
 	def set_foreground_color(self, color):
+		self.foreground_color = color
 		self.line_kwargs['color'] = color
 		self.scatter_kwargs['edgecolors'] = color
+		self.beam_scatter_kwargs['color'] = color
+		if self.figure is None:
+			return
 
 		for plot in self.figure.get_axes():
 			plot.title.set_color(color)
@@ -77,23 +142,35 @@ class TransversePlotsWidget(BaseFrame):
 			self.line_kwargs['marker'] = 'None'
 
 	def set_markers(self, marker_start):
-		for line in self.orbit_plot.get_lines():
-			line.set_markevery((marker_start, self.line_kwargs['markevery']))
-
-		for line in self.phase_space_plot.get_lines():
-			line.set_markevery((marker_start, self.line_kwargs['markevery']))
+		self._ensure_plots()
+		self.marker_start = marker_start
+		for line in self.orbit_plot.get_lines() + self.phase_space_plot.get_lines():
+			if line.get_gid() != 'static_markers':
+				line.set_markevery((marker_start, self.line_kwargs['markevery']))
 
+		self._set_static_markers()
 		self.canvas.draw()
 
 	def set_animation_interval(self, interval):
 		self.animation_interval = interval
 
 	def plot_data(self, x_data, xp_data, s_data):
-		self.orbit_plot.plot(s_data, x_data, **self.line_kwargs)
-		self.phase_space_plot.plot(x_data, xp_data, **self.line_kwargs)
+		self.plot_static_data([(x_data, xp_data, s_data)])
+
+	#Add any number of (x_data, xp_data, s_data) orbits and draw the canvas once.
+	#Static orbits are drawn from a decimated copy of the data. Markers are kept on separate full resolution artists,
+	#because decimation would shift the sample indices that markevery counts in.
+	def plot_static_data(self, orbits):
+		self._ensure_plots()
+		self.static_orbits.extend((x_data, xp_data, s_data) for x_data, xp_data, s_data in orbits)
+		if self.static_artists is None:
+			self.static_artists = self._make_static_artists()
+
+		self._update_static_artists()
 		self.canvas.draw()
 
 	def animate_data(self, x_data, xp_data, s_data):
+		self._ensure_plots()
 		#check data lengths
 		if not(len(x_data) == len(xp_data) == len(s_data)):
 			raise ValueError("All data must have the same length")
@@ -104,27 +181,206 @@ class TransversePlotsWidget(BaseFrame):
 		orbit_scatter = self.orbit_plot.scatter([],[], animated = True, **self.scatter_kwargs)
 		phase_space_scatter = self.phase_space_plot.scatter([],[], animated = True, **self.scatter_kwargs)
 
+		#preallocated line buffer, rows are s, x, xp. Each frame only copies in the samples that became due.
+		line_buffer = np.empty((3, len(x_data)))
+		scheduler = AnimationScheduler(len(x_data), self.animation_interval, self.frame_interval, max_duration=self.max_animation_duration)
+
 		#define the animation function
-		#Called for each frame of FuncAnimation. Must return an iterable of artists for blitting
-		def update(frame):
-			orbit_line.set_data(s_data[:frame+1], x_data[:frame+1])
-			phase_space_line.set_data(x_data[:frame+1], xp_data[:frame+1])
-			orbit_scatter.set_offsets([s_data[frame], x_data[frame]])
-			phase_space_scatter.set_offsets([x_data[frame], xp_data[frame]])
-
-			if frame == len(x_data) - 1:
+		#Called for each frame of FuncAnimation with the (start, stop) range of samples due. Must return an iterable of artists for blitting
+		def update(sample_range):
+			start, stop = sample_range
+			line_buffer[0, start:stop] = s_data[start:stop]
+			line_buffer[1, start:stop] = x_data[start:stop]
+			line_buffer[2, start:stop] = xp_data[start:stop]
+
+			orbit_line.set_data(line_buffer[0, :stop], line_buffer[1, :stop])
+			phase_space_line.set_data(line_buffer[1, :stop], line_buffer[2, :stop])
+			orbit_scatter.set_offsets([line_buffer[0, stop-1], line_buffer[1, stop-1]])
+			phase_space_scatter.set_offsets([line_buffer[1, stop-1], line_buffer[2, stop-1]])
+
+			if stop == len(x_data):
+				self._execute_callback('on_animation_complete')
+
+			return orbit_line, phase_space_line, orbit_scatter, phase_space_scatter
+
+		self.animation = self._make_animation(fig = self.figure,
+									  func = update,
+									  frames = scheduler.iter_frames,
+									  init_func = lambda: (orbit_line, phase_space_line, orbit_scatter, phase_space_scatter),
+									  interval = scheduler.frame_interval,
+									  repeat = False,
+									  cache_frame_data = False,
+									  blit = True)
+
+	#Animate an orbit that is still being computed. orbit_chunks yields 3xn (x, xp, s) arrays, or None when no chunk is ready yet,
+	#so the first frame shows as soon as the first chunk exists and a frame never waits for tracking.
+	#Each frame takes at most stream_samples_per_frame samples, so frame time stays bounded when the animation falls behind its schedule.
+	#Plot limits are unknown up front and are expanded as chunks arrive.
+	def animate_stream(self, orbit_chunks, num_samples):
+		self._ensure_plots()
+		orbit_line, = self.orbit_plot.plot([],[], animated = True, **self.line_kwargs)
+		phase_space_line, = self.phase_space_plot.plot([],[], animated = True,**self.line_kwargs)
+		orbit_scatter = self.orbit_plot.scatter([],[], animated = True, **self.scatter_kwargs)
+		phase_space_scatter = self.phase_space_plot.scatter([],[], animated = True, **self.scatter_kwargs)
+
+		#preallocated line buffer, rows are s, x, xp. Filled chunk by chunk as the schedule catches up.
+		#This is the one part of a stream that is not bounded by the chunk size: the animated lines show every sample so far,
+		#and markevery counts full resolution sample indices, so the buffer holds all num_samples, 24 bytes per sample.
+		#Only the not yet tracked part of the orbit is never held in memory.
+		line_buffer = np.empty((3, num_samples))
+		chunk_iterator = iter(orbit_chunks)
+		num_filled = 0
+		limits_changed = False
+		scheduler = AnimationScheduler(num_samples, self.animation_interval, self.frame_interval, max_duration=self.max_animation_duration)
+
+		#Called by the scheduler with the stop that is due. Takes the chunks that are ready, up to the per-frame limit.
+		def fill(stop):
+			nonlocal num_filled, limits_changed
+			frame_limit = min(stop, num_filled + self.stream_samples_per_frame)
+			while num_filled < frame_limit:
+				orbit_chunk = next(chunk_iterator)
+				if orbit_chunk is None:
+					break
+				x_chunk, xp_chunk, s_chunk = orbit_chunk
+				chunk_stop = num_filled + len(x_chunk)
+				line_buffer[0, num_filled:chunk_stop] = s_chunk
+				line_buffer[1, num_filled:chunk_stop] = x_chunk
+				line_buffer[2, num_filled:chunk_stop] = xp_chunk
+				limits_changed |= self._expand_plot_limits(line_buffer[:, num_filled:chunk_stop])
+				num_filled = chunk_stop
+			return num_filled
+
+		def update(sample_range):
+			nonlocal limits_changed
+			_, stop = sample_range
+
+			#new limits need new ticks in the blit background, which only a full draw provides
+			if limits_changed:
+				self.canvas.draw()
+				limits_changed = False
+
+			#nothing has been tracked yet
+			if stop == 0:
+				return orbit_line, phase_space_line, orbit_scatter, phase_space_scatter
+
+			orbit_line.set_data(line_buffer[0, :stop], line_buffer[1, :stop])
+			phase_space_line.set_data(line_buffer[1, :stop], line_buffer[2, :stop])
+			orbit_scatter.set_offsets([line_buffer[0, stop-1], line_buffer[1, stop-1]])
+			phase_space_scatter.set_offsets([line_buffer[1, stop-1], line_buffer[2, stop-1]])
+
+			if stop == num_samples:
 				self._execute_callback('on_animation_complete')
 
 			return orbit_line, phase_space_line, orbit_scatter, phase_space_scatter
 
-		self.animation = animation.FuncAnimation(fig = self.figure,
+		self.animation = self._make_animation(fig = self.figure,
+									  func = update,
+									  frames = lambda: scheduler.iter_frames(fill),
+									  init_func = lambda: (orbit_line, phase_space_line, orbit_scatter, phase_space_scatter),
+									  interval = scheduler.frame_interval,
+									  repeat = False,
+									  cache_frame_data = False,
+									  blit = True)
+
+	#Samples of an animation of num_samples that a frame advances at the current speed. A beam only needs to be tracked
+	#at every this many samples, the animation would skip the samples in between anyway.
+	def get_sample_stride(self, num_samples):
+		return AnimationScheduler(num_samples, self.animation_interval, self.frame_interval, max_duration=self.max_animation_duration).samples_per_frame
+
+	#Animate a whole beam. x_data, xp_data and s_data are (frames, N) arrays, one column per particle.
+	#sample_indices gives the sample of every frame, e.g. the elements kept by strided tracking, and paces the animation
+	#as if every sample were there. None means frame i is sample i.
+	#Each axis shows the beam as a single scatter, so every frame is one blitted offsets update per axis regardless of N.
+	#The data is only read one frame at a time, never copied as a whole.
+	def animate_beam(self, x_data, xp_data, s_data, sample_indices=None):
+		self._ensure_plots()
+		if not(np.shape(x_data) == np.shape(xp_data) == np.shape(s_data)):
+			raise ValueError("All data must have the same shape")
+		if sample_indices is None:
+			sample_indices = np.arange(len(x_data))
+		if len(sample_indices) != len(x_data):
+			raise ValueError("sample_indices must have one entry per frame")
+		num_samples = sample_indices[-1] + 1
+
+		orbit_scatter = self.orbit_plot.scatter(s_data[0], x_data[0], animated = True, **self.beam_scatter_kwargs)
+		phase_space_scatter = self.phase_space_plot.scatter(x_data[0], xp_data[0], animated = True, **self.beam_scatter_kwargs)
+		scheduler = AnimationScheduler(num_samples, self.animation_interval, self.frame_interval, max_duration=self.max_animation_duration)
+
+		#Called for each rendered frame with the (start, stop) range of samples due. Only the latest frame at or before the last due sample is shown.
+		def update(sample_range):
+			_, stop = sample_range
+			frame = np.searchsorted(sample_indices, stop - 1, side='right') - 1
+			orbit_scatter.set_offsets(np.column_stack((s_data[frame], x_data[frame])))
+			phase_space_scatter.set_offsets(np.column_stack((x_data[frame], xp_data[frame])))
+
+			if stop == num_samples:
+				self._execute_callback('on_animation_complete')
+
+			return orbit_scatter, phase_space_scatter
+
+		self.animation = self._make_animation(fig = self.figure,
 									  func = update,
-									  frames = len(x_data),
-									  interval = self.animation_interval,
+									  frames = scheduler.iter_frames,
+									  init_func = lambda: (orbit_scatter, phase_space_scatter),
+									  interval = scheduler.frame_interval,
 									  repeat = False,
+									  cache_frame_data = False,
 									  blit = True)
 
-		# return orbit_line, phase_space_line, orbit_scatter, phase_space_scatter
+	#survival_cells is a len(xp_values) x len(x_values) array of cells survived by each initial condition, shown as a heatmap in phase space.
+	#The map is a collection of the phase space plot, so clear_plots removes it.
+	def plot_survival_map(self, x_values, xp_values, survival_cells, num_cells):
+		self._ensure_plots()
+		self.phase_space_plot.pcolormesh(x_values, xp_values, survival_cells, shading='auto', vmin=0, vmax=num_cells)
+		self.phase_space_plot.set(xlim=(x_values[0], x_values[-1]), ylim=(xp_values[0], xp_values[-1]))
+		self.canvas.draw()
+
+	#matplotlib.animation is only imported once something is animated
+	def _make_animation(self, **kwargs):
+		from matplotlib.animation import FuncAnimation
+		if self.instrumentation is not None:
+			kwargs = self._instrument_animation(kwargs)
+		return FuncAnimation(**kwargs)
+
+	#instrumentation receives the frame timing of every later animation and its summary is shown as an overlay on the orbit plot.
+	#None removes the overlay.
+	def set_instrumentation(self, instrumentation):
+		self._ensure_plots()
+		self.instrumentation = instrumentation
+		if instrumentation is None:
+			if self.overlay_text is not None:
+				self.overlay_text.remove()
+				self.overlay_text = None
+		elif self.overlay_text is None:
+			#blitted with the animated artists, so it only appears while something is animated
+			self.overlay_text = self.orbit_plot.text(0.02, 0.98, '', transform=self.orbit_plot.transAxes, va='top', ha='left',
+													 fontsize=7, family='monospace', color=self.line_kwargs.get('color'), animated=True)
+		self.canvas.draw()
+
+	#Wrap the update function of an animation to time each frame and refresh the overlay, which is blitted with the other artists.
+	#Once set_instrumentation removes or replaces the overlay, the running animation stops timing frames and stops returning it,
+	#since blitting an artist that was removed from its axes fails on every frame.
+	def _instrument_animation(self, kwargs):
+		instrumentation, overlay_text = self.instrumentation, self.overlay_text
+		func, init_func = kwargs['func'], kwargs['init_func']
+		instrumentation.start_animation(kwargs['interval'])
+
+		def instrumented_func(frame):
+			if overlay_text is not self.overlay_text:
+				return func(frame)
+			frame_start = time.perf_counter()
+			artists = func(frame)
+			instrumentation.record_frame(frame_start, time.perf_counter() - frame_start)
+			overlay_text.set_text(instrumentation.get_overlay_text())
+			return tuple(artists) + (overlay_text,)
+
+		def instrumented_init_func():
+			if overlay_text is not self.overlay_text:
+				return init_func()
+			overlay_text.set_text(instrumentation.get_overlay_text())
+			return tuple(init_func()) + (overlay_text,)
+
+		return dict(kwargs, func=instrumented_func, init_func=instrumented_init_func)
 
 	def pause_animation(self):
 		try:
@@ -133,6 +389,7 @@ class TransversePlotsWidget(BaseFrame):
 			pass
 
 	def clear_plots(self):
+		self._ensure_plots()
 		#pause animation to avoid throwing errors
 		self.pause_animation() 
 
@@ -141,16 +398,91 @@ class TransversePlotsWidget(BaseFrame):
 				line.remove()
 			for coll in list(ax.collections):
 				coll.remove()
+		self.static_orbits = []
+		self.static_artists = None
 
 		self._set_default_plot_limits()
 		self.canvas.draw()
 
+	def _make_static_artists(self):
+		from matplotlib.collections import LineCollection
+		collection_kwargs = {'linewidths': self.line_kwargs['linewidth'], 'colors': self.line_kwargs.get('color')}
+		marker_kwargs = {key: self.line_kwargs[key] for key in ('marker', 'markerfacecolor', 'markeredgecolor') if key in self.line_kwargs}
+
+		orbit_collection = LineCollection([], **collection_kwargs)
+		phase_space_collection = LineCollection([], **collection_kwargs)
+		self.orbit_plot.add_collection(orbit_collection, autolim=False)
+		self.phase_space_plot.add_collection(phase_space_collection, autolim=False)
+		orbit_markers, = self.orbit_plot.plot([], [], linestyle='None', gid='static_markers', **marker_kwargs)
+		phase_space_markers, = self.phase_space_plot.plot([], [], linestyle='None', gid='static_markers', **marker_kwargs)
+
+		return {'orbit_collection': orbit_collection, 'phase_space_collection': phase_space_collection,
+				'orbit_markers': orbit_markers, 'phase_space_markers': phase_space_markers}
+
+	def _update_static_artists(self):
+		self._decimate_static_orbits()
+		self._set_static_markers()
+
+	#Only visible samples are decimated. s is monotonic, so the orbit plot takes the visible slice of s.
+	#Phase space curves fold back on themselves and take the samples inside the visible x and x' box, split into one segment per visit.
+	def _decimate_static_orbits(self):
+		if self.static_artists is None:
+			return
+
+		smin, smax = self.orbit_plot.get_xlim()
+		xmin, xmax = self.phase_space_plot.get_xlim()
+		xpmin, xpmax = self.phase_space_plot.get_ylim()
+		orbit_width = self.orbit_plot.get_window_extent().width
+		phase_space_width = self.phase_space_plot.get_window_extent().width
+
+		orbit_segments, phase_space_segments = [], []
+		for x_data, xp_data, s_data in self.static_orbits:
+			visible = get_visible_slice(s_data, smin, smax)
+			orbit_segments.append(np.column_stack(decimate_min_max(s_data[visible], x_data[visible], orbit_width)))
+			visible_indices = get_visible_indices(x_data, xp_data, xmin, xmax, xpmin, xpmax)
+			phase_space_segments.extend(decimate_visible_segments(x_data, xp_data, visible_indices, phase_space_width))
+
+		self.static_artists['orbit_collection'].set_segments(orbit_segments)
+		self.static_artists['phase_space_collection'].set_segments(phase_space_segments)
+
+	#Markers stay at full resolution sample indices, since they mark lattice elements, but only the visible ones are kept
+	def _set_static_markers(self):
+		if self.static_artists is None or not self.static_orbits:
+			return
+
+		smin, smax = self.orbit_plot.get_xlim()
+		xmin, xmax = self.phase_space_plot.get_xlim()
+		xpmin, xpmax = self.phase_space_plot.get_ylim()
+		markers = slice(self.marker_start, None, self.line_kwargs['markevery'])
+
+		orbit_markers, phase_space_markers = [], []
+		for x_data, xp_data, s_data in self.static_orbits:
+			x_marked, xp_marked, s_marked = x_data[markers], xp_data[markers], s_data[markers]
+			visible = get_visible_slice(s_marked, smin, smax)
+			orbit_markers.append((s_marked[visible], x_marked[visible]))
+			is_visible = (x_marked >= xmin) & (x_marked <= xmax) & (xp_marked >= xpmin) & (xp_marked <= xpmax)
+			phase_space_markers.append((x_marked[is_visible], xp_marked[is_visible]))
+
+		self.static_artists['orbit_markers'].set_data(*(np.concatenate(data) for data in zip(*orbit_markers)))
+		self.static_artists['phase_space_markers'].set_data(*(np.concatenate(data) for data in zip(*phase_space_markers)))
+
 	def _set_default_plot_limits(self):
 		self.orbit_plot.set(xlim=(-0.1, 0.1), ylim=(-0.1, 0.1))
 		self.phase_space_plot.set(xlim=(-0.1, 0.1), ylim=(-0.1, 0.1))
 
+	#relimit both plots to fit a 3xn (s, x, xp) block of samples. Returns True if any limit changed.
+	def _expand_plot_limits(self, samples):
+		smax, xmax, xpmax = np.max(samples, axis=1)
+		smin, xmin, xpmin = np.min(samples, axis=1)
+		current_limits = self.orbit_plot.axis() + self.phase_space_plot.axis()
+
+		self.relimit_orbit_plot(smin, smax, xmin, xmax)
+		self.relimit_phase_space_plot(xmin, xmax, xpmin, xpmax)
+		return current_limits != self.orbit_plot.axis() + self.phase_space_plot.axis()
+
 	#check if data will exceed current plot limits, adjust plot limits if necessary
 	def relimit_orbit_plot(self, smin, smax, xmin, xmax):
+		self._ensure_plots()
 		current_smin, current_smax, current_xmin, current_xmax = self.orbit_plot.axis()
 		if current_smin > smin:
 			self.orbit_plot.set_xlim(xmin = smin)
@@ -163,6 +495,7 @@ class TransversePlotsWidget(BaseFrame):
 
 	#check if data will exceed current plot limits, adjust plot limits if necessary
 	def relimit_phase_space_plot(self, xmin, xmax, xpmin, xpmax):
+		self._ensure_plots()
 		current_xmin, current_xmax, current_xpmin, current_xpmax = self.phase_space_plot.axis()
 		if current_xmin > xmin:
 			self.phase_space_plot.set_xlim(xmin = xmin*1.2)
@@ -38,6 +38,10 @@ class BaseFrame(ConfigureMixin, CallbackMixin, tk.Frame):
 			except (tk.TclError, TypeError):
 				pass #silently handle widgets that do not support state
 
+	def hide_all_widgets(self):
+		for widget in self.winfo_children():
+			widget.grid_remove()
+
 	def _get_widget(self, widget_name):
 		widget = getattr(self, widget_name, None)
 		if not isinstance(widget, tk.Widget):
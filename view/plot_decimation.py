@@ -0,0 +1,62 @@
+import numpy as np
+
+'''Level-of-detail helpers for line plots. Long orbits are reduced to a few points per screen pixel before they reach Axes.plot.'''
+'''Decimation keeps the extreme points of every bucket, so peaks and envelopes look identical to the full-resolution line.'''
+
+#Split the samples into num_buckets index buckets and keep, per bucket, the samples with min/max x and min/max y.
+#Returns (x_data, y_data) unchanged when there are already few enough points.
+def decimate_min_max(x_data, y_data, num_buckets):
+	keep = get_min_max_indices(x_data, y_data, num_buckets)
+	if keep is None:
+		return x_data, y_data
+	return x_data[keep], y_data[keep]
+
+#Sorted indices of the samples decimate_min_max keeps, or None when it keeps every sample
+def get_min_max_indices(x_data, y_data, num_buckets):
+	num_points = len(x_data)
+	num_buckets = max(int(num_buckets), 1)
+	if num_points <= 4 * num_buckets:
+		return None
+
+	bucket_size = -(-num_points // num_buckets)
+	num_full_buckets = num_points // bucket_size
+	full_length = num_full_buckets * bucket_size
+	x_buckets = np.reshape(x_data[:full_length], (num_full_buckets, bucket_size))
+	y_buckets = np.reshape(y_data[:full_length], (num_full_buckets, bucket_size))
+	bucket_starts = np.arange(num_full_buckets) * bucket_size
+
+	return np.unique(np.concatenate([bucket_starts + np.argmin(x_buckets, axis=1),
+									 bucket_starts + np.argmax(x_buckets, axis=1),
+									 bucket_starts + np.argmin(y_buckets, axis=1),
+									 bucket_starts + np.argmax(y_buckets, axis=1),
+									 np.arange(full_length, num_points),
+									 [0, num_points - 1]]))
+
+#Slice of a monotonically increasing x_data covering [xmin, xmax], padded by one sample so lines run off the plot edge
+def get_visible_slice(x_data, xmin, xmax):
+	start = max(np.searchsorted(x_data, xmin, side='left') - 1, 0)
+	stop = min(np.searchsorted(x_data, xmax, side='right') + 1, len(x_data))
+	return slice(start, stop)
+
+#Indices of the samples inside the box [xmin, xmax] x [ymin, ymax], each padded by one sample on both sides so lines run off the plot edges.
+#For curves that are not monotonic in x, such as phase space orbits, which may enter and leave the box many times.
+def get_visible_indices(x_data, y_data, xmin, xmax, ymin, ymax):
+	is_inside = (x_data >= xmin) & (x_data <= xmax) & (y_data >= ymin) & (y_data <= ymax)
+	is_visible = is_inside.copy()
+	is_visible[:-1] |= is_inside[1:]
+	is_visible[1:] |= is_inside[:-1]
+	return np.flatnonzero(is_visible)
+
+#Decimate the samples at visible_indices to num_buckets like decimate_min_max, as a list of (n, 2) line segments.
+#The line is split wherever two kept samples come from different visits to the box, so no line is drawn across the part outside it.
+def decimate_visible_segments(x_data, y_data, visible_indices, num_buckets):
+	if not len(visible_indices):
+		return []
+	x_visible, y_visible = x_data[visible_indices], y_data[visible_indices]
+	#visit number of every visible sample, increasing wherever consecutive visible samples are not neighbours in the orbit
+	visits = np.concatenate([[0], np.cumsum(np.diff(visible_indices) > 1)])
+
+	keep = get_min_max_indices(x_visible, y_visible, num_buckets)
+	if keep is not None:
+		x_visible, y_visible, visits = x_visible[keep], y_visible[keep], visits[keep]
+	return np.split(np.column_stack([x_visible, y_visible]), np.flatnonzero(np.diff(visits)) + 1)
@@ -1,6 +1,13 @@
 import tkinter as tk
 
-from .compound_widgets import *
+from .compound_widgets.tabs import Tabs
+from .compound_widgets.animation_controls import AnimationControls
+from .compound_widgets.particle_controls import ParticleControls
+from .compound_widgets.lattice_controls import LatticeControls
+from .compound_widgets.cell_element_selector import CellElementSelector
+from .compound_widgets.transverse_plots_widget import TransversePlotsWidget
+from .compound_widgets.stability_map_widget import StabilityMapWidget
+from .compound_widgets.session_controls import SessionControls
 
 class SingleParticleView:
 	#list of names used to dynamically create tab buttons
@@ -10,16 +17,25 @@ class SingleParticleView:
 	'run_animation': 'animation_controls_widget',
 	'continue_animation': 'animation_controls_widget',
 	'clear': 'animation_controls_widget',
+	'run_beam_animation': 'animation_controls_widget',
+	'cancel_tracking': 'animation_controls_widget',
+	'run_dynamic_aperture': 'animation_controls_widget',
 	'randomize_particle': 'particle_controls_widget',
+	'on_lattice_inputs_change': 'lattice_controls_widget',
 	'on_cell_scale_change': 'cell_element_selector',
 	'on_animation_complete': 'plots_widget',
+	'toggle_instrumentation': 'plots_widget',
+	'dump_instrumentation': 'plots_widget',
 	'on_tab_clicked': 'tabs_widget',
+	'record_session': 'session_controls_widget',
+	'open_session': 'session_controls_widget',
 	}
 
 	def __init__(self, parent):
 		#list of data to be plotted
 		self.static_plot_data = [] 
 		self.animated_plot_data = [] 
+		self.streamed_plot_data = [] 
 
 		self.build_ui(parent)
 
@@ -28,6 +44,7 @@ class SingleParticleView:
 		#self contains the user frame (left) and figure frame (right)
 		self.user_frame = tk.Frame(parent)
 		self.plots_widget = TransversePlotsWidget(parent)
+		self.stability_map_widget = StabilityMapWidget(parent) #swapped in for plots_widget by the stability map tab
 		self.user_frame.pack(side='left', fill='y')
 		self.plots_widget.pack(side='right', fill='both', expand=True)
 
@@ -43,10 +60,12 @@ class SingleParticleView:
 		self.particle_controls_widget = ParticleControls(self.control_frame)
 		self.animation_controls_widget = AnimationControls(self.control_frame)
 		self.cell_element_selector = CellElementSelector(self.control_frame)
+		self.session_controls_widget = SessionControls(self.control_frame)
 		self.lattice_controls_widget.pack(side='top', pady=10)
 		self.particle_controls_widget.pack(side='top', pady=10)
 		self.animation_controls_widget.pack(side='top', pady=10)
 		self.cell_element_selector.pack(side='top', pady=10)
+		self.session_controls_widget.pack(side='top', pady=10)
 
 	def set_callback_function(self, callback_name, callback_func):
 		widget_name = self.callback_routing_table.get(callback_name)
@@ -61,6 +80,12 @@ class SingleParticleView:
 	def set_lattice_inputs(self, drift_length, focal_length, num_cells):		
 		self.lattice_controls_widget.set_lattice_inputs(drift_length, focal_length, num_cells)
 
+	def set_lattice_analysis(self, is_stable, phase_advance=None, tune=None, max_beta=None):
+		self.lattice_controls_widget.set_lattice_analysis(is_stable, phase_advance, tune, max_beta)
+
+	def set_session_path(self, path):
+		self.session_controls_widget.set_session_path(path)
+
 	def set_particle_inputs(self, x, xp):
 		self.particle_controls_widget.set_particle_inputs(x, xp)
 
@@ -82,19 +107,43 @@ class SingleParticleView:
 	def set_animation_interval(self, interval):
 		self.plots_widget.set_animation_interval(interval)
 
+	#None turns off frame timing and the timing overlay
+	def set_instrumentation(self, instrumentation):
+		self.plots_widget.set_instrumentation(instrumentation)
+
+	#Run func on the Tk thread after delay milliseconds. Used to poll work running on other threads.
+	def schedule(self, delay, func):
+		self.plots_widget.after(delay, func)
+
+	#fraction is the portion of tracking done, None hides the progress display and the cancel button
+	def set_tracking_progress(self, fraction):
+		self.animation_controls_widget.set_progress(fraction)
+		if fraction is None:
+			self.animation_controls_widget.disable_widget('cancel_button')
+		else:
+			self.animation_controls_widget.enable_widget('cancel_button')
+
 	def disable_animation_controls(self):
 		#disable controls that would cause visual artifacts while blitting
 		self.animation_controls_widget.disable_widget('run_button')
 		self.animation_controls_widget.disable_widget('continue_button')
 		self.animation_controls_widget.disable_widget('speed_menu')
+		self.animation_controls_widget.disable_widget('beam_button')
+		self.animation_controls_widget.disable_widget('aperture_button')
 		self.cell_element_selector.disable_widget('cell_scale')
 
 	def restore_animation_controls(self):
 		self.animation_controls_widget.enable_widget('run_button')
 		self.animation_controls_widget.enable_widget('continue_button')
 		self.animation_controls_widget.enable_widget('speed_menu')
+		self.animation_controls_widget.enable_widget('beam_button')
+		self.animation_controls_widget.enable_widget('aperture_button')
 		self.cell_element_selector.enable_widget('cell_scale')
 
+	#Stop the running animation where it is, leaving the plots as they are
+	def pause_animation(self):
+		self.plots_widget.pause_animation()
+
 	#Stop animation, restore UI controls, clear plots. Used when changing tabs, or manually clearing plots.
 	def clear_plots(self):
 		self.plots_widget.clear_plots()
@@ -112,22 +161,55 @@ class SingleParticleView:
 	def set_marker_visibility(self, is_visible):
 		self.plots_widget.set_marker_visibility(is_visible)
 
+	def show_transverse_plots(self):
+		self.stability_map_widget.pack_forget()
+		self.plots_widget.pack(side='right', fill='both', expand=True)
+
+	def show_stability_map(self):
+		self.plots_widget.pack_forget()
+		self.stability_map_widget.pack(side='right', fill='both', expand=True)
+
+	def plot_stability_map(self, drift_lengths, focal_lengths, phase_advance, current_point=None):
+		self.stability_map_widget.plot_stability_map(drift_lengths, focal_lengths, phase_advance, current_point)
+
+	def set_stability_map_point(self, current_point):
+		self.stability_map_widget.set_current_point(current_point)
+
 	def display_all_data(self):
-		for data in self.static_plot_data:
-			self.plots_widget.plot_data(*data)
+		#all static orbits go to the plots widget in one batch and are drawn once
+		self.plots_widget.plot_static_data(self.static_plot_data)
 
 		for data in self.animated_plot_data:
 			self.plots_widget.animate_data(*data)
 
+		for data in self.streamed_plot_data:
+			self.plots_widget.animate_stream(*data)
+
+	def plot_survival_map(self, x_values, xp_values, survival_cells, num_cells):
+		self.plots_widget.plot_survival_map(x_values, xp_values, survival_cells, num_cells)
+
+	#x_data, xp_data and s_data are (frames, N) arrays for a beam of N particles, sample_indices the sample of each frame
+	def animate_beam(self, x_data, xp_data, s_data, sample_indices=None):
+		self.plots_widget.animate_beam(x_data, xp_data, s_data, sample_indices)
+
+	#Samples one frame of an animation of num_samples advances at the current animation speed
+	def get_sample_stride(self, num_samples):
+		return self.plots_widget.get_sample_stride(num_samples)
+
 	def set_static_data(self, x_data, xp_data, s_data):
 		self.static_plot_data.append((x_data, xp_data, s_data))
 
 	def set_animated_data(self, x_data, xp_data, s_data):
 		self.animated_plot_data.append((x_data, xp_data, s_data))
 
+	#orbit_chunks is an iterable of 3xn (x, xp, s) arrays with num_samples columns in total, consumed as the animation plays
+	def set_streamed_data(self, orbit_chunks, num_samples):
+		self.streamed_plot_data.append((orbit_chunks, num_samples))
+
 	def clear_all_data(self):
 		self.static_plot_data = []
 		self.animated_plot_data = []
+		self.streamed_plot_data = []
 
 	#Used to insure that every widget is visible after changing tabs.
 	def restore_default_ui(self):
@@ -136,8 +218,10 @@ class SingleParticleView:
 				widget.grid()
 				widget.configure(state='normal')
 		self.animation_controls_widget.disable_widget('continue_button')
+		self.animation_controls_widget.disable_widget('cancel_button')
 
 		self.set_marker_visibility(True)
+		self.show_transverse_plots()
 		self.clear_plots()
 
 	def set_exercise_1(self):
@@ -148,6 +232,8 @@ class SingleParticleView:
 		self.animation_controls_widget.set_speed('slow')
 		self.animation_controls_widget.hide_widget('speed_menu')
 		self.animation_controls_widget.hide_widget('continue_button')
+		self.animation_controls_widget.hide_widget('beam_button')
+		self.animation_controls_widget.hide_widget('aperture_button')
 		self.cell_element_selector.hide_widget('cell_diagram')
 		self.cell_element_selector.hide_widget('cell_scale')
 		self.lattice_controls_widget.disable_all_widgets()
@@ -160,6 +246,8 @@ class SingleParticleView:
 		self.animation_controls_widget.set_speed('med')
 		self.animation_controls_widget.hide_widget('speed_menu')
 		self.animation_controls_widget.hide_widget('continue_button')
+		self.animation_controls_widget.hide_widget('beam_button')
+		self.animation_controls_widget.hide_widget('aperture_button')
 		self.cell_element_selector.hide_widget('cell_diagram')
 		self.cell_element_selector.hide_widget('cell_scale')
 		self.particle_controls_widget.disable_all_widgets()
@@ -171,6 +259,8 @@ class SingleParticleView:
 		self.animation_controls_widget.set_speed('med')
 		self.animation_controls_widget.hide_widget('speed_menu')
 		self.animation_controls_widget.hide_widget('continue_button')
+		self.animation_controls_widget.hide_widget('beam_button')
+		self.animation_controls_widget.hide_widget('aperture_button')
 		self.cell_element_selector.hide_widget('cell_diagram')
 		self.cell_element_selector.hide_widget('cell_scale')
 		self.particle_controls_widget.disable_all_widgets()
@@ -182,8 +272,18 @@ class SingleParticleView:
 		self.animation_controls_widget.set_speed('fast')
 		self.animation_controls_widget.hide_widget('speed_menu')
 		self.animation_controls_widget.hide_widget('continue_button')
+		self.animation_controls_widget.hide_widget('beam_button')
+		self.animation_controls_widget.hide_widget('aperture_button')
 		self.lattice_controls_widget.disable_all_widgets()
 
+	#Only the lattice inputs are relevant to the stability map, the particle and animation controls are hidden.
+	def set_stability_map_exercise(self):
+		self.show_stability_map()
+		self.particle_controls_widget.hide_all_widgets()
+		self.animation_controls_widget.hide_all_widgets()
+		self.cell_element_selector.hide_all_widgets()
+		self.session_controls_widget.hide_all_widgets()
+
 	def set_undefined_exercise(self):
 		self.lattice_controls_widget.set_lattice_inputs(10, 40, 30)
 		self.particle_controls_widget.set_particle_inputs(0.4, -0.1)